@@ -0,0 +1,96 @@
+"""Benchmark `TradesAnalysis`, reading a trades log, summarizing it and bootstrapping its metrics.
+
+Run from the repository root with `python -m benchmarks.bench_analysis`.
+"""
+import os
+import time
+from tempfile import TemporaryDirectory
+import numpy as np
+import pandas as pd
+from slipstream.trading.analysis import TradesAnalysis
+
+
+def _trades(n: int) -> pd.DataFrame:
+    """Random trades in the columns of a trades log"""
+    rng = np.random.default_rng(3)
+    entry_time = pd.Timestamp("2023-01-03T09:30:00", tz="US/Eastern") + pd.to_timedelta(np.arange(n) * 60, unit="s")
+    exit_time = entry_time + pd.to_timedelta(rng.integers(1, 60, size=n), unit="s")
+    entry = 4000.0 + np.round(rng.normal(scale=20.0, size=n) * 4) / 4
+    exit_ = entry + np.round(rng.normal(scale=2.0, size=n) * 4) / 4
+    return pd.DataFrame({
+        "Type": np.where(rng.random(n) < 0.5, "Long", "Short"),
+        "Size": 1,
+        "Profit": exit_ - entry - 1.7,
+        "Entry": entry,
+        "Exit": exit_,
+        "Cost": 1.7,
+        "Entry Time": entry_time.map(lambda t: t.isoformat(timespec="microseconds")),
+        "Exit Time": exit_time.map(lambda t: t.isoformat(timespec="microseconds")),
+        "RunUp": np.abs(rng.normal(size=n)),
+        "DrawDown": -np.abs(rng.normal(size=n)),
+    })
+
+
+def bench_trades_analysis(n: int = 100_000, repeat: int = 5) -> dict:
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "trades.csv")
+        _trades(n).to_csv(path, index=False)
+
+        begin = time.perf_counter()
+        analysis = TradesAnalysis(path)
+        load = time.perf_counter() - begin
+
+        # Reference: untyped read and inferred datetime parsing
+        begin = time.perf_counter()
+        df = pd.read_csv(path)
+        for col in TradesAnalysis.TimeColumns:
+            df[col] = pd.to_datetime(df[col], utc=True)
+        untyped_load = time.perf_counter() - begin
+
+        TradesAnalysis(path, cache=True)
+        begin = time.perf_counter()
+        TradesAnalysis(path, cache=True)
+        cached_load = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        summary = analysis.summary()
+    elapsed = (time.perf_counter() - begin) / repeat
+    assert summary["Trades"] == n
+
+    return {
+        "trades": n,
+        "load_trades_per_sec": n / load,
+        "untyped_load_trades_per_sec": n / untyped_load,
+        "cached_load_trades_per_sec": n / cached_load,
+        "summary_trades_per_sec": n / elapsed,
+    }
+
+
+def bench_bootstrap(n: int = 1_000, resamples: int = 20_000, loop_resamples: int = 500) -> dict:
+    analysis = TradesAnalysis(_trades(n))
+    begin = time.perf_counter()
+    intervals = analysis.bootstrap(resamples, seed=3)
+    elapsed = time.perf_counter() - begin
+    assert (intervals["Lower"] <= intervals["Upper"]).all()
+
+    # Reference: one pandas resample at a time
+    pnl = pd.Series(analysis.net_profits())
+    begin = time.perf_counter()
+    for i in range(loop_resamples):
+        sample = pnl.sample(n, replace=True, random_state=i)
+        equity = sample.cumsum()
+        (sample > 0).mean(), sample.mean(), (equity.cummax().clip(lower=0) - equity).max()
+    loop = time.perf_counter() - begin
+
+    return {
+        "trades": n,
+        "resamples_per_sec": resamples / elapsed,
+        "loop_resamples_per_sec": loop_resamples / loop,
+    }
+
+
+if __name__ == "__main__":
+    for bench in (bench_trades_analysis, bench_bootstrap):
+        for k, v in bench().items():
+            print(f"{k:>26} : {v:,.0f}")
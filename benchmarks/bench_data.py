@@ -0,0 +1,55 @@
+"""Benchmark loading eSignal CSV exports, from CSV and from the parquet cache when a parquet engine is installed.
+
+Run from the repository root with `python -m benchmarks.bench_data`.
+"""
+import os
+import time
+from tempfile import TemporaryDirectory
+import numpy as np
+import pandas as pd
+from slipstream.data.esignal import ESignalCSV
+from tests.helpers import random_mids
+
+
+def _write_esignal_csv(path: str, n: int):
+    rng = np.random.default_rng(2)
+    times = pd.date_range("2021-01-04T09:30:00", periods=n, freq="min")
+    close = random_mids(rng, n)
+    pd.DataFrame({
+        "Date": times.strftime("%m/%d/%Y"),
+        "Time": times.strftime("%I:%M:%S %p"),
+        "Bar#": [f"{i + 1}/{n}" for i in range(n)],
+        "Open": close, "High": close + 0.5, "Low": close - 0.5, "Close": close,
+    }).to_csv(path, index=False)
+
+
+def _has_parquet_engine() -> bool:
+    try:
+        pd.io.parquet.get_engine("auto")
+        return True
+    except ImportError:
+        return False
+
+
+def bench_esignal_load(n: int = 50_000) -> dict:
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bars.csv")
+        _write_esignal_csv(path, n)
+        cache = _has_parquet_engine()
+
+        begin = time.perf_counter()
+        df = ESignalCSV(path).get_dataframe(do_load_cache=False, do_save_cache=cache)
+        csv_load = time.perf_counter() - begin
+        assert len(df) == n
+        result = {"rows": n, "csv_rows_per_sec": n / csv_load}
+
+        if cache:
+            begin = time.perf_counter()
+            df = ESignalCSV(path).get_dataframe()
+            result["cache_rows_per_sec"] = n / (time.perf_counter() - begin)
+    return result
+
+
+if __name__ == "__main__":
+    for k, v in bench_esignal_load().items():
+        print(f"{k:>18} : {v:,.0f}")
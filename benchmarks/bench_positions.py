@@ -0,0 +1,67 @@
+"""Benchmark PositionTracker with many open lots.
+
+Scales into 10k single-contract lots, reading the aggregate position after each fill, then scales out
+one contract at a time. Also measures per-bar market evaluation while 10k lots are open. Run from the repository root with `python -m benchmarks.bench_positions`.
+"""
+import time
+import pandas as pd
+from slipstream.trading import OrderAction, Order, OrderExecution
+from slipstream.trading.positions import PositionTracker
+
+
+def _execution(action: OrderAction, price: float, time: pd.Timestamp) -> OrderExecution:
+    execution = OrderExecution(order=Order(action=action, size=1), price=price, cost=0.85)
+    execution.time_received = time
+    execution.time_executed = time
+    return execution
+
+
+def bench_open_lots(n_lots: int = 10_000) -> dict:
+    tracker = PositionTracker(initial_equity=100_000.0)
+    t0 = pd.Timestamp("2023-01-03T09:30:00")
+    executions_in = [_execution(OrderAction.Buy, 4000.0 + 0.25 * (i % 8), t0) for i in range(n_lots)]
+    executions_out = [_execution(OrderAction.Sell, 4001.0, t0) for _ in range(n_lots)]
+
+    begin = time.perf_counter()
+    for execution in executions_in:
+        tracker.add_execution(execution)
+        tracker.position.entry
+    scale_in = time.perf_counter() - begin
+    assert tracker.position.size == n_lots
+
+    begin = time.perf_counter()
+    for execution in executions_out:
+        tracker.add_execution(execution)
+        tracker.is_long()
+    scale_out = time.perf_counter() - begin
+    assert tracker.is_flat() and len(tracker.trades) == n_lots
+
+    return {
+        "lots": n_lots,
+        "scale_in_per_sec": n_lots / scale_in,
+        "scale_out_per_sec": n_lots / scale_out,
+    }
+
+
+def bench_market_eval(n_lots: int = 10_000, n_bars: int = 100_000) -> dict:
+    tracker = PositionTracker(initial_equity=100_000.0)
+    t0 = pd.Timestamp("2023-01-03T09:30:00")
+    for i in range(n_lots):
+        tracker.add_execution(_execution(OrderAction.Buy, 4000.0, t0))
+    lows = [4000.0 + 0.25 * (i % 40) for i in range(n_bars)]
+
+    begin = time.perf_counter()
+    for low in lows:
+        tracker.eval_market_prices(low, low + 0.5)
+    elapsed = time.perf_counter() - begin
+    return {
+        "lots": n_lots,
+        "bars_per_sec": n_bars / elapsed,
+    }
+
+
+if __name__ == "__main__":
+    for bench in (bench_open_lots, bench_market_eval):
+        print(bench.__name__)
+        for k, v in bench().items():
+            print(f"{k:>18} : {v:,.0f}")
@@ -0,0 +1,35 @@
+"""Benchmark `Price` arithmetic and comparisons.
+
+Run from the repository root with `python -m benchmarks.bench_pricing`.
+"""
+import time
+from slipstream.trading.pricing import Price
+
+
+def bench_price_arithmetic(n: int = 200_000) -> dict:
+    prices = [Price(4000.0 + 0.25 * (i % 64)) for i in range(n)]
+
+    begin = time.perf_counter()
+    total = Price(0.0)
+    for price in prices:
+        total = total + (price - 4000.0) * 2.0
+    arithmetic = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    above = 0
+    for price in prices:
+        if price > 4008.0:
+            above += 1
+    comparison = time.perf_counter() - begin
+    assert above > 0 and float(total) > 0
+
+    return {
+        "prices": n,
+        "arithmetic_per_sec": n / arithmetic,
+        "comparisons_per_sec": n / comparison,
+    }
+
+
+if __name__ == "__main__":
+    for k, v in bench_price_arithmetic().items():
+        print(f"{k:>20} : {v:,.0f}")
@@ -0,0 +1,31 @@
+"""Benchmark `RenkoBuilder.ingest()` on a random walk.
+
+Run from the repository root with `python -m benchmarks.bench_renko`.
+"""
+import time
+import numpy as np
+from slipstream.data.renko import RenkoBuilder
+
+
+def bench_renko_ingest(n: int = 500_000, bar_size: float = 1.0) -> dict:
+    rng = np.random.default_rng(0)
+    prices = (4000.0 + np.cumsum(rng.normal(scale=0.25, size=n))).tolist()
+    builder = RenkoBuilder(bar_size=bar_size)
+
+    begin = time.perf_counter()
+    bars = 0
+    for price in prices:
+        bars += len(builder.ingest(price))
+    elapsed = time.perf_counter() - begin
+    assert bars > 0
+
+    return {
+        "prices": n,
+        "renko_bars": bars,
+        "ingest_per_sec": n / elapsed,
+    }
+
+
+if __name__ == "__main__":
+    for k, v in bench_renko_ingest().items():
+        print(f"{k:>16} : {v:,.0f}")
@@ -0,0 +1,61 @@
+"""Benchmark `SimTrader.eval_market()` over a random walk of bars, with and without a working order book, and
+bracketed trade plans managed by the evaluator against the same brackets managed in `on_order_filled()`.
+
+Run from the repository root with `python -m benchmarks.bench_simtrader`.
+"""
+import time
+import pandas as pd
+from slipstream.trading import TradePlan, TradeType
+from slipstream.trading.simulation import SimTrader
+from tests.helpers import BracketTrader, ManualBrackets, random_bars
+
+
+def bench_eval_market(n_bars: int = 200_000) -> dict:
+    bars = random_bars(n_bars, seed=1, half_spread=0.5)
+    times = pd.DatetimeIndex(bars["Timestamp"]).asi8.tolist()
+    highs, lows = bars["High"].tolist(), bars["Low"].tolist()
+    trader = SimTrader(results_dir=None)
+    begin = time.perf_counter()
+    for ns, high, low in zip(times, highs, lows):
+        trader.eval_market(ns, high=high, low=low)
+    idle = time.perf_counter() - begin
+
+    trader = BracketTrader(results_dir=None)
+    begin = time.perf_counter()
+    trader.run(bars)
+    trading = time.perf_counter() - begin
+    assert len(trader.trades) > 0
+
+    return {
+        "bars": n_bars,
+        "trades": len(trader.trades),
+        "idle_bars_per_sec": n_bars / idle,
+        "trading_bars_per_sec": n_bars / trading,
+    }
+
+
+def bench_brackets(n_bars: int = 100_000, every: int = 3) -> dict:
+    bars = random_bars(n_bars, seed=1, half_spread=0.5)
+    times = pd.DatetimeIndex(bars["Timestamp"]).asi8.tolist()
+    highs, lows = bars["High"].tolist(), bars["Low"].tolist()
+    results = {"bars": n_bars}
+    for name, trader_cls in (("native", SimTrader), ("manual", ManualBrackets)):
+        trader = trader_cls(results_dir=None)
+        begin = time.perf_counter()
+        for i, (ns, high, low) in enumerate(zip(times, highs, lows)):
+            trader.eval_market(ns, high=high, low=low)
+            if i % every == 0:
+                mid = 0.5 * (high + low)
+                trader.add_trade_plan(TradePlan(type=TradeType.Long, size=1, limit=mid - 0.25,
+                                                target=mid + 1.0, stop=mid - 1.0))
+        elapsed = time.perf_counter() - begin
+        results[f"{name}_trades"] = len(trader.trades)
+        results[f"{name}_bars_per_sec"] = n_bars / elapsed
+    assert results["native_trades"] == results["manual_trades"] > 0
+    return results
+
+
+if __name__ == "__main__":
+    for bench in (bench_eval_market, bench_brackets):
+        for k, v in bench().items():
+            print(f"{k:>20} : {v:,.0f}")
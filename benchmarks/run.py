@@ -0,0 +1,121 @@
+"""Run the benchmark suite and check throughputs.
+
+Every `bench_*` function of the `bench_*` modules in this directory returns a dict of numbers. Those named
+`*_per_sec` are throughputs. Absolute throughputs depend on the machine, so the checks that gate a run are
+ratios of throughputs measured in the same run, e.g. an optimized path against a reference implementation.
+They are kept in `checks.json` as `{"<benchmark>": {"<metric> / <metric>": <minimum ratio>}}`, and a run
+fails if a ratio falls below its minimum.
+
+Absolute baselines are only compared with throughputs measured on the same machine. Record them locally with
+`--update`, which writes `baselines.json` (not committed). Throughputs more than `--tolerance` below them
+are reported, and only fail the run with `--strict`.
+
+Run from the repository root with `python -m benchmarks.run [--only renko] [--update] [--strict]`.
+"""
+from typing import Callable, Dict, List, Tuple
+import argparse
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import sys
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINES_PATH = os.path.join(BENCH_DIR, "baselines.json")
+CHECKS_PATH = os.path.join(BENCH_DIR, "checks.json")
+
+
+def discover(only: List[str] = ()) -> List[Tuple[str, Callable[[], dict]]]:
+    """(name, function) of every benchmark, named `<module>.<function>` without the `bench_` prefixes"""
+    benches = []
+    for module_info in sorted(pkgutil.iter_modules([BENCH_DIR]), key=lambda m: m.name):
+        if not module_info.name.startswith("bench_"):
+            continue
+        module = importlib.import_module(f"benchmarks.{module_info.name}")
+        for func_name, func in inspect.getmembers(module, inspect.isfunction):
+            if func_name.startswith("bench_") and func.__module__ == module.__name__:
+                name = f"{module_info.name[len('bench_'):]}.{func_name[len('bench_'):]}"
+                if not only or any(part in name for part in only):
+                    benches.append((name, func))
+    return benches
+
+
+def run(benches: List[Tuple[str, Callable[[], dict]]]) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, func in benches:
+        print(name, flush=True)
+        results[name] = {k: float(v) for k, v in func().items()}
+        for k, v in results[name].items():
+            print(f"{k:>24} : {v:,.0f}")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baselines: Dict[str, Dict[str, float]],
+            tolerance: float) -> List[str]:
+    """Throughputs more than `tolerance` (a fraction) below their baselines"""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            baseline = baselines.get(name, {}).get(metric)
+            if not metric.endswith("_per_sec") or baseline is None:
+                continue
+            if value < baseline * (1.0 - tolerance):
+                regressions.append(f"{name}.{metric}: {value:,.0f} < baseline {baseline:,.0f} ({value / baseline - 1:+.0%})")
+    return regressions
+
+
+def check_ratios(results: Dict[str, Dict[str, float]], checks: Dict[str, Dict[str, float]]) -> List[str]:
+    """Ratios of throughputs below their minimums. Checks of metrics a run did not measure are skipped"""
+    failures = []
+    for name, ratios in checks.items():
+        metrics = results.get(name, {})
+        for ratio, minimum in ratios.items():
+            numerator, denominator = (part.strip() for part in ratio.split("/"))
+            if numerator not in metrics or denominator not in metrics:
+                continue
+            value = metrics[numerator] / metrics[denominator]
+            if value < minimum:
+                failures.append(f"{name}: {ratio} = {value:.2f} < {minimum:.2f}")
+    return failures
+
+
+def _load_json(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run slipstream benchmarks")
+    parser.add_argument("--only", nargs="*", default=[], help="Run benchmarks whose names contain any of these")
+    parser.add_argument("--baselines", default=BASELINES_PATH, help="Local baselines JSON file")
+    parser.add_argument("--checks", default=CHECKS_PATH, help="Throughput ratio checks JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown as a fraction of baseline")
+    parser.add_argument("--update", action="store_true", help="Store results as the new local baselines")
+    parser.add_argument("--strict", action="store_true", help="Fail on slowdowns against local baselines too")
+    args = parser.parse_args(argv)
+
+    results = run(discover(args.only))
+    baselines = _load_json(args.baselines)
+
+    if args.update:
+        baselines.update({name: {k: round(v) for k, v in metrics.items()} for name, metrics in results.items()})
+        with open(args.baselines, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baselines saved to {args.baselines}")
+
+    failures = check_ratios(results, _load_json(args.checks))
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    slowdowns = [] if args.update else compare(results, baselines, args.tolerance)
+    for slowdown in slowdowns:
+        print(f"{'REGRESSION' if args.strict else 'SLOWER'} {slowdown}")
+    return 1 if failures or (args.strict and slowdowns) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,34 @@
+import sys
 from slipstream.data import ESignalCSV
 import slipstream.trading as slt
 
 
+class BreakoutStrategy(slt.Strategy):
+    """Buys a new 20-bar high with a bracket around the entry"""
+
+    def __init__(self, lookback: int = 20) -> None:
+        self.lookback = lookback
+        self.highs = []
+
+    def observe_book_state(self, book_state: slt.BookState):
+        self.highs = self.highs[-self.lookback:] + [book_state.high]
+        if len(self.highs) <= self.lookback or not self.trader.tracker.is_flat() or self.trader.pending_orders:
+            return
+        if book_state.high > max(self.highs[:-1]):
+            self.send(slt.TradePlan(
+                type=slt.TradeType.Long,
+                size=1,
+                target=book_state.last + 2.0,
+                stop=book_state.last - 1.0,
+                hold_period=30
+            ))
+
+
 def main():
-    sim = slt.Simulation()
-    sim.launch()
+    sim = slt.Simulation(source=ESignalCSV(sys.argv[1]))
+    sim.subscribe(BreakoutStrategy())
+    print(sim.launch())
+    print(sim.timings)
 
 
 if __name__ == "__main__":
@@ -3,22 +3,17 @@ import pandas as pd
 import re
 import shutil
 from slipstream.trading.analysis import TradesAnalysis
-import s3fs
+from slipstream.trading.multirun import MultiRunAnalysis, read_s3_object
+from typing import List
 import tempfile
 import typer
 import uuid
-import zstd
 
 app = typer.Typer()
 
 
 def _fetch_s3_file(s3_path: str, local_path: str = None, overwrite_ok: bool = True) -> str:
-    s3 = s3fs.S3FileSystem()
-    with s3.open(s3_path, "rb") as f:
-        trades_data = f.read()
-    tags = s3.get_tags(s3_path)
-    if tags.get("compression", "") == "zstd":
-        trades_data = zstd.decompress(trades_data)
+    trades_data = read_s3_object(s3_path)
 
     if local_path is None:
         _, filename = os.path.split(s3_path)
@@ -49,16 +44,29 @@ def show(file: str):
 
 
 @app.command()
-def summarize(file: str):
+def summarize(file: str, cache: bool = typer.Option(False, help="Cache the parsed log in a sidecar file next to it")):
     m = re.match("s3://(.*)", file)
     if m is not None:
         s3_path = m.group(1)
         file = _fetch_s3_file(s3_path)
 
     assert os.path.exists(file), f"File not found: {file}"
-    analysis = TradesAnalysis(file)
+    analysis = TradesAnalysis(file, cache=cache)
     summary = analysis.summary()
     max_field_width = max(len(k) for k in summary.keys())
     k_fmt_str = f"%{max_field_width + 1}s"
     for k, v in summary.items():
         print(k_fmt_str % k, ":", v)
+
+
+@app.command()
+def compare(location: str, group_by: List[str] = typer.Option([], help="Parameters to aggregate runs by"),
+            sort: str = "Sharpe", top: int = 20, processes: int = 0):
+    """Compare the runs whose trades logs are under a directory, S3 prefix or glob pattern"""
+    runs = MultiRunAnalysis(location, processes=processes or None)
+    print(location, "runs:", len(runs.paths))
+    with pd.option_context("display.width", None, "display.max_columns", None):
+        if group_by:
+            print(runs.groupby(group_by, metrics=(sort, "Net Profit", "Max Drawdown")))
+        else:
+            print(runs.rank(sort).drop(columns=["Path"]).head(top).to_string(index=False))
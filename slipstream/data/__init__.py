@@ -0,0 +1 @@
+from .esignal import ESignalCSV
@@ -0,0 +1,223 @@
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+import os
+import numpy as np
+import pandas as pd
+from slipstream.market.futures import EminiContract, FutureContract
+
+
+__all__ = [
+    "SyntheticMarket",
+]
+
+
+_NS_PER_YEAR = 365 * 24 * 3600 * 10**9
+_PATH_STREAMS = ("switch", "regime", "price", "jump_count", "jump_size")
+
+
+class SyntheticMarket:
+    """Seeded random market data on the trading sessions of a futures contract, rolling to the next contract
+    at expiry.
+
+    Log prices follow one of these models, with `volatility` and `drift` annualized over bar time:
+    - "gbm": geometric Brownian motion
+    - "jump": GBM plus normally distributed jumps arriving at `jump_intensity` a year
+    - "regime": GBM whose volatility is scaled by one of `regime_vols`, switching to another regime with
+      probability `1 - regime_persistence` each bar
+
+    Bars have `ticks_per_bar` price steps within them for their open, high, low and close. Ticks quote a
+    one-tick spread around the path, and trade at the bid or the ask with probability `trade_probability`.
+    Prices are rounded to the contract's tick size.
+
+    Rows are generated `chunk_size` at a time with vectorized draws, so data larger than memory can be
+    written out by `to_csv()` or `to_parquet()`. The same seed and chunk size always give the same data,
+    and fewer rows are the first rows of more.
+    """
+
+    def __init__(self, contract: Optional[FutureContract] = None, start: Optional[pd.Timestamp] = None,
+                 freq: str = "1min", model: str = "gbm", initial_price: float = 4000.0, drift: float = 0.0,
+                 volatility: float = 0.2, jump_intensity: float = 50.0, jump_mean: float = 0.0,
+                 jump_std: float = 0.005, regime_vols: Sequence[float] = (0.5, 1.0, 2.5),
+                 regime_persistence: float = 0.999, ticks_per_bar: int = 16, mean_volume: float = 100.0,
+                 trade_probability: float = 0.4, seed: Optional[int] = None, chunk_size: int = 1_000_000) -> None:
+        assert model in ("gbm", "jump", "regime"), f"Unknown model '{model}'"
+        assert ticks_per_bar > 0 and chunk_size > 0, "Ticks per bar and chunk size must be positive"
+        self.contract = contract or EminiContract(2023, 12, tick_size=0.25)
+        self.start = start
+        self.step_ns = pd.Timedelta(freq).value
+        assert self.step_ns > 0, "Frequency must be positive"
+        self.model = model
+        self.initial_price = initial_price
+        self.drift = drift
+        self.volatility = volatility
+        self.jump_intensity = jump_intensity
+        self.jump_mean = jump_mean
+        self.jump_std = jump_std
+        self.regime_vols = np.asarray(regime_vols, dtype=np.float64)
+        self.regime_persistence = regime_persistence
+        self.ticks_per_bar = ticks_per_bar
+        self.mean_volume = mean_volume
+        self.trade_probability = trade_probability
+        self.seed = seed
+        self.chunk_size = chunk_size
+
+    @property
+    def tz(self) -> str:
+        return self.contract.trading_timezone()
+
+    def _session_grid(self) -> Iterator[np.ndarray]:
+        """Row times in int64 ns, one session at a time, from `start` on through later contracts"""
+        contract = self.contract
+        start = self.start
+        if start is not None:
+            start = pd.Timestamp(start)
+            start = start.tz_localize(self.tz) if start.tz is None else start.tz_convert(self.tz)
+        while True:
+            for session in contract.trading_sessions(start=start):
+                times = np.arange(session.begin.value, session.end.value, self.step_ns, dtype=np.int64)
+                if start is not None:
+                    times = times[times >= start.value]
+                if len(times) > 0:
+                    yield times
+            start = contract.expiry_time.tz_convert(self.tz)
+            contract = contract.next
+
+    def times(self, n: int) -> pd.DatetimeIndex:
+        """Times of the first `n` rows"""
+        chunks = list(self._time_chunks(n))
+        return chunks[0].append(chunks[1:]) if chunks else pd.DatetimeIndex([], tz=self.tz)
+
+    def _time_chunks(self, n: int) -> Iterator[pd.DatetimeIndex]:
+        chunk_size = self.chunk_size
+        parts, size, remaining = [], 0, n
+        for times in self._session_grid():
+            while len(times) > 0 and remaining > 0:
+                take = min(len(times), chunk_size - size, remaining)
+                parts.append(times[:take])
+                times = times[take:]
+                size += take
+                remaining -= take
+                if size == chunk_size or remaining == 0:
+                    yield pd.DatetimeIndex(np.concatenate(parts).view("M8[ns]")).tz_localize("UTC").tz_convert(self.tz)
+                    parts, size = [], 0
+            if remaining == 0:
+                return
+
+    @staticmethod
+    def _streams(seed: np.random.SeedSequence, names: Sequence[str]) -> Dict[str, np.random.Generator]:
+        """A random stream per kind of draw, so the first rows of a chunk do not depend on its length"""
+        return {name: np.random.default_rng(child) for name, child in zip(names, seed.spawn(len(names)))}
+
+    def _log_returns(self, rngs: Dict[str, np.random.Generator], n: int, steps: int,
+                     regime: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """(n, steps) log returns, the volatility scale of each row and the regime after the last row"""
+        dt = self.step_ns / _NS_PER_YEAR
+        scale = np.ones(n)
+        if self.model == "regime":
+            m = len(self.regime_vols)
+            switches = rngs["switch"].random(n) >= self.regime_persistence
+            # A switch moves to one of the other regimes, picked uniformly
+            offsets = np.where(switches, rngs["regime"].integers(1, m, size=n) if m > 1 else 0, 0)
+            regimes = (regime + np.cumsum(offsets)) % m
+            scale = self.regime_vols[regimes]
+            regime = int(regimes[-1]) if n > 0 else regime
+
+        sigma = self.volatility * scale[:, None]
+        returns = (self.drift - 0.5 * sigma ** 2) * (dt / steps) + \
+            sigma * np.sqrt(dt / steps) * rngs["price"].standard_normal((n, steps))
+        if self.model == "jump":
+            counts = rngs["jump_count"].poisson(self.jump_intensity * dt, size=n)
+            jumps = rngs["jump_size"].normal(self.jump_mean * counts, self.jump_std * np.sqrt(counts))
+            returns[:, 0] += jumps
+        return returns, scale, regime
+
+    def _round(self, prices: np.ndarray) -> np.ndarray:
+        tick = self.contract.tick_size
+        return np.round(prices / tick) * tick
+
+    def iter_bars(self, n: int) -> Iterator[pd.DataFrame]:
+        """The first `n` bars in chunks of `Timestamp`, `Open`, `High`, `Low`, `Close` and `Volume`"""
+        seeds = np.random.SeedSequence(self.seed)
+        log_price, regime = np.log(self.initial_price), 0
+        for times in self._time_chunks(n):
+            rngs = self._streams(seeds.spawn(1)[0], _PATH_STREAMS + ("volume",))
+            returns, scale, regime = self._log_returns(rngs, len(times), self.ticks_per_bar, regime)
+            path = log_price + np.cumsum(returns, axis=None).reshape(returns.shape)
+            log_price = path[-1, -1]
+            prices = self._round(np.exp(path))
+            yield pd.DataFrame({
+                "Timestamp": times,
+                "Open": prices[:, 0],
+                "High": prices.max(axis=1),
+                "Low": prices.min(axis=1),
+                "Close": prices[:, -1],
+                "Volume": rngs["volume"].poisson(self.mean_volume * scale),
+            })
+
+    def iter_ticks(self, n: int) -> Iterator[pd.DataFrame]:
+        """The first `n` ticks in chunks of `Timestamp`, `Bid`, `Ask`, `Last` and `LastVol`, as read by
+        `TickBacktest.from_dataframe()`. Non-trade ticks have a NaN `Last` and zero `LastVol`"""
+        seeds = np.random.SeedSequence(self.seed)
+        tick = self.contract.tick_size
+        log_price, regime = np.log(self.initial_price), 0
+        for times in self._time_chunks(n):
+            rngs = self._streams(seeds.spawn(1)[0], _PATH_STREAMS + ("trade", "side", "volume"))
+            returns, scale, regime = self._log_returns(rngs, len(times), 1, regime)
+            path = log_price + np.cumsum(returns[:, 0])
+            log_price = path[-1]
+            bid = np.floor(np.exp(path) / tick) * tick
+            ask = bid + tick
+            is_trade = rngs["trade"].random(len(times)) < self.trade_probability
+            last = np.where(is_trade, np.where(rngs["side"].random(len(times)) < 0.5, bid, ask), np.nan)
+            last_vol = np.where(is_trade, 1 + rngs["volume"].poisson(np.maximum(self.mean_volume * scale - 1, 0)), 0)
+            yield pd.DataFrame({
+                "Timestamp": times,
+                "Bid": bid,
+                "Ask": ask,
+                "Last": last,
+                "LastVol": last_vol,
+            })
+
+    def bars(self, n: int) -> pd.DataFrame:
+        return pd.concat(self.iter_bars(n), ignore_index=True)
+
+    def ticks(self, n: int) -> pd.DataFrame:
+        return pd.concat(self.iter_ticks(n), ignore_index=True)
+
+    def _chunks(self, n: int, kind: str) -> Iterator[pd.DataFrame]:
+        assert kind in ("bars", "ticks"), f"Unknown kind '{kind}'"
+        return self.iter_bars(n) if kind == "bars" else self.iter_ticks(n)
+
+    @staticmethod
+    def _isoformat(times: pd.Series) -> np.ndarray:
+        """ISO 8601 strings with microseconds and UTC offsets. Much faster than letting `to_csv()` format
+        tz-aware times"""
+        local = times.dt.tz_localize(None).to_numpy()
+        utc = times.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy()
+        offsets, inverse = np.unique((local - utc) // np.timedelta64(1, "m"), return_inverse=True)
+        labels = np.array([f"{'+' if o >= 0 else '-'}{abs(o) // 60:02d}:{abs(o) % 60:02d}" for o in offsets.astype(int)])
+        return np.char.add(np.datetime_as_string(local, unit="us"), labels[inverse])
+
+    def to_csv(self, path: str, n: int, kind: str = "bars") -> str:
+        """Write `n` rows of bars or ticks to a CSV file, a chunk at a time"""
+        with open(path, "wt") as f:
+            for i, chunk in enumerate(self._chunks(n, kind)):
+                chunk["Timestamp"] = self._isoformat(chunk["Timestamp"])
+                chunk.to_csv(f, header=i == 0, index=False)
+        return os.path.abspath(path)
+
+    def to_parquet(self, path: str, n: int, kind: str = "bars") -> str:
+        """Write `n` rows of bars or ticks to a parquet file, one row group per chunk. Needs pyarrow"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in self._chunks(n, kind):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        return os.path.abspath(path)
@@ -45,6 +45,16 @@ class FutureContract(abc.ABC):
         self.multiplier = float(multiplier)
         self.tick_size = float(tick_size)
 
+    def _key(self) -> tuple:
+        return type(self), self.expiry_time, self.multiplier, self.tick_size
+
+    def __eq__(self, other) -> bool:
+        # Contracts built separately with the same terms are the same contract
+        return isinstance(other, FutureContract) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
     @property
     @abc.abstractmethod
     def expiry_time(self) -> pd.Timestamp:
@@ -1,3 +1,9 @@
 from .model import *
+from .ledger import *
 from .positions import *
+from .equity import *
+from .portfolio import *
 from .analysis import *
+from .timing import *
+from .strategy import *
+from .simulation import *
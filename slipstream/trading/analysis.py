@@ -1,19 +1,188 @@
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 from os import PathLike
 from pathlib import Path
-from typing import Any, Dict
+from typing import IO, Any, Dict, Optional, Sequence, Union
+import datetime as pydt
+import logging
+import math
+import os
+from .ledger import NAT_NS, TradeLedger, TradeObserver
+
+
+BOOTSTRAP_METRICS = ("Win Rate(%)", "Expectancy", "Max Drawdown")
+# Working set of a bootstrap chunk, and its bytes per trade and resample: two 8-byte matrices and a mask
+_BOOTSTRAP_CHUNK_BYTES = 1 << 26
+_BOOTSTRAP_ITEM_BYTES = 17
+
+
+def _bootstrap_chunk(pnl: np.ndarray, seed: np.random.SeedSequence, size: int) -> np.ndarray:
+    """(size, 3) win rate, expectancy and max drawdown of `size` resamples of `pnl`. Resamples are the
+    columns of one (trades, size) index matrix, and their metrics are reduced down the columns. At most
+    two (trades, size) matrices of 8-byte items are alive at once"""
+    n = len(pnl)
+    samples = pnl[np.random.default_rng(seed).integers(0, n, size=(n, size))]
+    win_rate = 100. * np.count_nonzero(samples > 0., axis=0) / n
+    equity = np.cumsum(samples, axis=0, out=samples)
+    # The curve starts at zero, as in `TradesAnalysis.metrics()`
+    drawdowns = np.maximum.accumulate(equity, axis=0)
+    np.maximum(drawdowns, 0., out=drawdowns)
+    np.subtract(drawdowns, equity, out=drawdowns)
+    return np.column_stack((win_rate, equity[-1] / n, drawdowns.max(axis=0)))
 
 
 class TradesAnalysis:
-    def __init__(self, trades_csv: PathLike) -> None:
-        self._df = pd.read_csv(trades_csv)
-        self._df["Entry Time"] = pd.to_datetime(
-            arg=self._df["Entry Time"], 
-        )
-        self._df["Exit Time"] = pd.to_datetime(
-            arg=self._df["Exit Time"], 
-        )
+    """Statistics of closed trades, read from a trades log, or taken from a DataFrame with the log's
+    columns or from a `TradeLedger` without touching disk.
+
+    Trades logs are CSV files, or Parquet (.parquet) and Arrow IPC (.arrow, .feather) files with the same
+    columns. They are read with the types of `Schema` and only the given `columns` if any. With `cache`, a
+    CSV log is cached in a sidecar file that is used while the log keeps the size and modification time it
+    had when cached.
+    """
+
+    Schema = {
+        "Type": "category",
+        "Size": np.int64,
+        "Profit": np.float64,
+        "Entry": np.float64,
+        "Exit": np.float64,
+        "Cost": np.float64,
+        "RunUp": np.float64,
+        "DrawDown": np.float64,
+    }
+    TimeColumns = ("Entry Time", "Exit Time")
+    # Times are logged by `Timestamp.isoformat(timespec='microseconds')`, followed by an optional UTC offset
+    _TimeWidth = len("2023-01-03T09:30:00.000000")
+    _OffsetWidth = len("+00:00")
+
+    def __init__(self, trades: Union[PathLike, str, IO, pd.DataFrame, TradeLedger],
+                 columns: Optional[Sequence[str]] = None, cache: bool = False) -> None:
+        if isinstance(trades, TradeLedger):
+            self._df = trades.to_dataframe()
+        elif isinstance(trades, pd.DataFrame):
+            self._df = trades
+        elif hasattr(trades, "to_pandas"):
+            # Arrow table
+            self._df = trades.to_pandas()
+        else:
+            self._df = self.read(trades, columns=columns, cache=cache)
+            return
+        if columns is not None:
+            self._df = self._df[list(columns)]
+
+    @classmethod
+    def read(cls, trades: Union[PathLike, str, IO], columns: Optional[Sequence[str]] = None,
+             cache: bool = False) -> pd.DataFrame:
+        """Trades log as a typed DataFrame"""
+        columns = None if columns is None else list(columns)
+        if not isinstance(trades, (str, PathLike)):
+            return cls._read_csv(trades, columns)
+
+        path = os.fspath(trades)
+        suffix = Path(path).suffix.lower()
+        if suffix == ".parquet":
+            return pd.read_parquet(path, columns=columns)
+        if suffix in (".arrow", ".feather"):
+            return pd.read_feather(path, columns=columns)
+        if not cache:
+            return cls._read_csv(path, columns)
+
+        cache_path = cls.cache_path(path)
+        stat = os.stat(path)
+        # Appending to a log changes its size even where modification times are coarse
+        source = {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+        if os.path.exists(cache_path):
+            if cache_path.endswith(".parquet"):
+                df = pd.read_parquet(cache_path, columns=columns)
+            else:
+                df = pd.read_pickle(cache_path)
+                df = df if columns is None else df[columns]
+            if all(df.attrs.get(key) == value for key, value in source.items()):
+                return df
+
+        # The cache holds every column, so any projection can be served from it later
+        df = cls._read_csv(path, None)
+        df.attrs.update(source)
+        tmp_path = f"{cache_path}.tmp"
+        try:
+            if cache_path.endswith(".parquet"):
+                df.to_parquet(tmp_path)
+            else:
+                df.to_pickle(tmp_path)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logging.warning(f"Could not cache {path}: {e}")
+        return df if columns is None else df[columns]
+
+    @staticmethod
+    def cache_path(path: str) -> str:
+        """Sidecar cache of a CSV trades log. Parquet if an engine is installed, pickle otherwise"""
+        try:
+            pd.io.parquet.get_engine("auto")
+            return f"{path}.parquet"
+        except ImportError:
+            return f"{path}.pkl"
+
+    @classmethod
+    def _read_csv(cls, source: Union[str, IO], columns: Optional[Sequence[str]]) -> pd.DataFrame:
+        df = pd.read_csv(source, usecols=columns, dtype=cls.Schema, engine="c")
+        for col in cls.TimeColumns:
+            if col in df:
+                df[col] = cls._parse_times(df[col])
+        return df
+
+    @classmethod
+    def _is_logged_format(cls, chars: np.ndarray) -> bool:
+        """Whether every row of characters is a time as logged, `YYYY-MM-DDTHH:MM:SS.ffffff` with an optional
+        `+HH:MM` offset, up to the digits which the numpy parse checks"""
+        width = cls._TimeWidth
+        separators = (chars[:, [4, 7, 10, 13, 16, 19]] == np.array(["-", "-", "T", ":", ":", "."])).all(axis=1)
+        naive = chars[:, width] == ""
+        offset = np.isin(chars[:, width], ["+", "-"]) & (chars[:, width + 3] == ":") & \
+            (chars[:, width + cls._OffsetWidth - 1] != "")
+        return bool((separators & (chars[:, width - 1] != "") & (chars[:, -1] == "") & (naive | offset)).all())
+
+    @staticmethod
+    def _parse_iso_times(times: pd.Series) -> pd.Series:
+        """Times in any ISO 8601 format, with the same timezones as `_parse_times()`"""
+        try:
+            parsed = pd.to_datetime(times, format="ISO8601")
+        except ValueError:
+            # Several UTC offsets are converted to UTC, but naive times are never given a timezone
+            if not times.str.contains(r"(?:[+-]\d\d:?\d\d|Z)$").all():
+                raise
+            parsed = pd.to_datetime(times, format="ISO8601", utc=True)
+        return parsed.dt.as_unit("ns")
+
+    @classmethod
+    def _parse_times(cls, times: pd.Series) -> pd.Series:
+        """Times of the trades log. Logs with one UTC offset give times in that offset, and logs with several
+        (e.g. across a daylight saving change) give UTC times. Times in other formats than the logged one,
+        such as `str(Timestamp)` of older logs, are parsed by pandas"""
+        width = cls._TimeWidth + cls._OffsetWidth
+        # One more character than the format, to tell longer text apart
+        text = times.to_numpy(dtype=f"U{width + 1}")
+        chars = text.view("U1").reshape(len(text), width + 1)
+        if not cls._is_logged_format(chars):
+            return cls._parse_iso_times(times)
+        try:
+            local = text.astype(f"U{cls._TimeWidth}").astype("M8[us]")
+        except ValueError:
+            return cls._parse_iso_times(times)
+        offsets = np.ascontiguousarray(chars[:, cls._TimeWidth:width]).view(f"U{cls._OffsetWidth}").ravel()
+        labels, inverse = np.unique(offsets, return_inverse=True)
+        if len(labels) == 1 and labels[0] == "":
+            return pd.Series(local, index=times.index, name=times.name).dt.as_unit("ns")
+        if "" in labels:
+            # Naive and offset times mixed
+            return cls._parse_iso_times(times)
+
+        minutes = np.array([(-1 if label[0] == "-" else 1) * (60 * int(label[1:3]) + int(label[4:6])) for label in labels])
+        utc = local - (minutes[inverse] * 60_000_000).astype("m8[us]")
+        tz = pydt.timezone(pydt.timedelta(minutes=int(minutes[0]))) if len(labels) == 1 else "UTC"
+        return pd.Series(utc, index=times.index, name=times.name).dt.as_unit("ns").dt.tz_localize("UTC").dt.tz_convert(tz)
 
     @property
     def trades(self) -> pd.DataFrame:
@@ -73,3 +242,212 @@ class TradesAnalysis:
             # "Sideline Durations(mins)": self._mean_std_min_max(self.sideline_durations / pd.Timedelta("1m")),
             "In-Market Time": f"{100. * self.in_market_time():.2f}%"
         }
+
+    def net_profits(self) -> np.ndarray:
+        """Profit of each trade less its cost"""
+        return self._df["Profit"].to_numpy(dtype=np.float64) - self._df["Cost"].to_numpy(dtype=np.float64)
+
+    def equity_curve(self, initial_equity: float = 0.0) -> pd.Series:
+        """Equity after each trade, indexed by exit time"""
+        return pd.Series(initial_equity + np.cumsum(self.net_profits()),
+                         index=pd.Index(self._df["Exit Time"], name="Exit Time"), name="Equity")
+
+    @staticmethod
+    def _longest_run(mask: np.ndarray) -> int:
+        """Length of the longest run of True"""
+        edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        return int((ends - starts).max()) if len(starts) > 0 else 0
+
+    def metrics(self, initial_equity: Optional[float] = None) -> Dict[str, float]:
+        """Risk and return metrics of net trade profits as plain numbers, for ranking and comparing runs.
+        Sharpe and Sortino ratios are per trade. Drawdowns are measured on the equity curve of trades, in
+        money, and as a fraction of peak equity if `initial_equity` is given (NaN unless it is positive)"""
+        pnl = self.net_profits()
+        n = len(pnl)
+        wins, losses = pnl > 0., pnl < 0.
+        gross_profit = float(pnl[wins].sum())
+        gross_loss = float(pnl[losses].sum())
+        win_count, loss_count = int(wins.sum()), int(losses.sum())
+
+        equity = np.cumsum(pnl)
+        # The curve starts at zero, so a first losing trade is already a drawdown
+        peaks = np.maximum.accumulate(np.concatenate(([0.], equity)))[1:]
+        drawdowns = peaks - equity
+        in_drawdown = drawdowns > 0.
+
+        mean = float(pnl.mean()) if n > 0 else np.nan
+        std = float(pnl.std(ddof=1)) if n > 1 else np.nan
+        downside = float(np.sqrt(np.mean(np.minimum(pnl, 0.) ** 2))) if n > 0 else np.nan
+        metrics = {
+            "Trades": n,
+            "Net Profit": float(equity[-1]) if n > 0 else 0.,
+            "Gross Profit": gross_profit,
+            "Gross Loss": gross_loss,
+            "Profit Factor": gross_profit / -gross_loss if loss_count > 0 else (np.inf if win_count > 0 else np.nan),
+            "Win Rate(%)": 100. * win_count / n if n > 0 else np.nan,
+            "Average Win": gross_profit / win_count if win_count > 0 else np.nan,
+            "Average Loss": gross_loss / loss_count if loss_count > 0 else np.nan,
+            "Expectancy": mean,
+            "Std Dev": std,
+            "Sharpe": mean / std if std > 0 else np.nan,
+            "Sortino": mean / downside if downside > 0 else np.nan,
+            "Max Drawdown": float(drawdowns.max()) if n > 0 else 0.,
+            "Max Drawdown Trades": self._longest_run(in_drawdown),
+            "Max Win Streak": self._longest_run(wins),
+            "Max Loss Streak": self._longest_run(losses),
+        }
+        if initial_equity is not None and initial_equity <= 0:
+            metrics["Max Drawdown(%)"] = np.nan
+        elif initial_equity is not None:
+            metrics["Max Drawdown(%)"] = 100. * float((drawdowns / (initial_equity + peaks)).max()) if n > 0 else 0.
+        return metrics
+
+    def bootstrap_samples(self, resamples: int = 10_000, seed: Optional[int] = None,
+                          chunk_size: Optional[int] = None, processes: int = 1) -> pd.DataFrame:
+        """Win rate, expectancy and max drawdown of `resamples` resamples of net trade profits, drawn with
+        replacement. Resamples are computed `chunk_size` at a time, sized by default to keep the working set
+        of a chunk around 64MB, and chunks are spread over `processes` processes. The same seed and chunk size always
+        give the same samples, whatever the number of processes"""
+        pnl = self.net_profits()
+        n = len(pnl)
+        assert n > 0, "No trades to resample"
+        assert resamples > 0, "Resamples must be positive"
+        chunk_size = chunk_size or max(1, _BOOTSTRAP_CHUNK_BYTES // (_BOOTSTRAP_ITEM_BYTES * n))
+        sizes = [min(chunk_size, resamples - start) for start in range(0, resamples, chunk_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        if processes == 1 or len(sizes) == 1:
+            chunks = list(map(_bootstrap_chunk, [pnl] * len(sizes), seeds, sizes))
+        else:
+            with ProcessPoolExecutor(max_workers=min(processes, len(sizes))) as pool:
+                chunks = list(pool.map(_bootstrap_chunk, [pnl] * len(sizes), seeds, sizes))
+        return pd.DataFrame(np.concatenate(chunks), columns=list(BOOTSTRAP_METRICS))
+
+    def bootstrap(self, resamples: int = 10_000, confidence: float = 0.95, seed: Optional[int] = None,
+                  chunk_size: Optional[int] = None, processes: int = 1) -> pd.DataFrame:
+        """Percentile bootstrap confidence intervals of win rate, expectancy and max drawdown, one row per
+        metric with its value over all trades, the bounds of the interval and the standard error of the
+        resamples. See `bootstrap_samples()`"""
+        assert 0 < confidence < 1, "Confidence must be between 0 and 1"
+        samples = self.bootstrap_samples(resamples, seed=seed, chunk_size=chunk_size, processes=processes)
+        metrics = self.metrics()
+        tail = (1. - confidence) / 2.
+        return pd.DataFrame({
+            "Value": [metrics[name] for name in BOOTSTRAP_METRICS],
+            "Lower": samples.quantile(tail).to_numpy(),
+            "Upper": samples.quantile(1. - tail).to_numpy(),
+            "Std Error": samples.std().to_numpy(),
+        }, index=pd.Index(BOOTSTRAP_METRICS, name="Metric"))
+
+
+class RunningStats:
+    """Count, mean, sample standard deviation, min and max of a stream of numbers, updated in O(1) by
+    Welford's algorithm"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = math.nan
+        self._m2 = 0.0
+        self.min = math.nan
+        self.max = math.nan
+
+    def add(self, x: float):
+        if math.isnan(x):
+            return
+        self.count += 1
+        if self.count == 1:
+            self.mean = self.min = self.max = x
+            return
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        elif x > self.max:
+            self.max = x
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+    def __str__(self) -> str:
+        return f"mean={self.mean} stdev={self.std} range=({self.min}, {self.max})"
+
+
+class OnlineTradesAnalysis(TradeObserver):
+    """The statistics of `TradesAnalysis.summary()`, kept up to date as trades close.
+
+    Subscribe it to a `PositionTracker` (or feed it with `add()`), and `summary()` costs the same after a
+    million trades as after ten.
+    """
+
+    Measures = ("Profits", "Run-Ups", "Draw-Downs")
+    Groups = ("All", "Win", "Loss")
+
+    def __init__(self) -> None:
+        self.stats: Dict[str, Dict[str, RunningStats]] = {
+            group: {measure: RunningStats() for measure in self.Measures} for group in self.Groups
+        }
+        self.neutrals = 0
+        self._market_ns = 0
+        self._first_entry_ns = None
+        self._last_exit_ns = None
+
+    @property
+    def count(self) -> int:
+        return self.stats["All"]["Profits"].count
+
+    def observe_trade(self, trades: TradeLedger, row: int) -> None:
+        self.add(
+            profit=float(trades.column("profit")[row]),
+            run_up=float(trades.column("run_up")[row]),
+            draw_down=float(trades.column("draw_down")[row]),
+            time_entered_ns=int(trades.column("time_entered")[row]),
+            time_exited_ns=int(trades.column("time_exited")[row])
+        )
+
+    def add(self, profit: float, run_up: float = math.nan, draw_down: float = math.nan,
+            time_entered_ns: int = NAT_NS, time_exited_ns: int = NAT_NS):
+        groups = ["All"]
+        if profit > 0.:
+            groups.append("Win")
+        elif profit < 0.:
+            groups.append("Loss")
+        else:
+            self.neutrals += 1
+        for group in groups:
+            stats = self.stats[group]
+            stats["Profits"].add(profit)
+            stats["Run-Ups"].add(run_up)
+            stats["Draw-Downs"].add(draw_down)
+
+        if time_entered_ns != NAT_NS and time_exited_ns != NAT_NS:
+            self._market_ns += time_exited_ns - time_entered_ns
+            if self._first_entry_ns is None or time_entered_ns < self._first_entry_ns:
+                self._first_entry_ns = time_entered_ns
+            if self._last_exit_ns is None or time_exited_ns > self._last_exit_ns:
+                self._last_exit_ns = time_exited_ns
+
+    def in_market_time(self) -> float:
+        if self._first_entry_ns is None or self._last_exit_ns == self._first_entry_ns:
+            return math.nan
+        return self._market_ns / (self._last_exit_ns - self._first_entry_ns)
+
+    def summary(self) -> Dict[str, Any]:
+        """Same entries as `TradesAnalysis.summary()`"""
+        trades = self.count
+        wins = self.stats["Win"]["Profits"].count
+        losses = self.stats["Loss"]["Profits"].count
+        summary = {
+            "Trades": trades,
+            "Win Count": wins,
+            "Win Rate(%)": round(100. * wins / trades, 2) if trades else math.nan,
+            "Loss Count": losses,
+            "Loss Rate(%)": round(100. * losses / trades, 2) if trades else math.nan,
+            "Neutrals": self.neutrals,
+        }
+        for group in self.Groups:
+            for measure in self.Measures:
+                summary[f"{measure} ({group})"] = str(self.stats[group][measure])
+        summary["In-Market Time"] = f"{100. * self.in_market_time():.2f}%"
+        return summary
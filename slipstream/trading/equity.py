@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+from .ledger import ColumnBuffer
+
+
+__all__ = [
+    "EquityCurve"
+]
+
+
+class EquityCurve(ColumnBuffer):
+    """Per-bar mark-to-market record of position and PnL.
+
+    Each `record()` writes scalars into preallocated buffers, which double in size when full.
+    Building the DataFrame is deferred until `to_dataframe()` is called at the end of a run.
+    """
+
+    def __init__(self, initial_equity: float = 0.0, capacity: int = 4096) -> None:
+        super().__init__(
+            dtypes={
+                "time": np.int64,
+                "position": np.int64,
+                "realized": np.float64,
+                "unrealized": np.float64,
+            },
+            capacity=capacity
+        )
+        self.initial_equity = float(initial_equity)
+        self.tz = None
+
+    def record(self, time_ns: int, position: int, realized: float, unrealized: float):
+        row = self._next_row()
+        cols = self._columns
+        cols["time"][row] = time_ns
+        cols["position"][row] = position
+        cols["realized"][row] = realized
+        cols["unrealized"][row] = unrealized
+
+    @property
+    def equity(self) -> np.ndarray:
+        return self.initial_equity + self.column("realized") + self.column("unrealized")
+
+    def max_drawdown(self) -> float:
+        """Largest peak-to-trough drop of marked-to-market equity"""
+        if len(self) == 0:
+            return 0.0
+        equity = self.equity
+        return float(np.max(np.maximum.accumulate(equity) - equity))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "Timestamp": self.datetime_column("time", tz=self.tz),
+                "Position": self.column("position"),
+                "Realized": self.column("realized"),
+                "Unrealized": self.column("unrealized"),
+                "Equity": self.equity,
+            },
+            copy=False
+        )
@@ -0,0 +1,244 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Type, Union
+import numpy as np
+import pandas as pd
+from .model import *
+
+
+__all__ = [
+    "ColumnBuffer",
+    "TradeLedger",
+    "TradeObserver",
+    "to_ns",
+    "NAT_NS",
+]
+
+
+NAT_NS = np.iinfo(np.int64).min
+
+
+def to_ns(time: Union[None, int, pd.Timestamp]) -> int:
+    """Convert a timestamp to int64 nanoseconds since epoch. None and NaT map to NAT_NS"""
+    if time is None:
+        return NAT_NS
+    if isinstance(time, (int, np.integer)):
+        return int(time)
+    return pd.Timestamp(time).value
+
+
+class ColumnBuffer:
+    """Append-only set of typed NumPy columns that grow geometrically.
+
+    Rows are written into preallocated buffers, so appending does not allocate until capacity runs out.
+    Views returned by `column()` stay valid after growth but will not see rows appended later.
+    """
+
+    def __init__(self, dtypes: Dict[str, type], capacity: int = 1024) -> None:
+        assert capacity > 0, "Capacity must be positive"
+        self._length = 0
+        self._capacity = capacity
+        self._columns: Dict[str, np.ndarray] = {name: np.empty(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def column(self, name: str) -> np.ndarray:
+        """Zero-copy view of the filled part of a column"""
+        return self._columns[name][:self._length]
+
+    def _next_row(self) -> int:
+        if self._length == self._capacity:
+            self.reserve(2 * self._capacity)
+        row = self._length
+        self._length += 1
+        return row
+
+    def reserve(self, capacity: int):
+        if capacity <= self._capacity:
+            return
+        for name, old in self._columns.items():
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._length] = old[:self._length]
+            self._columns[name] = new
+        self._capacity = capacity
+
+    def __getstate__(self) -> dict:
+        # Unused capacity is not pickled
+        state = self.__dict__.copy()
+        state["_capacity"] = max(self._length, 1)
+        state["_columns"] = {name: col[:state["_capacity"]].copy() for name, col in self._columns.items()}
+        return state
+
+    def datetime_column(self, name: str, tz=None) -> Union[np.ndarray, pd.Series]:
+        """Column of int64 nanoseconds as datetimes. Zero-copy unless a timezone is given"""
+        times = self.column(name).view("M8[ns]")
+        if tz is None:
+            return times
+        # Localizing to a timezone has to copy
+        return pd.Series(times).dt.tz_localize("UTC").dt.tz_convert(tz)
+
+    def _row_index(self, index: int) -> int:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(f"Row {index} out of range for {self._length} rows")
+        return index
+
+
+class TradeLedger(ColumnBuffer):
+    """Columnar record of closed trades.
+
+    Trades are stored as typed columns instead of one `Trade` object per trade. Indexing the ledger
+    builds a `Trade` view of a row on demand for compatibility with code that expects trade objects.
+    """
+
+    Types = (TradeType.Long, TradeType.Short)
+    TypeCodes = {TradeType.Long: 0, TradeType.Short: 1}
+
+    def __init__(self, capacity: int = 1024, trade_cls: Type[Trade] = Trade) -> None:
+        super().__init__(
+            dtypes={
+                "type": np.int8,
+                "size": np.int64,
+                "profit": np.float64,
+                "entry": np.float64,
+                "exit": np.float64,
+                "cost": np.float64,
+                "price_mult": np.float64,
+                "time_entered": np.int64,
+                "time_exited": np.int64,
+                "run_up": np.float64,
+                "draw_down": np.float64,
+            },
+            capacity=capacity
+        )
+        self.trade_cls = trade_cls
+        # Timezone of all trade times, set by the first trade with a time
+        self.tz = None
+        self._has_times = False
+
+    def append(self, trade_type: TradeType, size: int, entry: PriceLike, exit: PriceLike, cost: PriceLike = 0.0,
+               price_mult: float = 1.0, time_entered: Optional[pd.Timestamp] = None,
+               time_exited: Optional[pd.Timestamp] = None, run_up: float = np.nan, draw_down: float = np.nan) -> int:
+        """Record one closed trade and return its row index. Trade times must all be in the same timezone,
+        or all naive"""
+        self._check_tz(time_entered)
+        self._check_tz(time_exited)
+        entry, exit = float(entry), float(exit)
+        direction = 1 if trade_type == TradeType.Long else -1
+        row = self._next_row()
+        cols = self._columns
+        cols["type"][row] = self.TypeCodes[trade_type]
+        cols["size"][row] = size
+        cols["profit"][row] = direction * size * (exit - entry) * price_mult
+        cols["entry"][row] = entry
+        cols["exit"][row] = exit
+        cols["cost"][row] = float(cost)
+        cols["price_mult"][row] = price_mult
+        cols["time_entered"][row] = to_ns(time_entered)
+        cols["time_exited"][row] = to_ns(time_exited)
+        cols["run_up"][row] = run_up
+        cols["draw_down"][row] = draw_down
+        return row
+
+    def _check_tz(self, time: Union[None, int, pd.Timestamp]):
+        if time is None or isinstance(time, (int, np.integer)) or time is pd.NaT:
+            return
+        tz = time.tzinfo
+        if not self._has_times:
+            self.tz, self._has_times = tz, True
+        else:
+            assert tz is self.tz or str(tz) == str(self.tz), \
+                f"Trade time {time} is not in the timezone of earlier trades ({self.tz})"
+
+    def append_trade(self, trade: Trade) -> int:
+        return self.append(
+            trade_type=trade.type,
+            size=trade.size,
+            entry=trade.entry,
+            exit=trade.exit,
+            cost=trade.cost,
+            price_mult=trade.price_mult,
+            time_entered=trade.time_entered,
+            time_exited=trade.time_exited,
+            run_up=getattr(trade, "run_up", np.nan),
+            draw_down=getattr(trade, "draw_down", np.nan)
+        )
+
+    def _timestamp(self, ns: int) -> pd.Timestamp:
+        if ns == NAT_NS:
+            return pd.NaT
+        return pd.Timestamp(ns, tz=self.tz) if self.tz is not None else pd.Timestamp(ns)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Trade, List[Trade]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        row = self._row_index(index)
+        cols = self._columns
+        trade = self.trade_cls(
+            trade_type=self.Types[cols["type"][row]],
+            size=int(cols["size"][row]),
+            entry=float(cols["entry"][row]),
+            exit=float(cols["exit"][row]),
+            cost=float(cols["cost"][row]),
+            price_mult=float(cols["price_mult"][row])
+        )
+        trade.time_entered = self._timestamp(cols["time_entered"][row])
+        trade.time_exited = self._timestamp(cols["time_exited"][row])
+        trade.run_up = float(cols["run_up"][row])
+        trade.draw_down = float(cols["draw_down"][row])
+        return trade
+
+    def __iter__(self) -> Iterator[Trade]:
+        for i in range(self._length):
+            yield self[i]
+
+    def to_csv(self, path: str):
+        """Write trades in the format of the trades log"""
+        df = self.to_dataframe()
+        for col in ("Entry Time", "Exit Time"):
+            df[col] = self._isoformat(df[col])
+        df.to_csv(path, index=False)
+
+    @staticmethod
+    def _isoformat(times: pd.Series) -> pd.Series:
+        """Same strings as `Timestamp.isoformat(timespec='microseconds')`, formatted for the whole column"""
+        times = pd.Series(times)
+        text = times.dt.strftime("%Y-%m-%dT%H:%M:%S.%f")
+        if times.dt.tz is not None:
+            offset = times.dt.strftime("%z")
+            text = text + offset.str[:3] + ":" + offset.str[3:]
+        return text
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Trades as a DataFrame with the same columns as the trades log.
+
+        Numeric columns (and time columns when timestamps are timezone-naive) are views into the ledger buffers.
+        """
+        return pd.DataFrame(
+            {
+                "Type": pd.Categorical.from_codes(self.column("type"), categories=[t.name for t in self.Types]),
+                "Size": self.column("size"),
+                "Profit": self.column("profit"),
+                "Entry": self.column("entry"),
+                "Exit": self.column("exit"),
+                "Cost": self.column("cost"),
+                "Entry Time": self.datetime_column("time_entered", tz=self.tz),
+                "Exit Time": self.datetime_column("time_exited", tz=self.tz),
+                "RunUp": self.column("run_up"),
+                "DrawDown": self.column("draw_down"),
+            },
+            copy=False
+        )
+
+
+class TradeObserver(ABC):
+    """Gets each trade as it is recorded, see `PositionTracker.subscribe()`"""
+
+    @abstractmethod
+    def observe_trade(self, trades: TradeLedger, row: int) -> None:
+        raise NotImplementedError
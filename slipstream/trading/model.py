@@ -108,6 +108,7 @@ class Order:
     time_sent: pd.Timestamp = None
     on_execution: Optional[OrderExecutionCallback] = None
     activated: bool = True  # Used for Stop order types
+    time_sent_ns: Optional[int] = None  # time_sent as int64 nanoseconds, used by the simulator's clock
 
     def is_buying(self) -> bool:
         return True if self.action in (OrderAction.Buy, OrderAction.BuyToCover) else False
@@ -216,6 +217,9 @@ class BookState:
     ask: PriceLike
     last: PriceLike
     last_vol: Optional[int] = None
+    time: Optional[pd.Timestamp] = None
+    high: Optional[PriceLike] = None
+    low: Optional[PriceLike] = None
 
 
 class BookStateObserver(ABC):
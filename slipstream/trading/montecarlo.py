@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+from typing import Iterable, Optional, Union
+import numpy as np
+import pandas as pd
+from .model import *
+from .vectorized import ArrayLike, VectorizedBacktest
+
+
+__all__ = [
+    "MonteCarloFills",
+    "MonteCarloResult",
+]
+
+
+@dataclass
+class MonteCarloResult:
+    """Per-path outcomes of a Monte Carlo run.
+
+    `equity` has one row per path and one column per fill, marked to the fill price. It is only kept
+    when asked for, since it is the one result that grows with the number of fills.
+    """
+    final_equity: np.ndarray
+    max_drawdown: np.ndarray
+    equity: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.final_equity)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame({"Final Equity": self.final_equity, "Max DrawDown": self.max_drawdown}, copy=False)
+
+    def quantiles(self, q: Iterable[float] = (0.05, 0.25, 0.5, 0.75, 0.95)) -> pd.DataFrame:
+        return self.to_dataframe().quantile(list(q))
+
+
+class MonteCarloFills:
+    """Fill price and slippage scenarios of one signal strategy, evaluated for all paths at once.
+
+    Which bars fill depends only on signals and bar ranges, so fills are found once by a `VectorizedBacktest`.
+    Paths then differ only in the prices of market and stop-market fills: drawn from the bar's range, from
+    the stop to the bar's extreme for stops (or at the worst price, as `SimTrader` does), moved against the
+    trade by the backtest's `price_slip` plus a random slippage with mean `slippage`. Limit fills keep their
+    price. Draws for a batch of paths come from the seeded generator as one matrix, and equity of every path
+    follows from cumulative cash flows.
+    """
+
+    Fills = ("uniform", "worst")
+
+    def __init__(self, backtest: VectorizedBacktest, signals: ArrayLike, limits: Optional[ArrayLike] = None,
+                 stops: Optional[ArrayLike] = None, price_multiplier: float = 1.0, initial_equity: float = 0.0) -> None:
+        self.fills = backtest.fills(signals, limits=limits, stops=stops)
+        bars = self.fills["Bar"].to_numpy()
+        self.price_slip = backtest.price_slip
+        self.is_market = (self.fills["Type"] != OrderType.Limit.name).to_numpy()
+        buying = (self.fills["Action"] == OrderAction.Buy.name).to_numpy()
+        self.direction = np.where(buying, 1.0, -1.0)
+        # Range of prices a fill can take: stop-market fills are at or past their stop
+        stop = self.fills["Stop"].to_numpy(dtype=np.float64)
+        high, low = backtest.high[bars], backtest.low[bars]
+        self.high = np.where(~buying & (stop < high), stop, high)
+        self.low = np.where(buying & (stop > low), stop, low)
+        self.size = self.fills["Size"].to_numpy(dtype=np.float64)
+        self.cost = self.fills["Cost"].to_numpy(dtype=np.float64)
+        self.position = self.fills["Position"].to_numpy(dtype=np.float64)
+        self.price_multiplier = price_multiplier
+        self.initial_equity = initial_equity
+        # Whatever is still open at the end is marked to the middle of the last bar
+        self.last_mark = 0.5 * (backtest.high[-1] + backtest.low[-1]) if len(backtest) > 0 else 0.0
+
+    def __len__(self) -> int:
+        return len(self.fills)
+
+    def prices(self, n_paths: int, rng: np.random.Generator, fill: str = "uniform", slippage: float = 0.0,
+               slip_rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Fill prices of `n_paths` paths, one row per path. Slippage is drawn from `slip_rng` if given"""
+        assert fill in self.Fills, f"Fill must be one of {self.Fills}"
+        n = len(self)
+        if fill == "uniform":
+            base = self.low + rng.random((n_paths, n)) * (self.high - self.low)
+        else:
+            base = np.broadcast_to(np.where(self.direction > 0, self.high, self.low), (n_paths, n))
+        slip = self.price_slip
+        if slippage > 0:
+            slip = slip + (slip_rng or rng).exponential(slippage, size=(n_paths, n))
+        market = base + self.direction * slip
+        return np.where(self.is_market, market, self.fills["Price"].to_numpy(dtype=np.float64))
+
+    def equity(self, prices: np.ndarray) -> np.ndarray:
+        """Equity after each fill of each path, marked to the fill price"""
+        mult = self.price_multiplier
+        cash = -np.cumsum(prices * (self.direction * self.size * mult) + self.cost, axis=1)
+        return self.initial_equity + cash + prices * (self.position * mult)
+
+    def run(self, n_paths: int, seed: Union[None, int, np.random.Generator] = None, fill: str = "uniform",
+            slippage: float = 0.0, batch_size: int = 1024, keep_equity: bool = False) -> MonteCarloResult:
+        """Evaluate `n_paths` scenarios, `batch_size` paths at a time. Results do not depend on the batch size"""
+        assert n_paths > 0 and batch_size > 0, "Path and batch counts must be positive"
+        # Fill prices and slippage come from separate streams, so batches consume each stream in path order
+        if isinstance(seed, np.random.Generator):
+            seed = seed.integers(2 ** 63)
+        price_rng, slip_rng = (np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(2))
+        final = np.empty(n_paths)
+        drawdown = np.empty(n_paths)
+        equity = np.empty((n_paths, len(self))) if keep_equity else None
+        if len(self) == 0:
+            final[:] = self.initial_equity
+            drawdown[:] = 0.0
+        for start in range(0, n_paths if len(self) > 0 else 0, batch_size):
+            stop = min(start + batch_size, n_paths)
+            prices = self.prices(stop - start, price_rng, fill=fill, slippage=slippage, slip_rng=slip_rng)
+            curve = self.equity(prices)
+            final[start:stop] = curve[:, -1] + self.position[-1] * self.price_multiplier * (self.last_mark - prices[:, -1])
+            marks = np.column_stack((np.full(stop - start, self.initial_equity), curve, final[start:stop]))
+            drawdown[start:stop] = np.max(np.maximum.accumulate(marks, axis=1) - marks, axis=1)
+            if equity is not None:
+                equity[start:stop] = curve
+        return MonteCarloResult(final_equity=final, max_drawdown=drawdown, equity=equity)
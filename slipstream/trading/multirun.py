@@ -0,0 +1,162 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import glob
+import io
+import json
+import logging
+import os
+import posixpath
+import numpy as np
+import pandas as pd
+from .analysis import TradesAnalysis
+
+
+__all__ = [
+    "find_trades",
+    "read_s3_object",
+    "MultiRunAnalysis",
+]
+
+
+TRADES_PATTERN = "**/trades_*.csv"
+
+
+def _is_s3(path: str) -> bool:
+    return path.startswith("s3://")
+
+
+def find_trades(location: str, pattern: str = TRADES_PATTERN) -> List[str]:
+    """Trades logs under a directory or S3 prefix (`s3://bucket/prefix`), or matching a glob pattern"""
+    if _is_s3(location):
+        import s3fs
+        s3 = s3fs.S3FileSystem()
+        if not glob.has_magic(location):
+            location = posixpath.join(location.rstrip("/"), pattern)
+        return sorted(f"s3://{path}" for path in s3.glob(location[len("s3://"):]))
+    if not glob.has_magic(location):
+        location = os.path.join(location, pattern)
+    return sorted(glob.glob(location, recursive=True))
+
+
+def read_s3_object(key: str, s3=None) -> bytes:
+    """Content of an S3 object given as `bucket/key`, decompressed if it is tagged with zstd compression"""
+    if s3 is None:
+        import s3fs
+        s3 = s3fs.S3FileSystem()
+    with s3.open(key, "rb") as f:
+        data = f.read()
+    if s3.get_tags(key).get("compression", "") == "zstd":
+        import zstd
+        data = zstd.decompress(data)
+    return data
+
+
+def _read_bytes(path: str) -> Optional[bytes]:
+    """Content of a local or S3 file, or None if it does not exist. S3 objects tagged with zstd
+    compression are decompressed"""
+    if not _is_s3(path):
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    import s3fs
+    s3 = s3fs.S3FileSystem()
+    key = path[len("s3://"):]
+    if not s3.exists(key):
+        return None
+    return read_s3_object(key, s3)
+
+
+def _params_path(path: str) -> str:
+    join, dirname = (posixpath.join, posixpath.dirname) if _is_s3(path) else (os.path.join, os.path.dirname)
+    return join(dirname(path), "params.json")
+
+
+def _missing_metrics(initial_equity: Optional[float]) -> Dict[str, Any]:
+    """Metrics of a run without a readable trades log: all NaN"""
+    empty = TradesAnalysis(pd.DataFrame({"Profit": [], "Cost": []}))
+    return {name: np.nan for name in empty.metrics(initial_equity=initial_equity)}
+
+
+def _load_run(path: str, columns: Sequence[str],
+              initial_equity: Optional[float]) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """Parameters of a run, if it has a `params.json` next to its trades log, and its metrics. Runs whose
+    trades log is missing or empty (not even a header) get NaN metrics"""
+    params_data = _read_bytes(_params_path(path))
+    params = None if params_data is None else json.loads(params_data)
+    data = _read_bytes(path)
+    if not data:
+        logging.warning(f"Trades log {path} is {'missing' if data is None else 'empty'}")
+        return params, _missing_metrics(initial_equity)
+    trades = TradesAnalysis(io.BytesIO(data), columns=columns)
+    return params, trades.metrics(initial_equity=initial_equity)
+
+
+class MultiRunAnalysis:
+    """Metrics of many runs side by side, e.g. all the runs of a `ParameterSweep`.
+
+    Trades logs are found by `find_trades()` and loaded in a process pool, reading only the columns
+    metrics need. Each worker reduces its logs to a row of `TradesAnalysis.metrics()`, so only metrics
+    come back. Parameters of a run are read from the `params.json` next to its trades log, as written
+    by `ParameterSweep` and `WalkForward`, and show up as columns for `groupby()`.
+    """
+
+    Columns = ("Profit", "Cost")
+
+    def __init__(self, trades: Union[str, Iterable[str]], pattern: str = TRADES_PATTERN,
+                 initial_equity: Optional[float] = None, processes: Optional[int] = None) -> None:
+        self.paths = find_trades(trades, pattern) if isinstance(trades, str) else list(trades)
+        self.initial_equity = initial_equity
+        self.processes = processes or os.cpu_count()
+        self._metrics: Optional[pd.DataFrame] = None
+
+    def _run_names(self, has_params: List[bool]) -> List[str]:
+        """Paths relative to the directory common to all runs. Runs with parameters are named by their directory"""
+        if len(self.paths) == 0:
+            return []
+        path_mod = posixpath if _is_s3(self.paths[0]) else os.path
+        dirs = [path_mod.dirname(path) for path in self.paths]
+        common = path_mod.commonpath(dirs) if len(dirs) > 1 else dirs[0]
+        names = [path_mod.relpath(path, common) for path in self.paths]
+        return [path_mod.dirname(name) or name if params else name for name, params in zip(names, has_params)]
+
+    def metrics(self) -> pd.DataFrame:
+        """One row per run with its name, path, parameters and metrics. Loaded once and then cached"""
+        if self._metrics is not None:
+            return self._metrics
+
+        n = len(self.paths)
+        args = ([self.Columns] * n, [self.initial_equity] * n)
+        if self.processes == 1 or n <= 1:
+            results = list(map(_load_run, self.paths, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.processes, n)) as pool:
+                results = list(pool.map(_load_run, self.paths, *args, chunksize=max(1, n // (4 * self.processes))))
+
+        rows = []
+        names = self._run_names([params is not None for params, _ in results])
+        for name, path, (params, metrics) in zip(names, self.paths, results):
+            rows.append({"Run": name, "Path": path, **(params or {}), **metrics})
+        self._metrics = pd.DataFrame(rows)
+        return self._metrics
+
+    def analysis(self, run: str) -> TradesAnalysis:
+        """Full analysis of one run, by name"""
+        metrics = self.metrics()
+        path = metrics.loc[metrics["Run"] == run, "Path"]
+        assert len(path) == 1, f"No run named '{run}'"
+        return TradesAnalysis(io.BytesIO(_read_bytes(path.iloc[0])))
+
+    def rank(self, metric: str = "Sharpe", ascending: bool = False) -> pd.DataFrame:
+        """Runs from best to worst by a metric. Runs without it come last"""
+        return self.metrics().sort_values(metric, ascending=ascending, na_position="last", ignore_index=True)
+
+    def groupby(self, params: Union[str, List[str]], metrics: Sequence[str] = ("Net Profit", "Sharpe", "Max Drawdown"),
+                agg: Sequence[str] = ("mean", "std", "min", "max", "count")) -> pd.DataFrame:
+        """Aggregates of metrics over the runs sharing values of some parameters"""
+        params = [params] if isinstance(params, str) else list(params)
+        table = self.metrics()
+        missing = [p for p in params if p not in table]
+        assert not missing, f"Runs have no parameters {missing}"
+        return table.groupby(params)[list(metrics)].agg(list(agg))
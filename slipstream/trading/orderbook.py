@@ -0,0 +1,312 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional, Set, Tuple
+import math
+from .model import *
+
+
+__all__ = [
+    "PendingOrderBook"
+]
+
+
+_INF = math.inf
+
+# Index entries are (price, sequence number). Sequence numbers are unique and increase with placement
+# time, so entries never compare equal and fills can be replayed in placement order.
+_Entry = Tuple[float, int]
+
+
+class _TrailingStops:
+    """Unactivated trailing stops on one side of the market, grouped by their peak price.
+
+    Prices are kept in a signed space where peaks only ever rise: as-is for sell stops, negated for buy
+    stops. Each bar, groups whose peak was passed collapse into one group at the new extreme, so the
+    number of groups stays small and peak updates only touch orders whose peak actually moved.
+    """
+
+    def __init__(self, sign: int) -> None:
+        self.sign = sign
+        self._peaks: List[float] = []
+        self._groups: Dict[float, List[_Entry]] = {}
+
+    def add(self, order: Order, seq: int):
+        peak = self.sign * float(order.peak)
+        group = self._groups.get(peak)
+        if group is None:
+            insort(self._peaks, peak)
+            group = self._groups[peak] = []
+        insort(group, (float(order.stop), seq))
+
+    def activate(self, extreme: float, threshold: float, orders: Dict[int, Order]) -> List[int]:
+        """Move peaks up to `extreme` and return sequence numbers of orders whose trigger reached `threshold`"""
+        passed = bisect_left(self._peaks, extreme)
+        if passed > 0:
+            merged = []
+            for peak in self._peaks[:passed]:
+                merged.extend(self._groups.pop(peak))
+            del self._peaks[:passed]
+            new_peak = self.sign * extreme
+            for _, seq in merged:
+                order = orders.get(seq)
+                if order is not None:
+                    order.peak = new_peak
+            group = self._groups.get(extreme)
+            if group is None:
+                self._peaks.insert(0, extreme)
+                self._groups[extreme] = sorted(merged)
+            else:
+                group.extend(merged)
+                group.sort()
+
+        activated = []
+        for peak in list(self._peaks):
+            group = self._groups[peak]
+            # Trigger (peak - stop) falls as stop grows, so triggered orders are a prefix of the group
+            lo, hi = 0, len(group)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if peak - group[mid][0] >= threshold:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo > 0:
+                activated.extend(seq for _, seq in group[:lo])
+                del group[:lo]
+                if len(group) == 0:
+                    del self._groups[peak]
+                    self._peaks.remove(peak)
+        return activated
+
+    def retain(self, live: Dict[int, Order]):
+        """Drop entries of orders that are no longer pending"""
+        for peak in list(self._peaks):
+            group = [e for e in self._groups[peak] if e[1] in live]
+            if group:
+                self._groups[peak] = group
+            else:
+                del self._groups[peak]
+                self._peaks.remove(peak)
+
+    def clear(self):
+        self._peaks.clear()
+        self._groups.clear()
+
+
+class PendingOrderBook:
+    """Pending orders of a `SimTrader`, indexed by the price that fills or triggers them.
+
+    Orders wait in placement order until they are old enough to be filled. They are then filed into
+    price-sorted lists of buy/sell limits and buy/sell stops, so a bar's low and high only touch the
+    orders that can trigger or fill. Trailing stops are grouped by peak price. Orders linked into a
+    one-cancels-other group are cancelled together when one of them fills.
+    """
+
+    def __init__(self) -> None:
+        self._next_seq = 0
+        self._live: Dict[int, Order] = {}
+        self._seqs: Dict[int, int] = {}
+        self._waiting: Deque[int] = deque()
+        self._market: List[int] = []
+        self._buy_limits: List[_Entry] = []
+        self._sell_limits: List[_Entry] = []
+        self._buy_stops: List[_Entry] = []
+        self._sell_stops: List[_Entry] = []
+        self._buy_trails = _TrailingStops(sign=-1)
+        self._sell_trails = _TrailingStops(sign=1)
+        self._unactivated: Set[int] = set()
+        self._cancelled = 0
+        # One-cancels-other groups: sequence number -> group, and group -> sequence numbers
+        self._oco: Dict[int, int] = {}
+        self._oco_groups: Dict[int, List[int]] = {}
+        self._next_group = 0
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __iter__(self) -> Iterator[Order]:
+        return iter(list(self._live.values()))
+
+    @property
+    def orders(self) -> List[Order]:
+        """Pending orders in placement order"""
+        return list(self._live.values())
+
+    @property
+    def unactivated_count(self) -> int:
+        """Number of stop orders old enough to fill that have not been triggered"""
+        return len(self._unactivated)
+
+    def add(self, order: Order) -> int:
+        seq = self._next_seq
+        self._next_seq += 1
+        self._live[seq] = order
+        self._seqs[id(order)] = seq
+        self._waiting.append(seq)
+        return seq
+
+    def is_live(self, seq: int) -> bool:
+        return seq in self._live
+
+    def seq_of(self, order: Order) -> Optional[int]:
+        """Sequence number of a pending order"""
+        return self._seqs.get(id(order))
+
+    def group_of(self, seq: int) -> Optional[int]:
+        """One-cancels-other group of a pending order, if any"""
+        return self._oco.get(seq)
+
+    def has_group(self, group: int) -> bool:
+        return group in self._oco_groups
+
+    def remove(self, order: Order) -> bool:
+        """Cancel a pending order, leaving the rest of its one-cancels-other group. A group is gone once all
+        its orders are. Index entries of removed orders are dropped lazily"""
+        seq = self._seqs.get(id(order))
+        if seq is None:
+            return False
+        group = self._oco.pop(seq, None)
+        if group is not None:
+            seqs = self._oco_groups[group]
+            seqs.remove(seq)
+            if not any(s in self._live for s in seqs):
+                self.cancel_group(group)
+        self._cancel(seq)
+        return True
+
+    def _cancel(self, seq: int):
+        self.discard(seq)
+        self._cancelled += 1
+        if self._cancelled > 1024 and self._cancelled > len(self._live):
+            self._compact()
+
+    def link(self, orders: List[Order]) -> int:
+        """Make pending orders one-cancels-other, and return their group"""
+        group = self._next_group
+        self._next_group += 1
+        seqs = [self._seqs[id(order)] for order in orders]
+        self._oco_groups[group] = seqs
+        for seq in seqs:
+            self._oco[seq] = group
+        return group
+
+    def filled(self, seq: int) -> Optional[int]:
+        """Take a filled order off the book and cancel the rest of its OCO group. Returns the group, if any"""
+        self.discard(seq)
+        group = self._oco.pop(seq, None)
+        if group is not None:
+            self.cancel_group(group)
+        return group
+
+    def cancel_group(self, group: int):
+        for seq in self._oco_groups.pop(group, ()):
+            self._oco.pop(seq, None)
+            if seq in self._live:
+                self._cancel(seq)
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        # Orders are new objects after unpickling
+        self._seqs = {id(order): seq for seq, order in self._live.items()}
+
+    def _compact(self):
+        live = self._live
+        self._waiting = deque(seq for seq in self._waiting if seq in live)
+        self._market = [seq for seq in self._market if seq in live]
+        for index in (self._buy_limits, self._sell_limits, self._buy_stops, self._sell_stops):
+            index[:] = [e for e in index if e[1] in live]
+        self._buy_trails.retain(live)
+        self._sell_trails.retain(live)
+        self._cancelled = 0
+
+    def discard(self, seq: int):
+        order = self._live.pop(seq, None)
+        if order is not None:
+            self._seqs.pop(id(order), None)
+        self._unactivated.discard(seq)
+
+    def clear(self):
+        self._live.clear()
+        self._seqs.clear()
+        self._waiting.clear()
+        self._market.clear()
+        self._buy_limits.clear()
+        self._sell_limits.clear()
+        self._buy_stops.clear()
+        self._sell_stops.clear()
+        self._buy_trails.clear()
+        self._sell_trails.clear()
+        self._unactivated.clear()
+        self._cancelled = 0
+        self._oco.clear()
+        self._oco_groups.clear()
+
+    def promote(self, sent_before_ns: int):
+        """File waiting orders sent at or before given time (int64 nanoseconds) into the price indexes"""
+        waiting, live = self._waiting, self._live
+        while waiting:
+            order = live.get(waiting[0])
+            if order is not None:
+                assert order.time_sent_ns is not None, "Order has no sent time"
+                if order.time_sent_ns > sent_before_ns:
+                    break
+            seq = waiting.popleft()
+            if order is not None:
+                self._file(seq, order)
+
+    def reinstate(self, seq: int, order: Order):
+        """Put back an order returned by `collect_fillable()` that did not fill"""
+        if seq in self._live:
+            self._file(seq, order)
+
+    def _file(self, seq: int, order: Order):
+        if order.type == OrderType.Market or (order.type in (OrderType.StopMarket, OrderType.TrailingStopMarket) and order.activated):
+            self._market.append(seq)
+        elif order.type == OrderType.Limit or (order.type in (OrderType.StopLimit, OrderType.TrailingStopLimit) and order.activated):
+            insort(self._buy_limits if order.is_buying() else self._sell_limits, (float(order.limit), seq))
+        elif order.is_trailing_type():
+            assert order.peak is not None, "Peak price is not available for trailing order"
+            (self._buy_trails if order.is_buying() else self._sell_trails).add(order, seq)
+            self._unactivated.add(seq)
+        else:
+            insort(self._buy_stops if order.is_buying() else self._sell_stops, (float(order.stop), seq))
+            self._unactivated.add(seq)
+
+    def activate_stops(self, low: PriceLike, high: PriceLike):
+        """Trigger stops reached by the bar, filing them as market orders or limits"""
+        low, high = float(low), float(high)
+        live = self._live
+        activated: List[int] = []
+        i = bisect_right(self._buy_stops, (high, _INF))
+        activated.extend(seq for _, seq in self._buy_stops[:i])
+        del self._buy_stops[:i]
+        i = bisect_left(self._sell_stops, (low,))
+        activated.extend(seq for _, seq in self._sell_stops[i:])
+        del self._sell_stops[i:]
+        activated.extend(self._buy_trails.activate(extreme=-low, threshold=-high, orders=live))
+        activated.extend(self._sell_trails.activate(extreme=high, threshold=low, orders=live))
+        for seq in sorted(activated):
+            order = live.get(seq)
+            if order is not None:
+                order.activated = True
+                self._unactivated.discard(seq)
+                self._file(seq, order)
+
+    def collect_fillable(self, low: PriceLike, high: PriceLike, activate: bool = True) -> List[Tuple[int, Order]]:
+        """Trigger stops reached by the bar unless `activate` is off, then take market orders and limits
+        the bar can fill out of the indexes. Returns them as (sequence number, order) in placement order."""
+        if activate:
+            self.activate_stops(low, high)
+        low, high = float(low), float(high)
+        live = self._live
+        fillable = self._market
+        self._market = []
+        i = bisect_left(self._buy_limits, (high,))
+        fillable.extend(seq for _, seq in self._buy_limits[i:])
+        del self._buy_limits[i:]
+        i = bisect_right(self._sell_limits, (low, _INF))
+        fillable.extend(seq for _, seq in self._sell_limits[:i])
+        del self._sell_limits[:i]
+
+        fillable.sort()
+        return [(seq, live[seq]) for seq in fillable if seq in live]
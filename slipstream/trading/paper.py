@@ -0,0 +1,175 @@
+from collections import deque, namedtuple
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Deque, List, Optional
+import asyncio
+import pandas as pd
+from .model import *
+from .simulation import SimTrader
+
+
+__all__ = [
+    "AsyncSimTrader",
+    "PaperSession",
+    "replay_bars",
+    "tail_csv",
+    "read_socket",
+]
+
+
+class AsyncSimTrader(SimTrader):
+    """`SimTrader` driven from an event loop by a `PaperSession`.
+
+    Fills found while a bar is evaluated are queued, and handed to the `on_fill()` coroutine on the
+    event loop before `on_bar()` sees the bar. Unlike `on_order_filled()` in a backtest, `on_fill()` only
+    runs once all fills of the bar are done, so cancelling other orders from it cannot stop them filling
+    on the same bar. Reactions that must happen as each order fills go in an `on_order_filled()` override,
+    which is still called in place and queues the fill for `on_fill()` when it calls `super()`.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._fills: Deque[OrderExecution] = deque()
+
+    def on_order_filled(self, execution: OrderExecution):
+        """Called as each order fills, as in a backtest. Queues the fill for `on_fill()`"""
+        self._fills.append(execution)
+
+    async def on_fill(self, execution: OrderExecution):
+        """Subclasses override this coroutine to react to orders getting filled."""
+        pass
+
+    async def process_bar(self, bar, time_col: str = "Timestamp"):
+        self.eval_market(getattr(bar, time_col), high=bar.High, low=bar.Low)
+        fills = self._fills
+        while fills:
+            await self.on_fill(fills.popleft())
+        self.on_bar(bar)
+
+
+def _row_parser(header: List[str], time_col: str) -> Callable[[List[str]], Any]:
+    """Parser of CSV fields into a bar namedtuple with a Timestamp time and float prices"""
+    Bar = namedtuple("Bar", header, rename=True)
+    time_index = header.index(time_col)
+
+    def parse(fields: List[str]):
+        values = [pd.Timestamp(f) if i == time_index else float(f) if f else float("nan") for i, f in enumerate(fields)]
+        return Bar(*values)
+    return parse
+
+
+async def replay_bars(bars: pd.DataFrame, speed: Optional[float] = None,
+                      time_col: str = "Timestamp") -> AsyncIterator[Any]:
+    """Bars of a DataFrame as an async stream, at `speed` times their real-time pace or as fast as possible"""
+    loop = asyncio.get_running_loop()
+    times = pd.DatetimeIndex(bars[time_col]).as_unit("ns").asi8
+    start_wall = loop.time()
+    for i, bar in enumerate(bars.itertuples(index=False, name="Bar")):
+        if speed is not None:
+            ahead = (times[i] - times[0]) / 1e9 / speed - (loop.time() - start_wall)
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+        elif i % 256 == 0:
+            # Let consumers run
+            await asyncio.sleep(0)
+        yield bar
+
+
+async def tail_csv(path: str, time_col: str = "Timestamp", poll_interval: float = 0.05,
+                   idle_timeout: Optional[float] = None) -> AsyncIterator[Any]:
+    """Bars appended to a CSV file, read as they are written. Stops after `idle_timeout` seconds without a
+    new complete line, or never if it is None"""
+    loop = asyncio.get_running_loop()
+    parse = None
+    buffer = ""
+    last_data = loop.time()
+    with open(path, "rt") as f:
+        while True:
+            # File reads can block, so they run off the event loop
+            chunk = await asyncio.to_thread(f.read)
+            if chunk:
+                last_data = loop.time()
+                buffer += chunk
+                *lines, buffer = buffer.split("\n")
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    fields = line.strip().split(",")
+                    if parse is None:
+                        parse = _row_parser(fields, time_col)
+                    else:
+                        yield parse(fields)
+                continue
+            if idle_timeout is not None and loop.time() - last_data > idle_timeout:
+                return
+            await asyncio.sleep(poll_interval)
+
+
+async def read_socket(host: str, port: int, time_col: str = "Timestamp") -> AsyncIterator[Any]:
+    """Bars sent over TCP as CSV lines, header first, until the connection closes"""
+    reader, writer = await asyncio.open_connection(host, port)
+    parse = None
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            line = line.decode().strip()
+            if not line:
+                continue
+            if parse is None:
+                parse = _row_parser(line.split(","), time_col)
+            else:
+                yield parse(line.split(","))
+    finally:
+        writer.close()
+
+
+class PaperSession:
+    """Paper trading of many `AsyncSimTrader`s on one async bar stream.
+
+    Each trader gets its own bounded queue and consumer task, so a slow strategy only holds back its
+    own queue until it fills up. The source is read once and fanned out to all queues.
+    """
+
+    def __init__(self, source: AsyncIterable[Any], time_col: str = "Timestamp", queue_size: int = 1024) -> None:
+        self.source = source
+        self.time_col = time_col
+        self.queue_size = queue_size
+        self.traders: List[AsyncSimTrader] = []
+        self.bar_count = 0
+
+    def add(self, trader: AsyncSimTrader) -> AsyncSimTrader:
+        assert isinstance(trader, AsyncSimTrader), "Paper trading needs an AsyncSimTrader"
+        self.traders.append(trader)
+        return trader
+
+    async def _drive(self, trader: AsyncSimTrader, queue: asyncio.Queue):
+        # A failed trader keeps draining its queue, so the source is never blocked on it
+        error = None
+        while True:
+            bar = await queue.get()
+            if bar is None:
+                break
+            if error is None:
+                try:
+                    await trader.process_bar(bar, time_col=self.time_col)
+                except Exception as e:
+                    error = e
+        if error is not None:
+            raise error
+
+    async def run(self) -> List[str]:
+        """Trade until the source ends, and return the summary of each trader"""
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.traders]
+        consumers = [asyncio.create_task(self._drive(t, q)) for t, q in zip(self.traders, queues)]
+        try:
+            async for bar in self.source:
+                self.bar_count += 1
+                for queue in queues:
+                    await queue.put(bar)
+            for queue in queues:
+                await queue.put(None)
+            await asyncio.gather(*consumers)
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+        return [trader.summarize() for trader in self.traders]
@@ -0,0 +1,103 @@
+from typing import Dict, Hashable, Iterator
+from slipstream.market.futures import FutureContract
+from .model import *
+from .positions import PositionTracker
+
+
+__all__ = [
+    "PortfolioTracker"
+]
+
+
+class PortfolioTracker:
+    """Positions in many futures contracts sharing one equity.
+
+    Each contract gets its own lot book (a `PositionTracker`) priced with the contract's multiplier,
+    started on first use if it was not added. Equal contracts share a book.
+    Realized equity, unrealized PnL and margin in use are running totals updated by the change in the
+    one book touched, so an update costs the same however many contracts are held.
+    """
+
+    def __init__(self, initial_equity: float = 100000.0) -> None:
+        self.initial_equity = initial_equity
+        self.books: Dict[Hashable, PositionTracker] = {}
+        self._margins: Dict[Hashable, float] = {}
+        self._marks: Dict[Hashable, float] = {}
+        self._unrealized: Dict[Hashable, float] = {}
+        self._realized = 0.0
+        self._unrealized_total = 0.0
+        self._margin_total = 0.0
+
+    def add_contract(self, contract: FutureContract, margin: float = 0.0) -> PositionTracker:
+        """Start a book for given contract. `margin` is required per contract held, long or short"""
+        assert contract not in self.books, f"{contract} is already in portfolio"
+        book = PositionTracker(initial_equity=0.0, price_multiplier=contract.multiplier)
+        self.books[contract] = book
+        self._margins[contract] = float(margin)
+        self._unrealized[contract] = 0.0
+        return book
+
+    def book(self, contract: FutureContract) -> PositionTracker:
+        if contract not in self.books:
+            return self.add_contract(contract)
+        return self.books[contract]
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.books)
+
+    def __len__(self) -> int:
+        return len(self.books)
+
+    @property
+    def equity_value(self) -> float:
+        """Initial equity plus realized profits, net of trading costs"""
+        return self.initial_equity + self._realized
+
+    @property
+    def unrealized_pnl(self) -> float:
+        return self._unrealized_total
+
+    @property
+    def net_liquidation_value(self) -> float:
+        return self.equity_value + self._unrealized_total
+
+    @property
+    def margin_used(self) -> float:
+        return self._margin_total
+
+    @property
+    def available_funds(self) -> float:
+        return self.net_liquidation_value - self._margin_total
+
+    def add_execution(self, contract: FutureContract, execution: OrderExecution):
+        book = self.book(contract)
+        equity_before = float(book.equity_value)
+        side_before = book.open_positions.trade_type
+        held_before = abs(book.net_position)
+        book.add_execution(execution)
+        self._realized += float(book.equity_value) - equity_before
+        self._margin_total += (abs(book.net_position) - held_before) * self._margins[contract]
+        # A new position is worth its execution price until the next bar
+        same_position = side_before is not None and side_before == book.open_positions.trade_type
+        self.mark(contract, self._marks[contract] if same_position else execution.price)
+
+    def eval_market(self, contract: FutureContract, high: PriceLike, low: PriceLike):
+        """Track extremes of a contract's bar and mark its open lots to the bar midpoint"""
+        book = self.book(contract)
+        book.eval_market_prices(low, high)
+        self.mark(contract, 0.5 * (float(low) + float(high)))
+
+    def mark(self, contract: FutureContract, price: PriceLike):
+        """Value open lots of a contract at given price"""
+        price = float(price)
+        unrealized = self.book(contract).unrealized_pnl(price)
+        self._unrealized_total += unrealized - self._unrealized[contract]
+        self._unrealized[contract] = unrealized
+        self._marks[contract] = price
+
+    def unrealized_pnl_of(self, contract: FutureContract) -> float:
+        return self._unrealized.get(contract, 0.0)
+
+    def margin_of(self, contract: FutureContract) -> float:
+        book = self.books.get(contract)
+        return 0.0 if book is None else abs(book.net_position) * self._margins[contract]
@@ -1,11 +1,15 @@
 
 import io
+from bisect import bisect_left
+from collections import deque
 import numpy as np
 from slipstream.algos import *
 from slipstream.trading.model import *
+from slipstream.trading.ledger import TradeLedger, TradeObserver
 from enum import IntEnum
-from typing import Tuple, List, Any, Union
+from typing import Tuple, List, Any, Union, Deque, Iterator
 import logging
+import os
 
 logging.basicConfig(level=logging.INFO)
 
@@ -22,12 +26,18 @@ class MeasuredTrade(Trade):
     def eval_market_high_low(self, high: Optional[PriceLike], low: Optional[PriceLike]):
         if high is None or low is None:
             return
-        if self.type == TradeType.Long:
-            self.run_up = self.size * self.price_mult * max(0, high - self.entry)
-            self.draw_down = self.size * self.price_mult * min(0, low - self.entry)
+        self.run_up, self.draw_down = self.excursions(self.type, self.size * self.price_mult, self.entry, high, low)
+
+    @staticmethod
+    def excursions(trade_type: TradeType, scale: float, entry: PriceLike,
+                   high: Optional[PriceLike], low: Optional[PriceLike]) -> Tuple[float, float]:
+        """Return (run_up, draw_down) of a trade given market high and low while it was open"""
+        if high is None or low is None:
+            return np.nan, np.nan
+        if trade_type == TradeType.Long:
+            return scale * max(0, high - entry), scale * min(0, low - entry)
         else:
-            self.run_up = self.size * self.price_mult * max(0, self.entry - low)
-            self.draw_down = self.size * self.price_mult * min(0, self.entry - high)
+            return scale * max(0, entry - low), scale * min(0, entry - high)
 
     def fields_to_log(self) -> List[str]:
         return super().fields_to_log() + [f"{self.run_up}", f"{self.draw_down}"]
@@ -46,6 +56,7 @@ class Position:
         self.time_entered: Optional[pd.Timestamp] = None
         self.market_low: Optional[PriceLike] = None
         self.market_high: Optional[PriceLike] = None
+        self.first_bar: Optional[int] = None  # First market bar seen by the lot, numbered by MarketExtremes
 
     @property
     def size(self) -> int:
@@ -114,19 +125,165 @@ class Position:
         return f"<{self.trade_type.name} {self.size} at {self.entry}>"
 
 
+class MarketExtremes:
+    """Running market high and low since any earlier bar.
+
+    Bars are numbered as they are evaluated. Monotonic stacks of highs and lows answer "highest high
+    and lowest low since bar n" with a binary search, while adding a bar costs amortized O(1)
+    no matter how many lots are waiting on the answer.
+    """
+
+    def __init__(self) -> None:
+        self.bar_count = 0
+        self._high_bars: List[int] = []
+        self._highs: List[PriceLike] = []
+        self._low_bars: List[int] = []
+        self._lows: List[PriceLike] = []
+
+    def eval_market_prices(self, *prices):
+        if len(prices) == 0:
+            return
+        high, low = max(prices), min(prices)
+        bar = self.bar_count
+        self.bar_count += 1
+
+        highs, high_bars = self._highs, self._high_bars
+        while highs and highs[-1] <= high:
+            highs.pop()
+            high_bars.pop()
+        highs.append(high)
+        high_bars.append(bar)
+
+        lows, low_bars = self._lows, self._low_bars
+        while lows and lows[-1] >= low:
+            lows.pop()
+            low_bars.pop()
+        lows.append(low)
+        low_bars.append(bar)
+
+    def high_since(self, bar: int) -> Optional[PriceLike]:
+        i = bisect_left(self._high_bars, bar)
+        return self._highs[i] if i < len(self._highs) else None
+
+    def low_since(self, bar: int) -> Optional[PriceLike]:
+        i = bisect_left(self._low_bars, bar)
+        return self._lows[i] if i < len(self._lows) else None
+
+    def discard_before(self, bar: int):
+        """Forget bars no longer needed by anyone. Trims lazily to keep the cost amortized"""
+        for values, bars in ((self._highs, self._high_bars), (self._lows, self._low_bars)):
+            i = bisect_left(bars, bar)
+            if i > 64 and 2 * i > len(bars):
+                del values[:i]
+                del bars[:i]
+
+    def reset(self):
+        self._high_bars.clear()
+        self._highs.clear()
+        self._low_bars.clear()
+        self._lows.clear()
+
+
+class LotBook:
+    """FIFO book of open lots on one side of the market.
+
+    Aggregate size, average entry and cost are maintained as lots are added and reduced, so reading
+    the aggregate position costs the same however many lots are open.
+    """
+
+    def __init__(self) -> None:
+        self.lots: Deque[Position] = deque()
+        self.size = 0
+        self._notional = 0.0
+        self._cost = 0.0
+        self._aggregate: Optional[Position] = None
+
+    def __len__(self) -> int:
+        return len(self.lots)
+
+    def __iter__(self) -> Iterator[Position]:
+        return iter(self.lots)
+
+    def __getitem__(self, index: int) -> Position:
+        return self.lots[index]
+
+    @property
+    def notional(self) -> float:
+        """Sum of size times entry price over open lots"""
+        return self._notional
+
+    @property
+    def head(self) -> Position:
+        return self.lots[0]
+
+    @property
+    def trade_type(self) -> Optional[TradeType]:
+        return self.lots[0].trade_type if self.lots else None
+
+    def append(self, lot: Position):
+        assert not self.lots or lot.trade_type == self.lots[0].trade_type, "Lots in a book must be on the same side"
+        self.lots.append(lot)
+        self.size += lot.size
+        self._notional += lot.size * float(lot.entry)
+        self._cost += float(lot.cost)
+        self._aggregate = None
+
+    def reduce_head(self, size: int) -> Position:
+        """Reduce the oldest lot by given size, removing it from the book once empty"""
+        lot = self.lots[0]
+        assert 0 < size <= lot.size, f"Cannot reduce {lot} by {size}"
+        cost_before = float(lot.cost)
+        lot.size = lot.size - size
+        if lot.size == 0:
+            self.lots.popleft()
+        self.size -= size
+        if len(self.lots) == 0:
+            # Start over from exact zeros instead of accumulating rounding errors
+            self._notional = 0.0
+            self._cost = 0.0
+        else:
+            self._notional -= size * float(lot.entry)
+            self._cost -= cost_before - float(lot.cost)
+        self._aggregate = None
+        return lot
+
+    def aggregate(self) -> Optional[Position]:
+        """All open lots merged into a single position"""
+        if self._aggregate is None and len(self.lots) > 0:
+            head = self.lots[0]
+            self._aggregate = Position(
+                trade_type=head.trade_type,
+                size=self.size,
+                entry=head.entry if len(self.lots) == 1 else self._notional / self.size,
+                entry_cost=self._cost
+            )
+            self._aggregate.time_entered = head.time_entered
+        return self._aggregate
+
+
 class PositionTracker:
     def __init__(self, initial_equity: float = 10000.0, buy_cost: float = 0, sell_cost: float = 0, price_multiplier: float = 1.0):
-        self.trades: List[Trade] = []
-        self.open_positions: List[Position] = []
+        self.trades = TradeLedger(trade_cls=MeasuredTrade)
+        self.open_positions = LotBook()
         self.initial_equity = initial_equity
-        self.equity_value = initial_equity
-        self._aggregated_position = None
+        # A `Price`, as costs and profits are added to it
+        self.equity_value = Price(initial_equity)
         self._trades_sink: Optional[io.TextIOWrapper] = None
+        self._trades_path: Optional[str] = None
+        self._trades_offset = 0
         self._price_mult = price_multiplier
+        self.market_extremes = MarketExtremes()
+        self.observers: List[TradeObserver] = []
+
+    def subscribe(self, observer: TradeObserver) -> TradeObserver:
+        """Have `observer` see every trade recorded from now on"""
+        self.observers.append(observer)
+        return observer
 
     def start_recording_trades(self, path: str):
         if self._trades_sink is None:
             logging.info(f"Logging trades to {path}")
+            self._trades_path = path
             self._trades_sink = open(path, "wt+")
             self._trades_sink.reconfigure(write_through=True)
             self._trades_sink.write(",".join(MeasuredTrade.field_names_to_log()))
@@ -135,77 +292,140 @@ class PositionTracker:
 
     def stop_recording_trades(self):
         if self._trades_sink is not None:
+            self._trades_offset = self._trades_sink.tell()
             self._trades_sink.close()
+            self._trades_sink = None
+
+    def resume_recording_trades(self):
+        """Reopen the trades log for appending, dropping anything written after the last recorded offset.
+        Does nothing if trades are being recorded or never were."""
+        if self._trades_sink is not None or self._trades_path is None:
+            return
+        if not os.path.exists(self._trades_path):
+            logging.warning(f"Trades log {self._trades_path} is gone. Starting a new one")
+            path, self._trades_path = self._trades_path, None
+            self.start_recording_trades(path)
+            return
+        with open(self._trades_path, "r+b") as f:
+            f.truncate(self._trades_offset)
+        self._trades_sink = open(self._trades_path, "at")
+        self._trades_sink.reconfigure(write_through=True)
+
+    def __getstate__(self) -> dict:
+        # The open trades log is replaced by the offset written so far. Unpickling leaves the log alone, and
+        # `resume_recording_trades()` cuts it back to that offset when recording resumes
+        state = self.__dict__.copy()
+        sink = state.pop("_trades_sink")
+        if sink is not None:
+            state["_trades_offset"] = sink.tell()
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._trades_sink = None
 
     def is_long(self) -> bool:
-        return self.position is not None and self.position.trade_type == TradeType.Long
+        return self.open_positions.trade_type == TradeType.Long
         
     def is_short(self) -> bool:
-        return self.position is not None and self.position.trade_type == TradeType.Short
+        return self.open_positions.trade_type == TradeType.Short
         
     def is_flat(self) -> bool:
-        return self.position is None
+        return len(self.open_positions) == 0
 
     @property
     def position(self) -> Optional[Position]:
-        if self._aggregated_position is None and len(self.open_positions) > 0:
-            pos = self.open_positions[0]
-            self._aggregated_position = pos.duplicate()
-            for pos in self.open_positions[1:]:
-                self._aggregated_position.merge(pos)
-        return self._aggregated_position
+        return self.open_positions.aggregate()
+
+    @property
+    def net_position(self) -> int:
+        """Open size, positive when long and negative when short"""
+        book = self.open_positions
+        return book.size if book.trade_type == TradeType.Long else -book.size
+
+    def realized_pnl(self) -> float:
+        return float(self.equity_value) - self.initial_equity
+
+    def unrealized_pnl(self, price: PriceLike) -> float:
+        """Profit of open lots if they were closed at given price"""
+        book = self.open_positions
+        if len(book) == 0:
+            return 0.0
+        direction = 1 if book.trade_type == TradeType.Long else -1
+        return direction * (book.size * float(price) - book.notional) * self._price_mult
 
     def add_execution(self, execution: OrderExecution):
-        if len(self.open_positions) == 0 or self.position is not None and self.position.is_same_side(execution):
-            self.open_positions.append(Position.from_execution(execution))
+        if len(self.open_positions) == 0 or self.open_positions.head.is_same_side(execution):
+            self._open_lot(execution)
         else:
             residual_exec = self._reduce_position(execution)
             if residual_exec is not None:
                 assert len(self.open_positions) == 0
-                self.open_positions.append(Position.from_execution(residual_exec))
-        self._aggregated_position = None
+                self._open_lot(residual_exec)
         self.equity_value -= execution.cost
 
+    def _open_lot(self, execution: OrderExecution):
+        lot = Position.from_execution(execution)
+        lot.first_bar = self.market_extremes.bar_count
+        self.open_positions.append(lot)
+
+    def lot_market_high_low(self, lot: Position) -> Tuple[Optional[PriceLike], Optional[PriceLike]]:
+        """Market high and low seen since given open lot was created"""
+        extremes = self.market_extremes
+        return extremes.high_since(lot.first_bar), extremes.low_since(lot.first_bar)
+
     def _reduce_position(self, execution: OrderExecution) -> Optional[OrderExecution]:
         """Deduct from open positions given order execution. If currently open position is smaller than given execution,
         return the residual execution size."""
-        if len(self.open_positions) == 0:
-            return execution
-        position = self.open_positions.pop(0)
-        
+        while len(self.open_positions) > 0:
+            self._close_from_head(execution)
+            if execution.size == 0:
+                return None
+        return execution
+
+    def _close_from_head(self, execution: OrderExecution):
+        """Close as much of the oldest open lot as given execution covers, and record the trade"""
+        position = self.open_positions.head
         deduct_size = min(position.size, execution.size)
         assert deduct_size > 0
-        trade = MeasuredTrade(
+        market_high, market_low = self.lot_market_high_low(position)
+        run_up, draw_down = MeasuredTrade.excursions(
+            position.trade_type, deduct_size * self._price_mult, position.entry,
+            high=market_high, low=market_low
+        )
+        row = self.trades.append(
             trade_type=position.trade_type,
             size=deduct_size,
             entry=position.entry,
             exit=execution.price,
             cost=position.partial_cost(size=deduct_size) + execution.partial_cost(size=deduct_size),
-            price_mult=self._price_mult
+            price_mult=self._price_mult,
+            time_entered=position.time_entered if position.time_entered else execution.time_executed,
+            time_exited=execution.time_executed,
+            run_up=run_up,
+            draw_down=draw_down
         )
-        trade.time_entered = position.time_entered if position.time_entered else pd.Timestamp.now(tz="utc")
-        trade.time_exited = execution.time_executed
-        trade.eval_market_high_low(high=position.market_high, low=position.market_low)
-        self._add_trade(trade)
-        self.equity_value += trade.profit
-
-        position.size = max(0, position.size - deduct_size)
-        if position.size > 0:
-            self.open_positions.insert(0, position)
+        self._log_trade(row)
+        self.equity_value += Price(self.trades.column("profit")[row])
 
+        self.open_positions.reduce_head(deduct_size)
+        if len(self.open_positions) == 0:
+            self.market_extremes.reset()
+        elif self.open_positions.head is not position:
+            self.market_extremes.discard_before(self.open_positions.head.first_bar)
         execution.size = max(0, execution.size - deduct_size)
-        if execution.size == 0:
-            return None
-        else:
-            return self._reduce_position(execution)
 
 
     def _add_trade(self, trade: Trade):
+        self._log_trade(self.trades.append_trade(trade))
+
+    def _log_trade(self, row: int):
         if self._trades_sink is not None:
-            self._trades_sink.write(",".join(trade.fields_to_log()))
+            self._trades_sink.write(",".join(self.trades[row].fields_to_log()))
             self._trades_sink.write("\n")
             self._trades_sink.flush()
-        self.trades.append(trade)
+        for observer in self.observers:
+            observer.observe_trade(self.trades, row)
 
     def _to_loggable(self, field: Any) -> str:
         if type(field) is str and field.startswith("$"):
@@ -213,5 +433,5 @@ class PositionTracker:
         return str(field)
 
     def eval_market_prices(self, *prices):
-        for position in self.open_positions:
-            position.eval_market_prices(*prices)
+        if len(self.open_positions) > 0:
+            self.market_extremes.eval_market_prices(*prices)
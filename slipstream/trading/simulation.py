@@ -5,35 +5,50 @@ from ..algos import *
 import os
 from .model import *
 # from .pricing import *
-from typing import List, Dict, Union, Any, Optional
-from abc import ABC
+from typing import List, Dict, Tuple, Union, Any, Optional
 import datetime as pydt
+import uuid
 import numpy as np
 from .positions import PositionTracker
-from random import random as rrandom
+from .ledger import TradeLedger, to_ns
+from .equity import EquityCurve
+from .orderbook import PendingOrderBook
+from .strategy import Strategy
+from .analysis import TradesAnalysis
+from .timing import PhaseProfiler, StageTimings, perf_counter_ns
+from time import sleep
+import heapq
+import pickle
 
 
-class SimTrader:
+__all__ = [
+    "SimTrader",
+    "Simulation",
+]
+
+
+class SimTrader(Trader):
     DefaultSize = 1
     TradeCost = 0.85
     SyntheticDelay = pd.Timedelta(milliseconds=1)
     MinOrderFillDelay = pd.Timedelta(milliseconds=500)
 
-    def __init__(self, results_dir: str = "/tmp", *args, **kwargs) -> None:
-        self._prev_time = None
-        self._cur_time = None
-        self._pending_orders: List[Order] = []
+    def __init__(self, results_dir: Optional[str] = "/tmp", *args, **kwargs) -> None:
+        # The clock runs on int64 nanoseconds. Timestamps are only built when asked for.
+        self._prev_ns: Optional[int] = None
+        self._cur_ns: Optional[int] = None
+        self._cur_ts: Optional[pd.Timestamp] = None
+        self._tz = None
+        self._order_book = PendingOrderBook()
         self._last_known_prices: Optional[List[PriceLike]] = None
         self.tracker = PositionTracker(*args, **kwargs)
 
+        # Trades are written through to a CSV under `results_dir`, or only kept in memory if it is None
         self.results_dir = results_dir
-        self.trades_path = os.path.join(
-            self.results_dir,
-            f"trades_{pydt.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        )
-        self.tracker.start_recording_trades(
-            path=self.trades_path
-        )
+        self.trades_path: Optional[str] = None
+        if results_dir is not None:
+            self.trades_path = self._new_trades_path()
+            self.tracker.start_recording_trades(path=self.trades_path)
 
         # Parameters for trading logics
         self.can_go_flat = False
@@ -41,11 +56,51 @@ class SimTrader:
         # Forceful application of price slippage
         self.price_slip = 0.
 
+        # Market orders fill at the worst price of the bar, unless a generator is given to draw the
+        # fill price uniformly from the bar's range
+        self.fill_rng: Optional[np.random.Generator] = None
+
         # Collect execution delays for validatoin of trades
-        self._exec_delays: List[pd.Timedelta] = []
+        self._exec_delays: List[int] = []
 
         self._fill_slip_bar_count = 0
 
+        # Trade plans are managed by the order evaluator: plans by the sequence number of their entry,
+        # open plans by id as (plan, size, exit OCO group), plan ids by exit group, and heaps of
+        # (deadline, plan id) for hold periods counted in bars and in int64 nanoseconds
+        self._bar_count = 0
+        self._plan_entries: Dict[int, TradePlan] = {}
+        self._open_plans: Dict[int, Tuple[TradePlan, int, Optional[int]]] = {}
+        self._group_plans: Dict[int, int] = {}
+        self._bar_expiries: List[Tuple[int, int]] = []
+        self._ns_expiries: List[Tuple[int, int]] = []
+        self._next_plan = 0
+
+        # Position in the bars given to `run()`, which resumes from there
+        self.cursor = 0
+
+        # Optional per-bar mark-to-market record
+        self.equity_curve: Optional[EquityCurve] = None
+        # Optional timings of market evaluation phases
+        self.profiler: Optional[PhaseProfiler] = None
+
+    def _new_trades_path(self, results_dir: Optional[str] = None) -> str:
+        return os.path.join(
+            results_dir or self.results_dir,
+            # Runs started within the same second must not share a log
+            f"trades_{pydt.datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.csv"
+        )
+
+    def save_trades(self, path: Optional[str] = None) -> str:
+        """Write the trades so far as a trades log, by default to a new file under `results_dir` (or /tmp)"""
+        path = path or self._new_trades_path(self.results_dir or "/tmp")
+        self.trades.to_csv(path)
+        return path
+
+    def analysis(self) -> TradesAnalysis:
+        """Analysis of the trades so far, straight from memory"""
+        return TradesAnalysis(self.trades)
+
     def summarize(self) -> str:
         self.tracker.stop_recording_trades()
         output = (
@@ -55,62 +110,260 @@ class SimTrader:
         )
         return output
 
-    def eval_market(self, time: pd.Timestamp, high: float, low: float) -> None:
+    def _update_prices(self, time: Union[pd.Timestamp, int], high: float, low: float):
         self._last_known_prices = [low, high]
         self.tracker.eval_market_prices(low, high)
-        self.cur_time = time
-        self._eval_orders(low=low, high=high)
+
+    def _next_bar(self, time: Union[pd.Timestamp, int], high: float, low: float):
+        self._advance_clock(time)
+        self._bar_count += 1
+
+    def _fill_orders(self, time: Union[pd.Timestamp, int], high: float, low: float):
+        if self.profiler is None:
+            self._eval_orders(low=low, high=high)
+        else:
+            self._eval_orders(low=low, high=high, profiler=self.profiler)
+
+    def _expire_due_plans(self, time: Union[pd.Timestamp, int], high: float, low: float):
+        if self._bar_expiries or self._ns_expiries:
+            self._expire_plans()
+
+    def _record_bar_equity(self, time: Union[pd.Timestamp, int], high: float, low: float):
+        if self.equity_curve is not None:
+            self._record_equity(low=low, high=high)
+
+    # Phases of `eval_market()` in order, as (name the profiler reports, method)
+    _MarketPhases = (
+        ("eval_market_prices", "_update_prices"),
+        ("advance_clock", "_next_bar"),
+        ("eval_orders", "_fill_orders"),
+        ("expire_plans", "_expire_due_plans"),
+        ("record_equity", "_record_bar_equity"),
+    )
+
+    def eval_market(self, time: Union[pd.Timestamp, int], high: float, low: float) -> None:
+        """Evaluate pending orders against a bar. `time` may be a Timestamp or int64 nanoseconds since epoch"""
+        if self.profiler is not None:
+            self._eval_market_profiled(time, high, low)
+            return
+        self._update_prices(time, high, low)
+        self._next_bar(time, high, low)
+        self._fill_orders(time, high, low)
+        self._expire_due_plans(time, high, low)
+        self._record_bar_equity(time, high, low)
+
+    def _eval_market_profiled(self, time: Union[pd.Timestamp, int], high: float, low: float):
+        profiler = self.profiler
+        phases = [(name, getattr(self, method)) for name, method in self._MarketPhases]
+        begin = t0 = perf_counter_ns()
+        for name, phase in phases:
+            phase(time, high, low)
+            t1 = perf_counter_ns()
+            profiler.add(name, t1 - t0)
+            t0 = t1
+        profiler.add("eval_market", t0 - begin)
+
+    def start_profiling(self) -> PhaseProfiler:
+        """Time the phases of market evaluation and `on_bar()` from now on, and histogram the number of
+        pending orders per bar ("book_size") and fill delays in ns ("fill_delay_ns")"""
+        if self.profiler is None:
+            self.profiler = PhaseProfiler()
+        return self.profiler
+
+    def stop_profiling(self) -> Optional[PhaseProfiler]:
+        profiler, self.profiler = self.profiler, None
+        return profiler
+
+    def run(self, bars: pd.DataFrame, time_col: str = "Timestamp", snapshot_path: Optional[str] = None,
+            snapshot_every: Optional[int] = None) -> str:
+        """Evaluate the market over bars from `cursor` on, calling `on_bar()` after each one, and summarize the run.
+
+        `bars` needs `High` and `Low` columns and a time column. `on_bar()` gets each bar as a namedtuple.
+        With `snapshot_path`, a snapshot is saved every `snapshot_every` bars and at the end, so a run can
+        be resumed by `load_snapshot()`, or extended later by running it on the same bars with more appended.
+        """
+        assert "High" in bars and "Low" in bars, "Bars must have 'High' and 'Low' columns"
+        assert self.cursor <= len(bars), "Bars are fewer than those already evaluated"
+        start = self.cursor
+        bars = bars.iloc[start:]
+        times = pd.DatetimeIndex(bars[time_col]).as_unit("ns")
+        self._tz = times.tz
+        highs = bars["High"].tolist()
+        lows = bars["Low"].tolist()
+        self.tracker.resume_recording_trades()
+        for i, (ns, high, low, bar) in enumerate(
+                zip(times.asi8.tolist(), highs, lows, bars.itertuples(index=False, name="Bar")), start=start + 1):
+            self.eval_market(ns, high=high, low=low)
+            if self.profiler is None:
+                self.on_bar(bar)
+            else:
+                t0 = perf_counter_ns()
+                self.on_bar(bar)
+                self.profiler.add("on_bar", perf_counter_ns() - t0)
+            if snapshot_every is not None and i % snapshot_every == 0:
+                self.cursor = i
+                self.save_snapshot(snapshot_path)
+        self.cursor = start + len(bars)
+        if snapshot_path is not None:
+            self.save_snapshot(snapshot_path)
+        return self.summarize()
+
+    def save_snapshot(self, path: str):
+        """Pickle the trader to `path`. The file is replaced atomically, so a crash keeps the previous snapshot"""
+        assert path is not None, "Snapshot path is not set"
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load_snapshot(path: str) -> "SimTrader":
+        """Trader saved by `save_snapshot()`. Loading leaves its trades log alone. It is cut back to what was
+        written at the snapshot once `run()` resumes"""
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def start_recording_equity(self, capacity: int = 4096) -> EquityCurve:
+        """Mark position to the middle of each bar from now on, and record it in `equity_curve`"""
+        if self.equity_curve is None:
+            self.equity_curve = EquityCurve(initial_equity=self.tracker.initial_equity, capacity=capacity)
+        return self.equity_curve
+
+    def _record_equity(self, low: PriceLike, high: PriceLike):
+        tracker = self.tracker
+        if self.equity_curve.tz is None:
+            self.equity_curve.tz = self._tz
+        self.equity_curve.record(
+            time_ns=self._cur_ns,
+            position=tracker.net_position,
+            realized=tracker.realized_pnl(),
+            unrealized=tracker.unrealized_pnl(0.5 * (float(low) + float(high)))
+        )
 
     @property
     def cur_time(self) -> pd.Timestamp:
-        assert self._cur_time is not None, "'cur_time' accessed before iterations start"
-        return self._cur_time
+        assert self._cur_ns is not None, "'cur_time' accessed before iterations start"
+        if self._cur_ts is None:
+            self._cur_ts = pd.Timestamp(self._cur_ns, tz=self._tz) if self._tz is not None else pd.Timestamp(self._cur_ns)
+        return self._cur_ts
 
     @cur_time.setter
-    def cur_time(self, time: pd.Timestamp):
-        self._prev_time = self._cur_time
-        self._cur_time = time if self._cur_time is None else max(time, self._cur_time + self.SyntheticDelay)
+    def cur_time(self, time: Union[pd.Timestamp, int]):
+        self._advance_clock(time)
+
+    @property
+    def cur_time_ns(self) -> int:
+        assert self._cur_ns is not None, "'cur_time' accessed before iterations start"
+        return self._cur_ns
+
+    @property
+    def tz(self):
+        """Timezone of `cur_time` when the clock is driven by int64 nanoseconds"""
+        return self._tz
+
+    @tz.setter
+    def tz(self, tz):
+        self._tz = tz
+        self._cur_ts = None
+
+    @staticmethod
+    def _delay_ns(delay) -> int:
+        return delay.value if isinstance(delay, pd.Timedelta) else pd.Timedelta(delay).value
+
+    @property
+    def _synthetic_delay_ns(self) -> int:
+        # Read on use, so delays can be changed on an instance at any time
+        return self._delay_ns(self.SyntheticDelay)
+
+    @property
+    def _min_fill_delay_ns(self) -> int:
+        return self._delay_ns(self.MinOrderFillDelay)
+
+    def _advance_clock(self, time: Union[pd.Timestamp, int]):
+        """Move the clock to given time, but at least SyntheticDelay past the current time"""
+        if isinstance(time, (int, np.integer)):
+            ns, ts = int(time), None
+        else:
+            ts = time if isinstance(time, pd.Timestamp) else pd.Timestamp(time)
+            ns = ts.value
+            self._tz = ts.tz
+        self._prev_ns = self._cur_ns
+        if self._cur_ns is not None and ns < self._cur_ns + self._synthetic_delay_ns:
+            ns, ts = self._cur_ns + self._synthetic_delay_ns, None
+        self._cur_ns = ns
+        self._cur_ts = ts
 
     @property
     def execution_delays(self) -> pd.Series:
-        return pd.Series(self._exec_delays)
+        return pd.Series(pd.to_timedelta(np.asarray(self._exec_delays, dtype=np.int64), unit="ns"))
 
     @property
-    def trades(self) -> List[Trade]:
+    def trades(self) -> TradeLedger:
         return self.tracker.trades
 
     @property
     def cur_profit(self) -> PriceLike:
         return self.tracker.equity_value - self.tracker.initial_equity
 
-    def _eval_orders(self, low: PriceLike, high: PriceLike):
-        filled = []
-        for order in self._pending_orders:
-            if self._pending_duration(order) < self.MinOrderFillDelay:
-                continue
+    @property
+    def pending_orders(self) -> List[Order]:
+        """Orders placed and not yet filled or cancelled"""
+        return self._order_book.orders
 
-            if order.is_stop_type() and not order.activated:
-                self._eval_stop_activation(order, low=low, high=high)
+    _pending_orders = pending_orders
+
+    def _eval_orders(self, low: PriceLike, high: PriceLike, profiler: Optional[PhaseProfiler] = None):
+        book = self._order_book
+        book.promote(sent_before_ns=self._cur_ns - self._min_fill_delay_ns)
+        if profiler is None:
+            fillable = book.collect_fillable(low=low, high=high)
+        else:
+            profiler.observe("book_size", len(book))
+            t0 = perf_counter_ns()
+            book.activate_stops(low=low, high=high)
+            t1 = perf_counter_ns()
+            fillable = book.collect_fillable(low=low, high=high, activate=False)
+            profiler.add("activate_stops", t1 - t0)
+            profiler.add("collect_fillable", perf_counter_ns() - t1)
+
+        for seq, order in fillable:
+            if not book.is_live(seq):
+                # Cancelled by a callback on an earlier fill of this bar
+                continue
 
-            execution = None
             if self._is_active_market_order(order):
                 execution = self._eval_market_order(order, low=low, high=high)
-            elif self._is_active_limit_order(order):
-                execution = self._eval_limit_order(order, low=low, high=high)
             else:
-                self._fill_slip_bar_count += 1
+                execution = self._eval_limit_order(order, low=low, high=high)
+            if not execution:
+                book.reinstate(seq, order)
                 continue
 
-            if execution:
-                execution.time_received = order.time_sent
-                execution.time_executed = self.cur_time
-                self.tracker.add_execution(execution)
-                filled.append(order)
-                self._exec_delays.append(execution.time_executed - execution.time_received)
-                self.on_order_filled(execution=execution)
-
-        for order in filled:
-            self._pending_orders.remove(order)
+            if profiler is not None:
+                t0 = perf_counter_ns()
+            group = book.filled(seq)
+            execution.time_received = order.time_sent
+            execution.time_executed = self.cur_time
+            self.tracker.add_execution(execution)
+            delay_ns = self._cur_ns - order.time_sent_ns
+            self._exec_delays.append(delay_ns)
+            if group is not None:
+                self._open_plans.pop(self._group_plans.pop(group, None), None)
+            if self._plan_entries:
+                plan = self._plan_entries.pop(seq, None)
+                if plan is not None:
+                    self._open_plan(plan, execution)
+            if profiler is not None:
+                t1 = perf_counter_ns()
+            if order.on_execution is not None:
+                order.on_execution(execution)
+            self.on_order_filled(execution=execution)
+            if profiler is not None:
+                profiler.add("booking", t1 - t0)
+                profiler.add("callbacks", perf_counter_ns() - t1)
+                profiler.observe("fill_delay_ns", delay_ns)
+
+        self._fill_slip_bar_count += book.unactivated_count
 
     def _is_active_market_order(self, order: Order) -> bool:
         return order.type == OrderType.Market or \
@@ -120,35 +373,17 @@ class SimTrader:
         return order.type == OrderType.Limit or \
             (order.type in (OrderType.StopLimit, OrderType.TrailingStopLimit) and order.activated)
 
-    def _is_unactivated_order(self, order: Order) -> bool:
-        return (order.is_stop_type()) and not order.activated
-
-    def _eval_stop_activation(self, order: Order, low: PriceLike, high: PriceLike):
-        if order.activated:
-            return
-        
-        # Find trigger for stop order
-        if order.is_trailing_type():
-            assert order.peak is not None, "Peak price is not available for trailing order"
-            if order.is_buying():
-                order.peak = min(order.peak, low)
-                trigger = order.peak + order.stop
-            else:
-                order.peak = max(order.peak, high)
-                trigger = order.peak - order.stop
-        else:
-            # If not trailing, stop is absolute price
-            trigger = order.stop
-
-        if order.is_buying() and trigger <= high:
-            order.activated = True
-        elif not order.is_buying() and trigger >= low:
-            order.activated = True
- 
-
     def _eval_market_order(self, order: Order, low: PriceLike, high: PriceLike) -> Optional[OrderExecution]:
-        
-        # TODO: Should randomize fill price instead of always using worst
+        if self.fill_rng is not None:
+            low, high = float(low), float(high)
+            stop = self._stop_price(order)
+            if stop is not None:
+                # Activated stops fill at or past their stop
+                if order.is_buying():
+                    low = min(max(low, stop), high)
+                else:
+                    high = max(min(high, stop), low)
+            low = high = low + self.fill_rng.random() * (high - low)
 
         if order.action in [OrderAction.Buy, OrderAction.BuyToCover]:
             fill_price = (high + self.price_slip)
@@ -160,6 +395,14 @@ class SimTrader:
             cost=self.TradeCost * order.size
         )
 
+    @staticmethod
+    def _stop_price(order: Order) -> Optional[float]:
+        if order.type == OrderType.StopMarket:
+            return float(order.stop)
+        if order.type == OrderType.TrailingStopMarket:
+            return float(order.peak) + float(order.stop) if order.is_buying() else float(order.peak) - float(order.stop)
+        return None
+
     def _eval_limit_order(self, order: Order, low: PriceLike, high: PriceLike) -> Optional[OrderExecution]:
         fill_price = None
         if order.action in [OrderAction.Buy, OrderAction.BuyToCover]:
@@ -179,19 +422,14 @@ class SimTrader:
 
         return None
 
-    def _pending_duration(self, order: Order) -> pd.Timedelta:
-        assert order.time_sent is not None, "Order has no sent time"
-        return self.cur_time - order.time_sent
-
     def place_market(self, action: OrderAction, size: int = None) -> Order:
         size = size or self.DefaultSize
         order = Order(
             action=action,
             size=size,
-            type=OrderType.Market,
-            time_sent=self.cur_time
+            type=OrderType.Market
         )
-        self._pending_orders.append(order)
+        self._submit(order)
         return order
 
     def place_stop_market(self, action: OrderAction, stop: PriceLike, size: int = None) -> Order:
@@ -201,10 +439,9 @@ class SimTrader:
             size=size,
             type=OrderType.StopMarket,
             stop=stop,
-            activated=False,
-            time_sent=self.cur_time
+            activated=False
         )
-        self._pending_orders.append(order)
+        self._submit(order)
         return order
 
     def place_limit(self, action: OrderAction, limit: PriceLike, size: int = None) -> Order:
@@ -213,10 +450,9 @@ class SimTrader:
             action=action,
             size=size,
             type=OrderType.Limit,
-            limit=limit,
-            time_sent=self.cur_time
+            limit=limit
         )
-        self._pending_orders.append(order)
+        self._submit(order)
         return order
 
     def place_stop_limit(self, action: OrderAction, stop: PriceLike, limit: PriceLike, size: int = None) -> Order:
@@ -227,10 +463,9 @@ class SimTrader:
             type=OrderType.StopLimit,
             limit=limit,
             stop=stop,
-            activated=False,
-            time_sent=self.cur_time
+            activated=False
         )
-        self._pending_orders.append(order)
+        self._submit(order)
         return order
 
     def place_trail_stop_market(self, action: OrderAction, stop: PriceLike, size: int = None) -> Order:
@@ -245,12 +480,70 @@ class SimTrader:
             type=OrderType.TrailingStopMarket,
             stop=stop,
             peak=peak,
-            activated=False,
-            time_sent=self.cur_time
+            activated=False
         )
-        self._pending_orders.append(order)
+        self._submit(order)
         return order
 
+    def add_trade_plan(self, plan: TradePlan) -> Order:
+        """Place the entry of a plan, at market or at its limit. When the entry fills, its target, stop and
+        trailing stop are placed as one-cancels-other exits, and the position is closed at market once the
+        hold period runs out. An int hold period counts bars, a Timedelta counts from the entry fill."""
+        entry = Order(
+            action=OrderAction.Buy if plan.type == TradeType.Long else OrderAction.Sell,
+            size=plan.size,
+            type=OrderType.Market if plan.limit is None else OrderType.Limit,
+            limit=plan.limit
+        )
+        self._plan_entries[self._submit(entry)] = plan
+        return entry
+
+    def _open_plan(self, plan: TradePlan, execution: OrderExecution):
+        action = OrderAction.Sell if plan.type == TradeType.Long else OrderAction.Buy
+        size = execution.order.size
+        exits: List[Order] = []
+        if plan.target is not None:
+            exits.append(self.place_limit(action=action, limit=plan.target, size=size))
+        if plan.stop is not None:
+            exits.append(self.place_stop_market(action=action, stop=plan.stop, size=size))
+        if plan.trail_stop is not None:
+            exits.append(self.place_trail_stop_market(action=action, stop=plan.trail_stop, size=size))
+        hold = plan.hold_period
+        if not exits and hold is None:
+            return
+
+        plan_id = self._next_plan
+        self._next_plan += 1
+        group = self._order_book.link(exits) if exits else None
+        if group is not None:
+            self._group_plans[group] = plan_id
+        self._open_plans[plan_id] = (plan, size, group)
+        if hold is None:
+            return
+        if isinstance(hold, (int, np.integer)):
+            heapq.heappush(self._bar_expiries, (self._bar_count + int(hold), plan_id))
+        elif isinstance(hold, pd.Timestamp):
+            heapq.heappush(self._ns_expiries, (hold.value, plan_id))
+        else:
+            heapq.heappush(self._ns_expiries, (self._cur_ns + pd.Timedelta(hold).value, plan_id))
+
+    def _expire_plans(self):
+        """Close plans whose hold period ran out. Heap entries of plans that already exited are dropped here"""
+        for expiries, now in ((self._bar_expiries, self._bar_count), (self._ns_expiries, self._cur_ns)):
+            while expiries and expiries[0][0] <= now:
+                _, plan_id = heapq.heappop(expiries)
+                record = self._open_plans.pop(plan_id, None)
+                if record is None:
+                    continue
+                plan, size, group = record
+                if group is not None:
+                    self._order_book.cancel_group(group)
+                    del self._group_plans[group]
+                self.place_market(
+                    action=OrderAction.Sell if plan.type == TradeType.Long else OrderAction.Buy,
+                    size=size
+                )
+
     def go_long(self):
         # TODO: should reconcile with any pending orders
         self._clear_pending_orders()
@@ -258,10 +551,9 @@ class SimTrader:
             order_size = 2 * self.DefaultSize if self.tracker.is_short() else self.DefaultSize
             order = Order(
                 action=OrderAction.Buy,
-                size=order_size,
-                time_sent=self.cur_time
+                size=order_size
             )
-            self._pending_orders.append(order)
+            self._submit(order)
             # print(f"Long at {order.time_sent}")
 
     def go_short(self):
@@ -271,10 +563,9 @@ class SimTrader:
             order_size = 2 * self.DefaultSize if self.tracker.is_long() else self.DefaultSize
             order = Order(
                 action=OrderAction.Sell,
-                size=order_size,
-                time_sent=self.cur_time
+                size=order_size
             )
-            self._pending_orders.append(order)
+            self._submit(order)
             # print(f"Short at {order.time_sent}")
 
     def go_flat(self):
@@ -284,14 +575,48 @@ class SimTrader:
             action = OrderAction.Sell if self.tracker.is_long() else OrderAction.Buy
             order = Order(
                 action=action,
-                size=cur_pos.size,
-                time_sent=self.cur_time
+                size=cur_pos.size
             )
-            self._pending_orders.append(order)
+            self._submit(order)
             # print(f"Flat at {order.time_sent}")
 
+    def _submit(self, order: Order) -> int:
+        """Stamp order with the current time and queue it for evaluation. Returns its sequence number"""
+        if order.time_sent_ns is None:
+            order.time_sent_ns = self._cur_ns if order.time_sent is None else to_ns(order.time_sent)
+        if order.time_sent is None:
+            order.time_sent = self.cur_time
+        return self._order_book.add(order)
+
+    def cancel_order(self, order: Order) -> bool:
+        """Cancel a pending order. Returns False if the order is no longer pending. Cancelling a plan's entry
+        drops the plan, and cancelling all its exits leaves only its hold period to close it"""
+        book = self._order_book
+        seq = book.seq_of(order)
+        if seq is None:
+            return False
+        group = book.group_of(seq)
+        book.remove(order)
+        if self._plan_entries:
+            self._plan_entries.pop(seq, None)
+        if group is not None and not book.has_group(group):
+            plan_id = self._group_plans.pop(group, None)
+            record = self._open_plans.get(plan_id)
+            if record is not None:
+                plan, size, _ = record
+                if plan.hold_period is None:
+                    del self._open_plans[plan_id]
+                else:
+                    self._open_plans[plan_id] = (plan, size, None)
+        return True
+
     def _clear_pending_orders(self):
-        self._pending_orders = []
+        self._order_book.clear()
+        self._plan_entries.clear()
+        self._open_plans.clear()
+        self._group_plans.clear()
+        self._bar_expiries.clear()
+        self._ns_expiries.clear()
 
     #----------------------------------------------------------------
     # Callbacks to be implemented by subclass
@@ -300,3 +625,89 @@ class SimTrader:
     def on_order_filled(self, execution: OrderExecution):
         """Subclasses override this method to react to orders getting filled."""
         pass
+
+    def on_bar(self, bar):
+        """Subclasses override this method to trade on each bar given to `run()`."""
+        pass
+
+
+class Simulation(BookStatePublisher):
+    """Event-driven backtest of strategies on bars.
+
+    Each bar is evaluated by the trader first, so fills are known before strategies see the bar. It is
+    then published as a `BookState` to subscribed observers. Strategies subscribed here are attached to
+    the trader and send it `TradePlan`s. `source` is a DataFrame of bars, anything with `get_dataframe()`
+    such as `ESignalCSV`, or a path to an eSignal CSV file.
+
+    With `speed` set, bars are paced to `speed` times their real-time spacing; otherwise they run as fast
+    as possible. Time spent per stage is counted in `timings`.
+    """
+
+    def __init__(self, source: Any = None, trader: Optional[SimTrader] = None, speed: Optional[float] = None,
+                 time_col: str = "Timestamp") -> None:
+        assert speed is None or speed > 0, "Speed must be positive"
+        self.source = source
+        self.trader = trader if trader is not None else SimTrader()
+        self.speed = speed
+        self.time_col = time_col
+        self.observers: List[BookStateObserver] = []
+        self.timings = StageTimings()
+
+    def subscribe(self, observer: BookStateObserver):
+        if isinstance(observer, Strategy):
+            observer.attach(self.trader)
+        self.observers.append(observer)
+
+    def load_bars(self) -> pd.DataFrame:
+        source = self.source
+        assert source is not None, "Simulation has no data source"
+        if isinstance(source, pd.DataFrame):
+            return source
+        if isinstance(source, (str, os.PathLike)):
+            from slipstream.data import ESignalCSV
+            source = ESignalCSV(source)
+        return source.get_dataframe()
+
+    def launch(self) -> str:
+        """Run all bars through the trader and observers, and return the trader's summary"""
+        timings = self.timings
+        with timings.stage("load"):
+            bars = self.load_bars()
+        assert "High" in bars and "Low" in bars, "Bars must have 'High' and 'Low' columns"
+
+        times = pd.DatetimeIndex(bars[self.time_col]).as_unit("ns")
+        times_ns = times.asi8.tolist()
+        highs, lows = bars["High"].tolist(), bars["Low"].tolist()
+        closes = bars["Close"].tolist() if "Close" in bars else [0.5 * (h + l) for h, l in zip(highs, lows)]
+        volumes = bars["Volume"].tolist() if "Volume" in bars else [None] * len(bars)
+
+        trader, observers = self.trader, self.observers
+        trader.tz = times.tz
+        speed = self.speed
+        wall_start = perf_counter_ns()
+        market_ns = publish_ns = pace_ns = 0
+        for i, ns in enumerate(times_ns):
+            if speed is not None:
+                t0 = perf_counter_ns()
+                ahead = (ns - times_ns[0]) / speed - (t0 - wall_start)
+                if ahead > 0:
+                    sleep(ahead / 1e9)
+                pace_ns += perf_counter_ns() - t0
+
+            t0 = perf_counter_ns()
+            trader.eval_market(ns, high=highs[i], low=lows[i])
+            t1 = perf_counter_ns()
+            state = BookState(bid=closes[i], ask=closes[i], last=closes[i], last_vol=volumes[i],
+                              time=trader.cur_time, high=highs[i], low=lows[i])
+            for observer in observers:
+                observer.observe_book_state(state)
+            t2 = perf_counter_ns()
+            market_ns += t1 - t0
+            publish_ns += t2 - t1
+
+        timings.add("market", market_ns, count=len(times_ns))
+        timings.add("publish", publish_ns, count=len(times_ns))
+        if speed is not None:
+            timings.add("pace", pace_ns, count=len(times_ns))
+        with timings.stage("summarize"):
+            return trader.summarize()
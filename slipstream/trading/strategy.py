@@ -3,7 +3,25 @@ from .model import *
 from typing import Optional
 
 
-class Strategy(ABC):
+__all__ = [
+    "Strategy"
+]
+
+
+class Strategy(BookStateObserver):
+    """Base of strategies driven by a `Simulation`.
+
+    A strategy sees every bar as a `BookState` and trades by sending `TradePlan`s to the trader it was
+    attached to when it subscribed.
+    """
+    trader: Optional[Trader] = None
+
+    def attach(self, trader: Trader):
+        self.trader = trader
+
     def observe_book_state(self, book_state: BookState):
         ...
 
+    def send(self, plan: TradePlan):
+        assert self.trader is not None, "Strategy is not attached to a trader"
+        return self.trader.add_trade_plan(plan)
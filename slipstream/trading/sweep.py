@@ -0,0 +1,214 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+import datetime as pydt
+import itertools
+import json
+import logging
+import os
+import uuid
+import numpy as np
+import pandas as pd
+from .multirun import _missing_metrics
+from .simulation import SimTrader
+
+
+__all__ = [
+    "SharedBars",
+    "ParameterSweep",
+]
+
+
+# (column name, shared memory block name, dtype, timezone). Datetime columns are stored as int64
+# nanoseconds with dtype "M8[ns]", and the timezone is None for naive times and other columns.
+_ColumnSpec = Tuple[str, str, str, Optional[str]]
+
+
+class SharedBars:
+    """Numeric and datetime columns of a bar DataFrame copied once into shared memory.
+
+    Worker processes attach to the blocks by name and get a read-only DataFrame whose columns are views
+    of the shared buffers, so a sweep holds one copy of the data however many processes it runs.
+    """
+
+    def __init__(self, bars: pd.DataFrame) -> None:
+        self.length = len(bars)
+        self.spec: List[_ColumnSpec] = []
+        self._blocks: List[shared_memory.SharedMemory] = []
+        for name in bars.columns:
+            values, dtype, tz = self._column_values(bars[name])
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+            self._blocks.append(block)
+            self.spec.append((name, block.name, dtype, tz))
+
+    @staticmethod
+    def _column_values(column: pd.Series) -> Tuple[np.ndarray, str, Optional[str]]:
+        if isinstance(column.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(column.dtype):
+            index = pd.DatetimeIndex(column).as_unit("ns")
+            return index.asi8, "M8[ns]", None if index.tz is None else str(index.tz)
+        assert pd.api.types.is_numeric_dtype(column.dtype), f"Column '{column.name}' is neither numeric nor datetime"
+        values = column.to_numpy()
+        return values, values.dtype.str, None
+
+    @staticmethod
+    def attach(spec: List[_ColumnSpec], length: int) -> Tuple[pd.DataFrame, List[shared_memory.SharedMemory]]:
+        """Bars built on the shared blocks. The returned blocks must stay open while the bars are used"""
+        blocks, columns = [], {}
+        for name, block_name, dtype, tz in spec:
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            if dtype == "M8[ns]":
+                values = np.ndarray(length, dtype=np.int64, buffer=block.buf).view("M8[ns]")
+                values.flags.writeable = False
+                if tz is not None:
+                    # Localizing has to copy, which costs one int64 column per worker
+                    values = pd.DatetimeIndex(values).tz_localize("UTC").tz_convert(tz)
+            else:
+                values = np.ndarray(length, dtype=np.dtype(dtype), buffer=block.buf)
+                values.flags.writeable = False
+            columns[name] = values
+        return pd.DataFrame(columns, copy=False), blocks
+
+    def close(self):
+        """Release the shared blocks. Only the process that created them should call this"""
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks.clear()
+
+    def __enter__(self) -> "SharedBars":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Bars of the current worker process, attached once by the pool initializer
+_worker_bars: Optional[pd.DataFrame] = None
+_worker_blocks: List[shared_memory.SharedMemory] = []
+
+
+def _attach_worker(spec: List[_ColumnSpec], length: int):
+    global _worker_bars, _worker_blocks
+    _worker_bars, _worker_blocks = SharedBars.attach(spec, length)
+
+
+def _combinations(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Every combination of grid values, as parameters by name"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def _results_path(results_dir: str, kind: str) -> str:
+    """Unique directory for one run of a sweep or walk-forward, named by its kind and start time"""
+    return os.path.join(results_dir, f"{kind}_{pydt.datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}")
+
+
+def _configure(trader_cls: Type[SimTrader], params: Dict[str, Any], results_dir: Optional[str]) -> SimTrader:
+    """Create a trader and set given parameters on it.
+
+    Parameters are set on the instance after `__init__`, shadowing class attributes such as `DefaultSize`,
+    so traders have to read them when they are used. The trader stays an instance of `trader_cls`, which
+    keeps it picklable for snapshots.
+    """
+    trader = trader_cls(results_dir=results_dir)
+    for name, value in params.items():
+        setattr(trader, name, value)
+    return trader
+
+
+def _run_trader(trader_cls: Type[SimTrader], params: Dict[str, Any], run_dir: Optional[str], bars: pd.DataFrame,
+                time_col: str) -> Dict[str, Any]:
+    """Run a configured trader over given bars in `run_dir`, and return its summary row.
+    Nothing is written to disk if `run_dir` is None"""
+    if run_dir is not None:
+        os.makedirs(run_dir, exist_ok=True)
+        with open(os.path.join(run_dir, "params.json"), "w") as f:
+            json.dump(params, f, indent=2, default=str)
+
+    trader = _configure(trader_cls, params, run_dir)
+    trader.run(bars, time_col=time_col)
+    return _summary_row(params, trader.analysis().metrics(initial_equity=trader.tracker.initial_equity), trader)
+
+
+def _summary_row(params: Dict[str, Any], metrics: Dict[str, Any], trader: Optional[SimTrader] = None,
+                 error: Optional[str] = None) -> Dict[str, Any]:
+    """Summary row of a run. Runs that raised have no trader, and get NaN results and their error"""
+    return {
+        **params,
+        "Trades": metrics.pop("Trades"),
+        "Profit": np.nan if trader is None else float(trader.cur_profit),
+        "Equity": np.nan if trader is None else float(trader.tracker.equity_value),
+        "Fill Slip Bars": np.nan if trader is None else trader._fill_slip_bar_count,
+        **metrics,
+        "Trades Path": None if trader is None else trader.trades_path,
+        "Error": error,
+    }
+
+
+def _failed_row(run: str, params: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    """Summary row of a run that raised `error`, which is logged"""
+    logging.error(f"{run} with parameters {params} failed: {error!r}", exc_info=error)
+    return _summary_row(params, _missing_metrics(initial_equity=np.nan), error=repr(error))
+
+
+def _run_one(trader_cls: Type[SimTrader], run: str, params: Dict[str, Any], run_dir: Optional[str],
+             time_col: str) -> Dict[str, Any]:
+    return {"Run": run, **_run_trader(trader_cls, params, run_dir, _worker_bars, time_col)}
+
+
+class ParameterSweep:
+    """Run a `SimTrader` subclass over every combination of a parameter grid, in a process pool.
+
+    Parameters are set on each trader after it is created, whether they are class attributes of the
+    trader (e.g. `DefaultSize`) or instance attributes (e.g. `price_slip`). Bars are put in shared memory
+    once for all workers. Every run writes `params.json` and its trades log into its own `run_<n>`
+    directory under a unique sweep directory, and a row per run is appended to `summary.csv` as soon as
+    the run finishes. Without `write_trades`, runs keep their trades in memory and only the summary is
+    written. A run that raises is logged and keeps its row, with NaN results and the error in "Error".
+
+    The trader class has to be importable by worker processes, i.e. defined at module level.
+    """
+
+    def __init__(self, trader_cls: Type[SimTrader], grid: Dict[str, Iterable[Any]],
+                 results_dir: str = "/tmp", processes: Optional[int] = None, write_trades: bool = True) -> None:
+        assert issubclass(trader_cls, SimTrader), "Trader class must be a SimTrader"
+        self.write_trades = write_trades
+        self.trader_cls = trader_cls
+        self.grid = {name: list(values) for name, values in grid.items()}
+        self.processes = processes or os.cpu_count()
+        self.path = _results_path(results_dir, "sweep")
+        self.summary_path = os.path.join(self.path, "summary.csv")
+
+    def combinations(self) -> List[Dict[str, Any]]:
+        return _combinations(self.grid)
+
+    def run(self, bars: pd.DataFrame, time_col: str = "Timestamp") -> pd.DataFrame:
+        """Run the whole grid over given bars and return the summary, one row per run"""
+        assert time_col in bars, f"Bars have no '{time_col}' column"
+        combinations = self.combinations()
+        width = len(str(max(len(combinations) - 1, 0)))
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "grid.json"), "w") as f:
+            json.dump(self.grid, f, indent=2, default=str)
+
+        rows = []
+        with SharedBars(bars) as shared, ProcessPoolExecutor(
+                max_workers=self.processes, initializer=_attach_worker, initargs=(shared.spec, shared.length)) as pool:
+            futures = {}
+            for i, params in enumerate(combinations):
+                run = f"run_{i:0{width}d}"
+                run_dir = os.path.join(self.path, run) if self.write_trades else None
+                futures[pool.submit(_run_one, self.trader_cls, run, params, run_dir, time_col)] = (run, params)
+            for future in as_completed(futures):
+                run, params = futures[future]
+                try:
+                    row = future.result()
+                except Exception as e:
+                    # A failed run keeps its row, and the rest of the sweep goes on
+                    row = {"Run": run, **_failed_row(run, params, e)}
+                pd.DataFrame([row]).to_csv(self.summary_path, mode="a", header=len(rows) == 0, index=False)
+                rows.append(row)
+
+        return pd.DataFrame(rows).sort_values("Run", ignore_index=True)
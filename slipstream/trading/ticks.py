@@ -0,0 +1,141 @@
+from typing import Optional, Tuple, Type, Union
+import numpy as np
+import pandas as pd
+from .model import *
+from .simulation import SimTrader
+from .vectorized import ArrayLike, VectorizedBacktest
+
+
+__all__ = [
+    "TickBacktest"
+]
+
+
+class TickBacktest(VectorizedBacktest):
+    """Signal backtest replayed tick by tick against bid, ask and trade prints.
+
+    Ticks are columnar arrays: `bid` and `ask` quotes, and `last` and `last_vol` of a trade print (NaN
+    and 0 on quote-only ticks). No object is created per tick; a `BookState` is only built on request.
+    Signals work as in `VectorizedBacktest`, with one signal per tick. Orders reach the market `latency`
+    after the tick they are sent on, and keep exchange time (there is no synthetic clock).
+
+    A market order fills at the ask (buying) or bid (selling) of its arrival tick. A limit order that is
+    marketable on arrival fills there at the quote. Otherwise it rests behind a queue estimated as
+    `queue_factor` times the volume printed at its price over the `queue_lookback` ticks before arrival.
+    It fills at its limit once prints at that price have traded through the queue and its own size, or
+    as soon as a print or the opposite quote goes through its price.
+    """
+
+    ChunkSize = 4096
+
+    def __init__(self, times: ArrayLike, bid: ArrayLike, ask: ArrayLike, last: ArrayLike, last_vol: ArrayLike,
+                 trader_cls: Type[SimTrader] = SimTrader, latency: Union[int, pd.Timedelta] = 0,
+                 queue_lookback: int = 1000, queue_factor: float = 1.0) -> None:
+        # Open lots see the quotes as market high and low
+        super().__init__(times, high=ask, low=bid, trader_cls=trader_cls)
+        self.bid, self.ask = self.low, self.high
+        self.last = np.asarray(last, dtype=np.float64)
+        self.last_vol = np.asarray(last_vol, dtype=np.int64)
+        assert len(self.last) == len(self.last_vol) == len(self), "All tick columns must have the same length"
+        self.latency_ns = pd.Timedelta(latency).value
+        self.queue_lookback = queue_lookback
+        self.queue_factor = queue_factor
+
+    def _clock(self, times_ns: np.ndarray) -> np.ndarray:
+        # Ticks keep exchange time
+        return times_ns
+
+    @classmethod
+    def from_dataframe(cls, ticks: pd.DataFrame, time_col: str = "Timestamp", **kwargs) -> "TickBacktest":
+        """Ticks from a DataFrame with `Bid`, `Ask`, `Last` and `LastVol` columns"""
+        return cls(ticks[time_col], bid=ticks["Bid"].to_numpy(), ask=ticks["Ask"].to_numpy(),
+                   last=ticks["Last"].to_numpy(), last_vol=ticks["LastVol"].fillna(0).to_numpy(), **kwargs)
+
+    def book_state(self, tick: int) -> BookState:
+        last = self.last[tick]
+        return BookState(
+            bid=float(self.bid[tick]),
+            ask=float(self.ask[tick]),
+            last=None if np.isnan(last) else float(last),
+            last_vol=int(self.last_vol[tick]),
+            time=self._timestamp(self.clock_ns[tick])
+        )
+
+    def fills(self, signals: ArrayLike, limits: Optional[ArrayLike] = None,
+              stops: Optional[ArrayLike] = None) -> pd.DataFrame:
+        """Executions the signals lead to, one row per fill. Columns are those of `VectorizedBacktest.fills()`,
+        with ticks in place of bars"""
+        assert stops is None, "Stop orders are not supported on ticks"
+        n = len(self)
+        signals = np.asarray(signals, dtype=np.float64)
+        assert len(signals) == n, "signals must have one value per tick"
+        sent = np.flatnonzero(~np.isnan(signals))
+        targets = signals[sent].astype(np.int64)
+        assert np.all(np.abs(targets) <= 1), "Signals must be 1 (long), -1 (short), 0 (flat) or NaN"
+        limit_px = self._order_prices(limits, sent)
+        limit_px[targets == 0] = np.nan
+
+        # Orders can fill from their arrival tick up to the tick of the next signal, which cancels them
+        first = np.maximum(np.searchsorted(self.clock_ns, self.clock_ns[sent] + self.latency_ns, side="left"), sent + 1)
+        last = np.append(sent[1:], n - 1)
+        fill_tick = np.full(len(sent), -1, dtype=np.int64)
+        fill_px = np.full(len(sent), np.nan)
+        position = 0
+        size = self.trader_cls.DefaultSize
+        for k in range(len(sent)):
+            target = targets[k]
+            if target == position or first[k] > last[k]:
+                continue
+            buying = target > position
+            if np.isnan(limit_px[k]):
+                tick = first[k]
+                price = self.ask[tick] if buying else self.bid[tick]
+            else:
+                tick, price = self._limit_fill(first[k], last[k], buying, limit_px[k], abs(target - position) * size)
+            if tick >= 0:
+                fill_tick[k], fill_px[k] = tick, price
+                position = target
+
+        filled = fill_tick >= 0
+        targets, fill_tick, sent, fill_px, limit_px = (
+            targets[filled], fill_tick[filled], sent[filled], fill_px[filled], limit_px[filled])
+        prev = np.concatenate(([0], targets[:-1]))
+        buying = targets > prev
+        sizes = np.abs(targets - prev) * size
+        return pd.DataFrame({
+            "Bar": fill_tick,
+            "SentBar": sent,
+            "Action": np.where(buying, OrderAction.Buy.name, OrderAction.Sell.name),
+            "Type": np.where(np.isnan(limit_px), OrderType.Market.name, OrderType.Limit.name),
+            "Size": sizes,
+            "Price": fill_px,
+            "Cost": self.trader_cls.TradeCost * sizes,
+            "Position": targets * size,
+        })
+
+    def _limit_fill(self, first: int, last: int, buying: bool, limit: float, size: int) -> Tuple[int, float]:
+        """Tick and price at which a limit order arriving at `first` fills by `last`, or (-1, NaN)"""
+        if buying and self.ask[first] <= limit:
+            return first, float(self.ask[first])
+        if not buying and self.bid[first] >= limit:
+            return first, float(self.bid[first])
+
+        lookback = slice(max(0, first - self.queue_lookback), first)
+        needed = self.queue_factor * self.last_vol[lookback][self.last[lookback] == limit].sum() + size
+        traded = 0
+        start, chunk = first + 1, self.ChunkSize
+        while start <= last:
+            stop = min(start + chunk, last + 1)
+            prints = self.last[start:stop]
+            # NaN prints of quote-only ticks never compare true
+            if buying:
+                through = (self.ask[start:stop] < limit) | (prints < limit)
+            else:
+                through = (self.bid[start:stop] > limit) | (prints > limit)
+            queue = traded + np.cumsum(np.where(prints == limit, self.last_vol[start:stop], 0))
+            hit = through | (queue >= needed)
+            if hit.any():
+                return start + int(hit.argmax()), float(limit)
+            traded = queue[-1]
+            start, chunk = stop, 2 * chunk
+        return -1, np.nan
@@ -0,0 +1,128 @@
+from contextlib import contextmanager
+from time import perf_counter_ns
+from typing import Any, Dict, Iterator, Tuple
+import pandas as pd
+
+
+__all__ = [
+    "StageTimings",
+    "Histogram",
+    "PhaseProfiler",
+]
+
+
+class StageTimings:
+    """Call counts and cumulative wall time (ns) per named stage of a run.
+
+    Hot loops time a stage with two `perf_counter_ns()` calls and `add()`, which costs far less than
+    entering a context manager. `stage()` is there for coarse stages.
+    """
+
+    def __init__(self) -> None:
+        self.counts: Dict[str, int] = {}
+        self.totals_ns: Dict[str, int] = {}
+
+    def add(self, stage: str, elapsed_ns: int, count: int = 1):
+        self.counts[stage] = self.counts.get(stage, 0) + count
+        self.totals_ns[stage] = self.totals_ns.get(stage, 0) + elapsed_ns
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add(stage, perf_counter_ns() - start)
+
+    def reset(self):
+        self.counts.clear()
+        self.totals_ns.clear()
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        return {stage: {"calls": self.counts[stage], "total_ns": self.totals_ns[stage]} for stage in self.counts}
+
+    def to_dataframe(self) -> pd.DataFrame:
+        stages = list(self.counts)
+        calls = [self.counts[s] for s in stages]
+        totals = [self.totals_ns[s] for s in stages]
+        return pd.DataFrame({
+            "Stage": stages,
+            "Calls": calls,
+            "Total (s)": [t / 1e9 for t in totals],
+            "Mean (us)": [t / 1e3 / max(c, 1) for t, c in zip(totals, calls)],
+        })
+
+    def __str__(self) -> str:
+        return "\n".join(
+            f"{stage:>16} : {self.counts[stage]} calls, {self.totals_ns[stage] / 1e9:.3f}s"
+            for stage in self.counts
+        )
+
+
+class Histogram:
+    """Counts of non-negative integers in power-of-two buckets: 0, 1, 2-3, 4-7, 8-15, ..."""
+
+    def __init__(self) -> None:
+        # Bucket index (the bit length of values in it) -> count
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, value: int):
+        bucket = int(value).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def __len__(self) -> int:
+        return sum(self.buckets.values())
+
+    @staticmethod
+    def bounds(bucket: int) -> Tuple[int, int]:
+        """Smallest and largest value of a bucket"""
+        return (0, 0) if bucket == 0 else (1 << (bucket - 1), (1 << bucket) - 1)
+
+    def to_dict(self) -> Dict[int, int]:
+        """Count per bucket, keyed by the smallest value of the bucket"""
+        return {self.bounds(b)[0]: self.buckets[b] for b in sorted(self.buckets)}
+
+    def to_dataframe(self) -> pd.DataFrame:
+        buckets = sorted(self.buckets)
+        return pd.DataFrame({
+            "From": [self.bounds(b)[0] for b in buckets],
+            "To": [self.bounds(b)[1] for b in buckets],
+            "Count": [self.buckets[b] for b in buckets],
+        })
+
+
+class PhaseProfiler:
+    """Per-phase timings of a trader's market evaluation, and histograms of values seen along the way.
+
+    A trader only pays for profiling while its profiler is set, see `SimTrader.start_profiling()`.
+    """
+
+    def __init__(self) -> None:
+        self.phases = StageTimings()
+        self.histograms: Dict[str, Histogram] = {}
+
+    def add(self, phase: str, elapsed_ns: int, count: int = 1):
+        self.phases.add(phase, elapsed_ns, count=count)
+
+    def observe(self, name: str, value: int):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(value)
+
+    def reset(self):
+        self.phases.reset()
+        self.histograms.clear()
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            "phases": self.phases.to_dict(),
+            "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+        }
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Timings per phase. Histograms are in `histograms`"""
+        return self.phases.to_dataframe().rename(columns={"Stage": "Phase"})
+
+    def __str__(self) -> str:
+        return str(self.phases)
@@ -0,0 +1,172 @@
+from typing import Optional, Type, Union
+import numpy as np
+import pandas as pd
+from .model import *
+from .positions import PositionTracker
+from .simulation import SimTrader
+
+
+__all__ = [
+    "VectorizedBacktest"
+]
+
+
+ArrayLike = Union[np.ndarray, pd.Series, list]
+
+
+class VectorizedBacktest:
+    """Whole-series backtest of signal rules with `SimTrader` fill semantics.
+
+    Signals say what a `SimTrader` strategy would do after each bar is evaluated: 1 is `go_long()`,
+    -1 is `go_short()`, 0 is `go_flat()` and NaN does nothing. Like `go_*()`, a signal cancels the pending
+    order and, unless already at the target, sends an order for the difference in `DefaultSize` units.
+    Where `limits` (or `stops`) has a finite price on a long or short signal, a limit (or stop-market)
+    order is sent at that price instead of a market order.
+
+    Fill bars of all orders are found with chunked NumPy passes over the series, honouring the synthetic
+    clock, `MinOrderFillDelay`, worst-price market fills and `price_slip`. Only the resulting fills are
+    booked one by one into a `PositionTracker`, which produces the same trade ledger as `SimTrader`.
+    """
+
+    ChunkSize = 64
+
+    def __init__(self, times: ArrayLike, high: ArrayLike, low: ArrayLike,
+                 trader_cls: Type[SimTrader] = SimTrader, price_slip: float = 0.0) -> None:
+        index = pd.DatetimeIndex(times).as_unit("ns")
+        self.tz = index.tz
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        assert len(index) == len(self.high) == len(self.low), "times, high and low must have the same length"
+        self.trader_cls = trader_cls
+        self.price_slip = price_slip
+        self.clock_ns = self._clock(index.asi8)
+
+    def __len__(self) -> int:
+        return len(self.high)
+
+    def _clock(self, times_ns: np.ndarray) -> np.ndarray:
+        """Times of the bars in int64 ns as the trader sees them, on `SimTrader`'s synthetic clock"""
+        return self._synthetic_clock(times_ns, pd.Timedelta(self.trader_cls.SyntheticDelay).value)
+
+    @staticmethod
+    def _synthetic_clock(times_ns: np.ndarray, delay_ns: int) -> np.ndarray:
+        """Vectorized `SimTrader.cur_time`, where each bar is at least `delay_ns` after the previous one"""
+        steps = np.arange(len(times_ns), dtype=np.int64) * delay_ns
+        return np.maximum.accumulate(times_ns - steps) + steps
+
+    def _timestamp(self, ns: int) -> pd.Timestamp:
+        return pd.Timestamp(ns, tz=self.tz) if self.tz is not None else pd.Timestamp(ns)
+
+    def fills(self, signals: ArrayLike, limits: Optional[ArrayLike] = None,
+              stops: Optional[ArrayLike] = None) -> pd.DataFrame:
+        """Executions the signals lead to, one row per fill. `Type` is the type of the order filled, and `Stop`
+        the stop price of stop-market fills"""
+        n = len(self)
+        signals = np.asarray(signals, dtype=np.float64)
+        assert len(signals) == n, "signals must have one value per bar"
+        sent = np.flatnonzero(~np.isnan(signals))
+        targets = signals[sent].astype(np.int64)
+        assert np.all(np.abs(targets) <= 1), "Signals must be 1 (long), -1 (short), 0 (flat) or NaN"
+
+        limit_px = self._order_prices(limits, sent)
+        stop_px = self._order_prices(stops, sent)
+        limit_px[targets == 0] = np.nan
+        stop_px[targets == 0] = np.nan
+        stop_px[~np.isnan(limit_px)] = np.nan
+        buying = targets > 0
+
+        # Orders can fill from the first bar MinOrderFillDelay after they are sent, up to the bar of the
+        # next signal, which cancels them right after that bar is evaluated
+        delay = pd.Timedelta(self.trader_cls.MinOrderFillDelay).value
+        first = np.maximum(np.searchsorted(self.clock_ns, self.clock_ns[sent] + delay, side="left"), sent + 1)
+        last = np.append(sent[1:], n - 1)
+        fill_bar = self._first_fill_bars(first, last, buying, limit_px, stop_px)
+
+        filled = fill_bar >= 0
+        targets, fill_bar, sent = targets[filled], fill_bar[filled], sent[filled]
+        limit_px, stop_px = limit_px[filled], stop_px[filled]
+        prev = np.concatenate(([0], targets[:-1]))
+        changed = targets != prev
+        targets, prev, fill_bar, sent, limit_px, stop_px = (
+            targets[changed], prev[changed], fill_bar[changed], sent[changed], limit_px[changed], stop_px[changed])
+
+        buying = targets > prev
+        is_limit = ~np.isnan(limit_px)
+        slip = np.where(is_limit, 0.0, self.price_slip)
+        price = np.where(buying, self.high[fill_bar] + slip, self.low[fill_bar] - slip)
+        size = np.abs(targets - prev) * self.trader_cls.DefaultSize
+        return pd.DataFrame({
+            "Bar": fill_bar,
+            "SentBar": sent,
+            "Action": np.where(buying, OrderAction.Buy.name, OrderAction.Sell.name),
+            "Type": np.where(is_limit, OrderType.Limit.name,
+                             np.where(np.isnan(stop_px), OrderType.Market.name, OrderType.StopMarket.name)),
+            "Size": size,
+            "Price": price,
+            "Stop": stop_px,
+            "Cost": self.trader_cls.TradeCost * size,
+            "Position": targets * self.trader_cls.DefaultSize,
+        })
+
+    @staticmethod
+    def _order_prices(prices: Optional[ArrayLike], sent: np.ndarray) -> np.ndarray:
+        if prices is None:
+            return np.full(len(sent), np.nan)
+        return np.asarray(prices, dtype=np.float64)[sent]
+
+    def _first_fill_bars(self, first: np.ndarray, last: np.ndarray, buying: np.ndarray,
+                         limit_px: np.ndarray, stop_px: np.ndarray) -> np.ndarray:
+        """Index of the first bar in [first, last] where each order fills, or -1"""
+        fill_bar = np.full(len(first), -1, dtype=np.int64)
+        is_market = np.isnan(limit_px) & np.isnan(stop_px)
+        market_ok = is_market & (first <= last)
+        fill_bar[market_ok] = first[market_ok]
+
+        pending = np.flatnonzero(~is_market & (first <= last))
+        offsets = np.arange(self.ChunkSize)
+        base = 0
+        while len(pending) > 0:
+            bars = first[pending, None] + base + offsets
+            in_window = bars <= last[pending, None]
+            bars = np.minimum(bars, len(self) - 1)
+            high, low = self.high[bars], self.low[bars]
+            buy = buying[pending, None]
+            limit, stop = limit_px[pending, None], stop_px[pending, None]
+            # Same comparisons as SimTrader._eval_limit_order and stop activation. NaN never compares true.
+            fills = np.where(buy, limit >= high, limit <= low) | np.where(buy, stop <= high, stop >= low)
+            fills &= in_window
+            found = fills.any(axis=1)
+            fill_bar[pending[found]] = bars[found, fills[found].argmax(axis=1)]
+            base += self.ChunkSize
+            pending = pending[~found & (first[pending] + base <= last[pending])]
+        return fill_bar
+
+    def run(self, signals: ArrayLike, limits: Optional[ArrayLike] = None, stops: Optional[ArrayLike] = None,
+            *args, **kwargs) -> PositionTracker:
+        """Book the fills of given signals into a new `PositionTracker`, created with given arguments"""
+        fills = self.fills(signals, limits=limits, stops=stops)
+        tracker = PositionTracker(*args, **kwargs)
+        if len(fills) == 0:
+            return tracker
+
+        bars = fills["Bar"].to_numpy()
+        # Market extremes a lot sees are those of the bars after it was filled, up to and including the bar it closes
+        starts = np.concatenate(([bars[0]], bars + 1))
+        if starts[-1] == len(self):
+            starts = starts[:-1]
+        seg_high = np.maximum.reduceat(self.high, starts)[:len(bars)]
+        seg_low = np.minimum.reduceat(self.low, starts)[:len(bars)]
+        actions = [OrderAction[a] for a in fills["Action"]]
+        for k, (bar, sent, size, price, cost) in enumerate(zip(
+                bars, fills["SentBar"], fills["Size"], fills["Price"], fills["Cost"])):
+            if k > 0:
+                tracker.eval_market_prices(seg_low[k], seg_high[k])
+            execution = OrderExecution(
+                Order(action=actions[k], size=int(size), time_sent=self._timestamp(self.clock_ns[sent])),
+                price=float(price),
+                cost=float(cost)
+            )
+            execution.time_received = execution.order.time_sent
+            execution.time_executed = self._timestamp(self.clock_ns[bar])
+            tracker.add_execution(execution)
+        return tracker
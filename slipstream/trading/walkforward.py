@@ -0,0 +1,196 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Type
+import os
+import numpy as np
+import pandas as pd
+from . import sweep
+from .simulation import SimTrader
+from .sweep import SharedBars, _attach_worker, _combinations, _failed_row, _results_path, _run_trader
+
+
+__all__ = [
+    "FeatureCache",
+    "WalkForward",
+]
+
+
+FeatureFunc = Callable[..., pd.DataFrame]
+
+
+class FeatureCache:
+    """Feature columns computed once over a whole dataset for each distinct set of feature parameters.
+
+    `func(bars, **params)` returns feature columns aligned with `bars`, and only the parameters named in
+    `param_names` are passed to it. Causal features (rolling means, EMAs, ...) computed over the full series
+    hold the same values a window would get with full warm-up, so windows slice cached columns instead of
+    recomputing them.
+    """
+
+    def __init__(self, func: FeatureFunc, param_names: Iterable[str] = ()) -> None:
+        self.func = func
+        self.param_names = tuple(param_names)
+        self._features: Dict[Tuple, pd.DataFrame] = {}
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def key(self, params: Dict[str, Any]) -> Tuple[Hashable, ...]:
+        return tuple(params[name] for name in self.param_names)
+
+    def get(self, bars: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
+        key = self.key(params)
+        features = self._features.get(key)
+        if features is None:
+            features = pd.DataFrame(self.func(bars, **{name: params[name] for name in self.param_names}))
+            assert len(features) == len(bars), "Features must have one row per bar"
+            features.index = bars.index
+            self._features[key] = features
+        return features
+
+
+def _run_window(trader_cls: Type[SimTrader], params: Dict[str, Any], columns: Dict[str, str],
+                start: int, end: int, run_dir: Optional[str], time_col: str) -> Dict[str, Any]:
+    # Columns of shared bars are renamed to what the trader sees, dropping features of other parameters
+    bars = sweep._worker_bars.iloc[start:end][list(columns)].rename(columns=columns)
+    return _run_trader(trader_cls, params, run_dir, bars, time_col)
+
+
+class WalkForward:
+    """Walk-forward optimization of a `SimTrader` subclass.
+
+    Bars are split into rolling windows of `in_sample` bars followed by `out_of_sample` bars, moving
+    `step` bars at a time (`out_of_sample` by default). With `anchored`, in-sample windows all start at
+    the first bar. Each window runs the parameter grid in-sample, picks the combination that maximizes
+    `objective` (a column of the sweep summary, e.g. "Profit" or "Sharpe") and runs it out-of-sample.
+
+    In-sample runs of all windows share one process pool, and a window's out-of-sample run starts as
+    soon as its own in-sample runs finish. Features given by `features` are computed once per distinct
+    value of `feature_params` over the whole dataset (see `FeatureCache`) and show up as bar columns.
+    Runs that raise are logged and get NaN results with their error, so they lose in-sample.
+    """
+
+    def __init__(self, trader_cls: Type[SimTrader], grid: Dict[str, Iterable[Any]], in_sample: int,
+                 out_of_sample: int, step: Optional[int] = None, anchored: bool = False,
+                 features: Optional[FeatureFunc] = None, feature_params: Iterable[str] = (),
+                 objective: str = "Profit", results_dir: str = "/tmp", processes: Optional[int] = None) -> None:
+        assert issubclass(trader_cls, SimTrader), "Trader class must be a SimTrader"
+        assert in_sample > 0 and out_of_sample > 0, "Window lengths must be positive"
+        self.trader_cls = trader_cls
+        self.grid = {name: list(values) for name, values in grid.items()}
+        self.processes = processes or os.cpu_count()
+        self.in_sample = in_sample
+        self.out_of_sample = out_of_sample
+        self.step = step or out_of_sample
+        self.anchored = anchored
+        self.feature_cache = None if features is None else FeatureCache(features, feature_params)
+        assert all(name in self.grid for name in feature_params), "Feature parameters must be in the grid"
+        self.objective = objective
+        self.path = _results_path(results_dir, "walkforward")
+
+    def combinations(self) -> List[Dict[str, Any]]:
+        return _combinations(self.grid)
+
+    def windows(self, length: int) -> List[Tuple[int, int, int]]:
+        """(in-sample start, out-of-sample start, out-of-sample end) bar positions of each window"""
+        last = length - self.in_sample - self.out_of_sample
+        return [
+            (0 if self.anchored else start, start + self.in_sample, start + self.in_sample + self.out_of_sample)
+            for start in range(0, last + 1, self.step)
+        ]
+
+    def _shared_bars(self, bars: pd.DataFrame,
+                     combinations: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, List[Dict[str, str]]]:
+        """Bars with the features of every combination appended, and per combination the columns its trader sees"""
+        base = {name: name for name in bars.columns}
+        if self.feature_cache is None:
+            return bars, [base] * len(combinations)
+
+        parts, columns, suffixes = [bars], [], {}
+        for params in combinations:
+            key = self.feature_cache.key(params)
+            if key not in suffixes:
+                suffixes[key] = f"@{len(suffixes)}"
+                parts.append(self.feature_cache.get(bars, params).add_suffix(suffixes[key]))
+            features = self.feature_cache.get(bars, params)
+            columns.append({**base, **{f"{name}{suffixes[key]}": name for name in features.columns}})
+        return pd.concat(parts, axis=1), columns
+
+    def run(self, bars: pd.DataFrame, time_col: str = "Timestamp") -> pd.DataFrame:
+        """Optimize and evaluate every window. Returns one row per window with the chosen parameters,
+        the in-sample objective and out-of-sample results"""
+        assert time_col in bars, f"Bars have no '{time_col}' column"
+        bars = bars.reset_index(drop=True)
+        windows = self.windows(len(bars))
+        assert len(windows) > 0, "Not enough bars for one window"
+        combinations = self.combinations()
+        shared_bars, columns = self._shared_bars(bars, combinations)
+        times = bars[time_col]
+        os.makedirs(self.path, exist_ok=True)
+
+        in_sample: Dict[int, List[Optional[Dict[str, Any]]]] = {w: [None] * len(combinations) for w in range(len(windows))}
+        remaining = {w: len(combinations) for w in range(len(windows))}
+        rows = []
+        with SharedBars(shared_bars) as shared, ProcessPoolExecutor(
+                max_workers=self.processes, initializer=_attach_worker,
+                initargs=(shared.spec, shared.length)) as pool:
+            # Runs by (window, combination, whether out-of-sample)
+            pending: Dict[Future, Tuple[int, int, bool]] = {}
+            for w, (start, split, _) in enumerate(windows):
+                for i, params in enumerate(combinations):
+                    # In-sample runs only need their summaries, so their trades stay in memory
+                    future = pool.submit(_run_window, self.trader_cls, params, columns[i], start, split, None, time_col)
+                    pending[future] = (w, i, False)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    w, i, out_of_sample = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # A failed run gets NaN results, so it loses in-sample, and the other windows go on
+                        run = f"Window {w} {'out-of-sample' if out_of_sample else 'in-sample'} run"
+                        result = _failed_row(run, combinations[i], e)
+                    if out_of_sample:
+                        rows.append(self._window_row(w, windows[w], times, in_sample[w], result))
+                        continue
+                    in_sample[w][i] = result
+                    remaining[w] -= 1
+                    if remaining[w] == 0:
+                        best = self._best(in_sample[w])
+                        _, split, end = windows[w]
+                        run_dir = os.path.join(self.path, f"window_{w}", "out_of_sample")
+                        future = pool.submit(_run_window, self.trader_cls, combinations[best], columns[best],
+                                             split, end, run_dir, time_col)
+                        pending[future] = (w, best, True)
+
+        for w, results in in_sample.items():
+            os.makedirs(os.path.join(self.path, f"window_{w}"), exist_ok=True)
+            pd.DataFrame(results).to_csv(os.path.join(self.path, f"window_{w}", "in_sample.csv"), index=False)
+        summary = pd.DataFrame(rows).sort_values("Window", ignore_index=True)
+        summary.to_csv(os.path.join(self.path, "walkforward.csv"), index=False)
+        return summary
+
+    def _best(self, results: List[Dict[str, Any]]) -> int:
+        """Position of the in-sample result with the highest objective. Ties go to the earlier combination,
+        and undefined (NaN) objectives lose to everything else"""
+        scores = [-np.inf if pd.isna(result[self.objective]) else result[self.objective] for result in results]
+        return max(range(len(scores)), key=lambda i: (scores[i], -i))
+
+    def _window_row(self, w: int, window: Tuple[int, int, int], times: pd.Series,
+                    in_sample: List[Dict[str, Any]], result: Dict[str, Any]) -> Dict[str, Any]:
+        start, split, end = window
+        params = {name: result[name] for name in self.grid}
+        return {
+            "Window": w,
+            "In-Sample Start": times.iloc[start],
+            "Out-of-Sample Start": times.iloc[split],
+            "Out-of-Sample End": times.iloc[end - 1],
+            **params,
+            f"In-Sample {self.objective}": in_sample[self._best(in_sample)][self.objective],
+            "Trades": result["Trades"],
+            "Profit": result["Profit"],
+            "Win Rate(%)": result["Win Rate(%)"],
+            "Trades Path": result["Trades Path"],
+            "Error": result["Error"],
+        }
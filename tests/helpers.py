@@ -0,0 +1,95 @@
+"""Bars and traders shared by the tests and benchmarks"""
+from typing import Optional
+import numpy as np
+import pandas as pd
+from slipstream.trading import OrderAction, TradePlan, TradeType
+from slipstream.trading.simulation import SimTrader
+
+
+def random_mids(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Random walk of `n` prices from 4000 in quarter ticks"""
+    return 4000.0 + np.cumsum(np.round(rng.normal(scale=0.5, size=n) * 4) / 4)
+
+
+def random_bars(n: int, seed: int, half_spread: float = 0.25, tz: Optional[str] = "US/Eastern",
+                close: bool = False, volume: bool = False) -> pd.DataFrame:
+    """One-second bars around a random walk, with optional `Close` (the walk) and random `Volume` columns"""
+    rng = np.random.default_rng(seed)
+    mids = random_mids(rng, n)
+    bars = pd.DataFrame({
+        "Timestamp": pd.date_range("2023-01-03T09:30:00", periods=n, freq="s", tz=tz),
+        "High": mids + half_spread,
+        "Low": mids - half_spread,
+    })
+    if close:
+        bars["Close"] = mids
+    if volume:
+        bars["Volume"] = rng.integers(1, 100, n)
+    return bars
+
+
+class FlipTrader(SimTrader):
+    """Flips between long and short every `Period` bars"""
+    Period = 10
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.bar_count = 0
+
+    def on_bar(self, bar):
+        if self.bar_count % self.Period == 0:
+            self.go_long() if (self.bar_count // self.Period) % 2 == 0 else self.go_short()
+        self.bar_count += 1
+
+
+class Crash(Exception):
+    pass
+
+
+class BracketTrader(SimTrader):
+    """Sends a bracketed plan every 15 bars, alternating long and short, and crashes at `crash_at` if set.
+    With `record_equity`, equity is recorded from the start"""
+    crash_at = None
+
+    def __init__(self, *args, record_equity: bool = False, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.bars_seen = 0
+        if record_equity:
+            self.start_recording_equity(capacity=16)
+
+    def on_bar(self, bar):
+        self.bars_seen += 1
+        if self.bars_seen == self.crash_at:
+            raise Crash()
+        if self.bars_seen % 15 == 0:
+            mid = 0.5 * (bar.High + bar.Low)
+            sign = 1 if self.bars_seen % 30 == 0 else -1
+            self.add_trade_plan(TradePlan(type=TradeType.Long if sign > 0 else TradeType.Short, size=1, limit=mid,
+                                          target=mid + sign * 1.0, stop=mid - sign * 1.0, hold_period=10))
+
+
+class ManualBrackets(SimTrader):
+    """Places the exits of each entry by hand in `on_order_filled()`, as strategies did before plans were
+    native, and cancels the other exit when one fills. Only entries, targets and stops of plans are used"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.entries, self.exits = {}, {}
+
+    def add_trade_plan(self, plan: TradePlan):
+        action = OrderAction.Buy if plan.type == TradeType.Long else OrderAction.Sell
+        order = self.place_limit(action=action, limit=plan.limit, size=plan.size)
+        self.entries[id(order)] = plan
+        return order
+
+    def on_order_filled(self, execution):
+        order = execution.order
+        plan = self.entries.pop(id(order), None)
+        if plan is not None:
+            action = OrderAction.Sell if plan.type == TradeType.Long else OrderAction.Buy
+            exits = [self.place_limit(action=action, limit=plan.target, size=plan.size),
+                     self.place_stop_market(action=action, stop=plan.stop, size=plan.size)]
+            for exit_order in exits:
+                self.exits[id(exit_order)] = exits
+        for sibling in self.exits.pop(id(order), []):
+            self.cancel_order(sibling)
@@ -0,0 +1,210 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from slipstream.trading.analysis import OnlineTradesAnalysis, RunningStats, TradesAnalysis
+from helpers import BracketTrader, random_bars
+
+
+def test_running_stats():
+    values = np.random.default_rng(0).normal(loc=5.0, scale=2.0, size=1000)
+    stats = RunningStats()
+    for v in values:
+        stats.add(v)
+    stats.add(float("nan"))
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.std == pytest.approx(values.std(ddof=1))
+    assert (stats.min, stats.max) == (values.min(), values.max())
+
+
+def test_online_analysis_matches_batch():
+    trader = BracketTrader(results_dir=None)
+    online = trader.tracker.subscribe(OnlineTradesAnalysis())
+    trader.run(random_bars(3000, seed=11, half_spread=0.5))
+    assert online.count == len(trader.trades) > 50
+
+    batch = TradesAnalysis(trader.trades)
+    summary, expected = online.summary(), batch.summary()
+    assert summary.keys() == expected.keys()
+    for key in ("Trades", "Win Count", "Win Rate(%)", "Loss Count", "Loss Rate(%)", "Neutrals", "In-Market Time"):
+        assert summary[key] == expected[key]
+    groups = {"All": batch.trades, "Win": batch.winning_trades, "Loss": batch.losing_trades}
+    for group, trades in groups.items():
+        for measure, col in (("Profits", "Profit"), ("Run-Ups", "RunUp"), ("Draw-Downs", "DrawDown")):
+            stats = online.stats[group][measure]
+            assert stats.mean == pytest.approx(trades[col].mean())
+            assert stats.std == pytest.approx(trades[col].std())
+            assert (stats.min, stats.max) == (trades[col].min(), trades[col].max())
+
+
+def _loop_metrics(pnl):
+    """Straightforward per-trade loop over the same definitions"""
+    equity, peak, max_dd, dd_len, max_dd_len = 0., 0., 0., 0, 0
+    streaks = {1: 0, -1: 0}
+    best = {1: 0, -1: 0}
+    for p in pnl:
+        equity += p
+        peak = max(peak, equity)
+        max_dd = max(max_dd, peak - equity)
+        dd_len = dd_len + 1 if peak > equity else 0
+        max_dd_len = max(max_dd_len, dd_len)
+        for sign in (1, -1):
+            streaks[sign] = streaks[sign] + 1 if p * sign > 0 else 0
+            best[sign] = max(best[sign], streaks[sign])
+    return {"Max Drawdown": max_dd, "Max Drawdown Trades": max_dd_len, "Max Win Streak": best[1], "Max Loss Streak": best[-1]}
+
+
+def test_metrics():
+    trader = BracketTrader(results_dir=None)
+    trader.run(random_bars(3000, seed=11, half_spread=0.5))
+    analysis = TradesAnalysis(trader.trades)
+    metrics = analysis.metrics(initial_equity=trader.tracker.initial_equity)
+
+    pnl = analysis.trades["Profit"] - analysis.trades["Cost"]
+    assert metrics["Trades"] == len(pnl)
+    assert metrics["Net Profit"] == pytest.approx(float(trader.tracker.equity_value) - trader.tracker.initial_equity)
+    assert metrics["Profit Factor"] == pytest.approx(pnl[pnl > 0].sum() / -pnl[pnl < 0].sum())
+    assert metrics["Expectancy"] == pytest.approx(pnl.mean())
+    assert metrics["Sharpe"] == pytest.approx(pnl.mean() / pnl.std())
+    assert metrics["Sortino"] == pytest.approx(pnl.mean() / np.sqrt((pnl.clip(upper=0) ** 2).mean()))
+    for key, value in _loop_metrics(pnl.tolist()).items():
+        assert metrics[key] == pytest.approx(value), key
+    assert 0 < metrics["Max Drawdown(%)"] < 100
+
+    curve = analysis.equity_curve(initial_equity=trader.tracker.initial_equity)
+    assert curve.iloc[-1] == pytest.approx(float(trader.tracker.equity_value))
+    assert (curve.index == analysis.trades["Exit Time"]).all()
+
+
+def test_metrics_edge_cases():
+    def analysis(profits):
+        return TradesAnalysis(pd.DataFrame({"Profit": profits, "Cost": 0.0,
+                                            "Exit Time": pd.date_range("2023-01-03", periods=len(profits), freq="min")}))
+    empty = analysis([]).metrics()
+    assert empty["Trades"] == 0 and empty["Max Drawdown"] == 0. and np.isnan(empty["Sharpe"])
+    winners = analysis([1.0, 2.0, 3.0]).metrics()
+    assert winners["Profit Factor"] == np.inf
+    assert winners["Max Win Streak"] == 3 and winners["Max Loss Streak"] == 0
+    assert np.isnan(winners["Sortino"])
+    first_loss = analysis([-2.0, 1.0, 1.0, 1.0]).metrics()
+    assert first_loss["Max Drawdown"] == 2.0 and first_loss["Max Drawdown Trades"] == 2
+    for equity in (0.0, -10.0):
+        assert np.isnan(analysis([-2.0, 1.0]).metrics(initial_equity=equity)["Max Drawdown(%)"])
+    assert analysis([-2.0, 1.0]).metrics(initial_equity=10.0)["Max Drawdown(%)"] == pytest.approx(20.0)
+
+
+def _trades_log(tmp_path, bars: pd.DataFrame) -> str:
+    trader = BracketTrader(results_dir=str(tmp_path))
+    trader.run(bars)
+    return trader.trades_path
+
+
+def test_typed_loading(tmp_path):
+    path = _trades_log(tmp_path, random_bars(3000, seed=11, half_spread=0.5))
+    analysis = TradesAnalysis(path)
+    df = analysis.trades
+    assert df["Type"].dtype == "category" and df["Size"].dtype == np.int64
+    expected = pd.read_csv(path)
+    for col in ("Entry Time", "Exit Time"):
+        assert (df[col] == pd.to_datetime(expected[col])).all()
+        assert str(df[col].dt.tz) == "UTC-05:00"
+    assert np.array_equal(df["Profit"], expected["Profit"])
+
+    projected = TradesAnalysis(path, columns=["Profit", "Cost"])
+    assert list(projected.trades.columns) == ["Profit", "Cost"]
+    assert projected.metrics() == analysis.metrics()
+
+
+def test_mixed_utc_offsets(tmp_path):
+    # Crosses the start of daylight saving time
+    bars = random_bars(3000, seed=11, half_spread=0.5)
+    bars["Timestamp"] = pd.date_range("2023-03-12T01:30:00", periods=len(bars), freq="s", tz="US/Eastern")
+    df = TradesAnalysis(_trades_log(tmp_path, bars)).trades
+    assert str(df["Entry Time"].dt.tz) == "UTC"
+    assert df["Exit Time"].is_monotonic_increasing
+
+
+def test_baseline_format_log(tmp_path):
+    # Older logs hold `str(Timestamp)`, without fractional seconds when they are whole
+    times = pd.Series(["2023-01-03 09:30:00-05:00", "2023-01-03 09:31:00.250000-05:00"])
+    path = tmp_path / "trades.csv"
+    pd.DataFrame({"Profit": [1.0, -1.0], "Cost": 0.1, "Entry Time": times, "Exit Time": times}).to_csv(path, index=False)
+    df = TradesAnalysis(str(path)).trades
+    assert str(df["Entry Time"].dt.tz) == "UTC-05:00"
+    assert list(df["Entry Time"]) == list(pd.to_datetime(times, format="ISO8601"))
+    assert df["Entry Time"].iloc[0] == pd.Timestamp("2023-01-03T14:30:00", tz="UTC")
+
+    naive = pd.Series(["2023-01-03 09:30:00", "2023-01-03T09:31:00.250000"])
+    pd.DataFrame({"Profit": [1.0, -1.0], "Cost": 0.1, "Exit Time": naive}).to_csv(path, index=False)
+    df = TradesAnalysis(str(path)).trades
+    assert df["Exit Time"].dt.tz is None
+    assert df["Exit Time"].iloc[0] == pd.Timestamp("2023-01-03T09:30:00")
+
+    # Naive and offset times never get a timezone made up for them
+    pd.DataFrame({"Profit": [1.0, -1.0], "Cost": 0.1, "Exit Time": [naive[0], times[0]]}).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        TradesAnalysis(str(path))
+
+
+def test_sidecar_cache(tmp_path):
+    path = _trades_log(tmp_path, random_bars(3000, seed=11, half_spread=0.5))
+    cache_path = TradesAnalysis.cache_path(path)
+    first = TradesAnalysis(path).trades
+    assert not os.path.exists(cache_path)
+    pd.testing.assert_frame_equal(TradesAnalysis(path, cache=True).trades, first)
+    assert os.path.exists(cache_path)
+
+    # A cache matching the size and modification time of its log is used
+    cached = TradesAnalysis(path, cache=True).trades
+    pd.testing.assert_frame_equal(cached, first)
+    stale = pd.DataFrame({"Profit": [1.0]})
+    stale.attrs.update(cached.attrs)
+    if cache_path.endswith(".pkl"):
+        stale.to_pickle(cache_path)
+    else:
+        stale.to_parquet(cache_path)
+    assert len(TradesAnalysis(path, cache=True).trades) == 1
+
+    # A log appended to is read again, even with an unchanged modification time
+    mtime_ns = os.stat(path).st_mtime_ns
+    with open(path, "a") as f:
+        f.write(",".join(pd.read_csv(path).astype(str).iloc[-1]) + "\n")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    assert len(TradesAnalysis(path, cache=True).trades) == len(first) + 1
+    assert len(TradesAnalysis(path, columns=["Profit"], cache=True).trades) == len(first) + 1
+
+
+def test_parquet_log(tmp_path):
+    pytest.importorskip("pyarrow")
+    csv_path = _trades_log(tmp_path, random_bars(3000, seed=11, half_spread=0.5))
+    expected = TradesAnalysis(csv_path).trades
+    parquet_path = str(tmp_path / "trades.parquet")
+    expected.to_parquet(parquet_path)
+    pd.testing.assert_frame_equal(TradesAnalysis(parquet_path).trades, expected)
+
+
+def test_bootstrap():
+    trader = BracketTrader(results_dir=None)
+    trader.run(random_bars(3000, seed=11, half_spread=0.5))
+    analysis = TradesAnalysis(trader.trades)
+    pnl = analysis.net_profits()
+
+    samples = analysis.bootstrap_samples(1000, seed=5, chunk_size=300)
+    assert len(samples) == 1000
+    # A resample of a single chunk matches the metrics of its trades
+    rng = np.random.default_rng(np.random.SeedSequence(5).spawn(4)[0])
+    first = TradesAnalysis(pd.DataFrame({"Profit": pnl[rng.integers(0, len(pnl), size=(len(pnl), 300))[:, 0]],
+                                         "Cost": 0.0})).metrics()
+    for name in samples.columns:
+        assert samples[name].iloc[0] == pytest.approx(first[name]), name
+
+    pd.testing.assert_frame_equal(samples, analysis.bootstrap_samples(1000, seed=5, chunk_size=300, processes=2))
+    assert not samples.equals(analysis.bootstrap_samples(1000, seed=6, chunk_size=300))
+
+    intervals = analysis.bootstrap(1000, confidence=0.9, seed=5, chunk_size=300)
+    assert list(intervals.index) == ["Win Rate(%)", "Expectancy", "Max Drawdown"]
+    assert intervals.loc["Expectancy", "Value"] == pytest.approx(pnl.mean())
+    assert (intervals["Lower"] <= intervals["Upper"]).all()
+    assert intervals.loc["Expectancy", "Lower"] < pnl.mean() < intervals.loc["Expectancy", "Upper"]
+    assert intervals.loc["Expectancy", "Std Error"] == pytest.approx(pnl.std(ddof=1) / np.sqrt(len(pnl)), rel=0.2)
@@ -1,12 +1,21 @@
 import unittest
 from slipstream.data.esignal import ESignalCSV
+import pandas as pd
 import zipfile
 import os
 from tempfile import TemporaryDirectory
-import time
+
+
+def _has_parquet_engine() -> bool:
+    try:
+        pd.io.parquet.get_engine("auto")
+        return True
+    except ImportError:
+        return False
 
 
 class MyTestCase(unittest.TestCase):
+    @unittest.skipUnless(_has_parquet_engine(), "Caching needs pyarrow or fastparquet")
     def test_esignal_read_csv(self):
         zip_path, _ = os.path.split(os.path.abspath(__file__))
         zip_path = os.path.join(zip_path, "VX_spread.csv.zip")
@@ -17,20 +26,15 @@ class MyTestCase(unittest.TestCase):
                 extracted_files = os.listdir(tmp_dir)
                 assert len(extracted_files) > 0
                 csv_files = [filename for filename in extracted_files if filename.endswith(".csv")]
-                begin = time.clock_gettime_ns(time.CLOCK_UPTIME_RAW)
-                df = ESignalCSV(os.path.join(tmp_dir, csv_files[0])).get_dataframe()
-                raw_read_elapsed = time.clock_gettime_ns(time.CLOCK_UPTIME_RAW) - begin
-                print(f"raw read elapsed={raw_read_elapsed}")
+                csv_path = os.path.join(tmp_dir, csv_files[0])
+                df = ESignalCSV(csv_path).get_dataframe()
                 self.assertTrue("Timestamp" in df.columns)
+                self.assertTrue(os.path.exists(csv_path + ".parquet"))
 
-                # Load CSV again. This time there should be a parquet cache, so it should be much faster
-                begin = time.clock_gettime_ns(time.CLOCK_UPTIME_RAW)
-                df2 = ESignalCSV(os.path.join(tmp_dir, csv_files[0])).get_dataframe()
-                cache_read_elapsed = time.clock_gettime_ns(time.CLOCK_UPTIME_RAW) - begin
-                print(f"cache read elapsed={cache_read_elapsed}")
-                read_times_mult = raw_read_elapsed * 1.0 / cache_read_elapsed
-                print(f"mult={read_times_mult}")
-                self.assertTrue(read_times_mult > 500)
+                # Load CSV again. This time it comes from the parquet cache. Load speed is tracked by
+                # benchmarks/bench_data.py rather than asserted here
+                df2 = ESignalCSV(csv_path).get_dataframe()
+                pd.testing.assert_frame_equal(df2, df)
 
 
 if __name__ == '__main__':
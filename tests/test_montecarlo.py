@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+from slipstream.trading import OrderAction
+from slipstream.trading.montecarlo import MonteCarloFills
+from slipstream.trading.simulation import SimTrader
+from slipstream.trading.vectorized import VectorizedBacktest
+from helpers import random_mids
+
+
+def _backtest(seed: int = 5, n: int = 3000):
+    rng = np.random.default_rng(seed)
+    mids = random_mids(rng, n)
+    spreads = np.round(rng.uniform(0.0, 1.0, size=n) * 4) / 4
+    times = pd.Timestamp("2023-01-03T09:30:00", tz="UTC") + pd.to_timedelta(np.arange(n), unit="s")
+    signals = np.where(rng.random(n) < 0.05, rng.choice([-1.0, 0.0, 1.0], size=n), np.nan)
+    limits = np.where(rng.random(n) < 0.3, mids - 1.0, np.nan)
+    return VectorizedBacktest(times, mids + spreads, mids - spreads, price_slip=0.25), signals, limits
+
+
+@pytest.mark.parametrize("with_limits", [False, True])
+def test_worst_fills_match_tracker(with_limits):
+    backtest, signals, limits = _backtest()
+    limits = limits if with_limits else None
+    mc = MonteCarloFills(backtest, signals, limits=limits, price_multiplier=50.0, initial_equity=1000.0)
+    result = mc.run(3, seed=1, fill="worst", keep_equity=True)
+
+    tracker = backtest.run(signals, limits=limits, initial_equity=1000.0, price_multiplier=50.0)
+    mark = 0.5 * (backtest.high[-1] + backtest.low[-1])
+    expected = float(tracker.equity_value) + tracker.unrealized_pnl(mark)
+    assert np.allclose(result.final_equity, expected)
+    assert np.all(result.equity == result.equity[0])
+    assert np.all(result.max_drawdown >= 0)
+
+
+def test_batches_and_seeds():
+    backtest, signals, limits = _backtest()
+    mc = MonteCarloFills(backtest, signals, limits=limits)
+    one = mc.run(100, seed=42, slippage=0.5, batch_size=100)
+    many = mc.run(100, seed=42, slippage=0.5, batch_size=7)
+    assert np.array_equal(one.final_equity, many.final_equity)
+    assert np.array_equal(one.max_drawdown, many.max_drawdown)
+    assert not np.array_equal(one.final_equity, mc.run(100, seed=43, slippage=0.5).final_equity)
+
+    worst = mc.run(1, fill="worst").final_equity[0]
+    assert np.all(mc.run(100, seed=42).final_equity >= worst)
+    assert list(one.quantiles([0.5]).columns) == ["Final Equity", "Max DrawDown"]
+
+
+def test_sim_trader_random_market_fills():
+    sim = SimTrader()
+    sim.fill_rng = np.random.default_rng(0)
+    t0 = pd.Timestamp("2023-01-03T09:30:00")
+    prices = []
+    for i in range(20):
+        sim.eval_market(t0 + pd.Timedelta(seconds=i), low=10.0, high=11.0)
+        if sim.tracker.position is not None:
+            prices.append(float(sim.tracker.position.entry))
+            sim.go_flat()
+        elif len(sim.pending_orders) == 0:
+            sim.place_market(action=OrderAction.Buy, size=1)
+    assert len(prices) > 0
+    assert all(10.0 <= p <= 11.0 for p in prices)
+    assert len(set(prices)) > 1
+
+
+@pytest.mark.parametrize("action,stop", [(OrderAction.Buy, 10.5), (OrderAction.SellShort, 10.5)])
+def test_sim_trader_random_stop_fills(action, stop):
+    sim = SimTrader()
+    sim.fill_rng = np.random.default_rng(0)
+    t0 = pd.Timestamp("2023-01-03T09:30:00")
+    sim.eval_market(t0, low=10.0, high=11.0)
+    prices = []
+    for i in range(1, 40):
+        sim.eval_market(t0 + pd.Timedelta(seconds=i), low=8.0, high=13.0)
+        if sim.tracker.position is not None:
+            prices.append(float(sim.tracker.position.entry))
+            sim.go_flat()
+        elif len(sim.pending_orders) == 0:
+            sim.place_stop_market(action=action, stop=stop, size=1)
+    assert len(prices) > 0
+    if action == OrderAction.Buy:
+        assert all(stop <= p <= 13.0 for p in prices)
+    else:
+        assert all(8.0 <= p <= stop for p in prices)
+    assert len(set(prices)) > 1
+
+
+def test_stop_fills_at_or_past_stop():
+    backtest, signals, _ = _backtest()
+    mids = 0.5 * (backtest.high + backtest.low)
+    # Buy stops above and sell stops below the market when sent
+    stops = np.where(signals > 0, mids + 0.5, mids - 0.5)
+    mc = MonteCarloFills(backtest, signals, stops=stops)
+    fills = mc.fills
+    is_stop = (fills["Type"] == "StopMarket").to_numpy()
+    assert is_stop.any()
+
+    prices = mc.prices(200, np.random.default_rng(3))
+    buying = mc.direction > 0
+    stop = fills["Stop"].to_numpy()
+    assert np.all(prices[:, is_stop & buying] >= stop[is_stop & buying])
+    assert np.all(prices[:, is_stop & ~buying] <= stop[is_stop & ~buying])
+    assert np.all(prices[:, is_stop] <= backtest.high[fills["Bar"]][is_stop] + mc.price_slip)
+    assert np.all(prices[:, is_stop] >= backtest.low[fills["Bar"]][is_stop] - mc.price_slip)
+
+    gen = mc.run(10, seed=np.random.default_rng(1)).final_equity
+    assert len(gen) == 10 and np.isfinite(gen).all()
@@ -0,0 +1,86 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from slipstream.trading.multirun import MultiRunAnalysis, find_trades, read_s3_object
+from slipstream.trading.sweep import ParameterSweep
+from helpers import FlipTrader, random_bars
+
+
+@pytest.fixture(scope="module")
+def sweep(tmp_path_factory):
+    sweep = ParameterSweep(FlipTrader, {"Period": [5, 20], "price_slip": [0.0, 0.25, 0.5]},
+                           results_dir=str(tmp_path_factory.mktemp("sweep")), processes=2)
+    return sweep, sweep.run(random_bars(1000, seed=9))
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_metrics_of_sweep_runs(sweep, processes):
+    sweep, summary = sweep
+    runs = MultiRunAnalysis(sweep.path, processes=processes)
+    assert len(runs.paths) == 6
+    metrics = runs.metrics().sort_values("Run", ignore_index=True)
+    assert list(metrics["Run"]) == list(summary["Run"])
+    assert list(metrics["Period"]) == list(summary["Period"])
+    for col in ("Trades", "Net Profit", "Sharpe", "Max Drawdown", "Max Loss Streak"):
+        assert np.allclose(metrics[col], summary[col]), col
+
+    best = runs.rank("Net Profit").iloc[0]
+    assert best["Net Profit"] == summary["Net Profit"].max()
+    assert runs.analysis(best["Run"]).metrics()["Net Profit"] == pytest.approx(best["Net Profit"])
+
+
+def test_groupby_params(sweep):
+    sweep, summary = sweep
+    grouped = MultiRunAnalysis(f"{sweep.path}/run_*/trades_*.csv", processes=1).groupby("Period")
+    assert list(grouped.index) == [5, 20]
+    assert list(grouped[("Sharpe", "count")]) == [3, 3]
+    expected = summary.groupby("Period")["Net Profit"].mean()
+    assert np.allclose(grouped[("Net Profit", "mean")], expected)
+
+
+def test_runs_without_params(tmp_path):
+    for i in range(3):
+        pd.DataFrame({"Profit": [1.0 * i, -0.5], "Cost": 0.1, "Extra": "x"}).to_csv(tmp_path / f"trades_{i}.csv", index=False)
+    assert len(find_trades(str(tmp_path))) == 3
+    metrics = MultiRunAnalysis(str(tmp_path), processes=1).metrics()
+    assert list(metrics["Run"]) == ["trades_0.csv", "trades_1.csv", "trades_2.csv"]
+    assert list(metrics["Trades"]) == [2, 2, 2]
+
+
+def test_runs_with_empty_or_missing_logs(tmp_path):
+    pd.DataFrame({"Profit": [1.0, -0.5], "Cost": 0.1}).to_csv(tmp_path / "trades_0.csv", index=False)
+    (tmp_path / "trades_1.csv").touch()
+    paths = [str(tmp_path / f"trades_{i}.csv") for i in range(3)]
+    metrics = MultiRunAnalysis(paths, processes=1).metrics()
+    assert list(metrics["Run"]) == ["trades_0.csv", "trades_1.csv", "trades_2.csv"]
+    assert list(metrics["Trades"][:1]) == [2]
+    assert metrics.iloc[1:][["Trades", "Net Profit", "Sharpe"]].isna().all().all()
+    assert MultiRunAnalysis(paths, processes=1).rank("Net Profit")["Run"].iloc[0] == "trades_0.csv"
+
+
+def test_s3_run_names():
+    runs = MultiRunAnalysis(["s3://bucket/sweep/run_0/trades_a.csv", "s3://bucket/sweep/run_1/trades_b.csv"])
+    assert runs._run_names([True, True]) == ["run_0", "run_1"]
+    assert runs._run_names([False, False]) == ["run_0/trades_a.csv", "run_1/trades_b.csv"]
+
+
+class FakeS3:
+    def __init__(self, objects, tags):
+        self.objects, self.tags = objects, tags
+
+    def open(self, key, mode):
+        return io.BytesIO(self.objects[key])
+
+    def get_tags(self, key):
+        return self.tags.get(key, {})
+
+
+def test_read_s3_object():
+    data = b"Profit,Cost\n1.0,0.5\n"
+    s3 = FakeS3({"bucket/plain.csv": data}, {})
+    assert read_s3_object("bucket/plain.csv", s3) == data
+
+    zstd = pytest.importorskip("zstd")
+    s3 = FakeS3({"bucket/packed.csv": zstd.compress(data)}, {"bucket/packed.csv": {"compression": "zstd"}})
+    assert read_s3_object("bucket/packed.csv", s3) == data
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+import pytest
+from slipstream.trading import OrderAction, Order, OrderType
+from slipstream.trading.orderbook import PendingOrderBook
+from slipstream.trading.simulation import SimTrader
+
+
+class _OrderList:
+    """Plain list of pending orders, as SimTrader kept before orders were indexed"""
+
+    def __init__(self):
+        self.orders = []
+
+    def add(self, order):
+        self.orders.append(order)
+
+    def clear(self):
+        self.orders = []
+
+
+class LinearScanSimTrader(SimTrader):
+    """Reference trader that evaluates every pending order on every bar"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._order_book = _OrderList()
+
+    def _eval_orders(self, low, high):
+        filled = []
+        for order in self._order_book.orders:
+            if self.cur_time - order.time_sent < self.MinOrderFillDelay:
+                continue
+            if order.is_stop_type() and not order.activated:
+                self._eval_stop_activation(order, low=low, high=high)
+            if self._is_active_market_order(order):
+                execution = self._eval_market_order(order, low=low, high=high)
+            elif self._is_active_limit_order(order):
+                execution = self._eval_limit_order(order, low=low, high=high)
+            else:
+                self._fill_slip_bar_count += 1
+                continue
+            if execution:
+                execution.time_received = order.time_sent
+                execution.time_executed = self.cur_time
+                self.tracker.add_execution(execution)
+                filled.append(order)
+        for order in filled:
+            self._order_book.orders.remove(order)
+
+    def _eval_stop_activation(self, order, low, high):
+        if order.is_trailing_type():
+            if order.is_buying():
+                order.peak = min(order.peak, low)
+                trigger = order.peak + order.stop
+            else:
+                order.peak = max(order.peak, high)
+                trigger = order.peak - order.stop
+        else:
+            trigger = order.stop
+        if order.is_buying() and trigger <= high:
+            order.activated = True
+        elif not order.is_buying() and trigger >= low:
+            order.activated = True
+
+
+def _place_random_order(sim: SimTrader, rng: np.random.Generator, price: float):
+    action = OrderAction.Buy if rng.random() < 0.5 else OrderAction.Sell
+    sign = 1 if action == OrderAction.Buy else -1
+    offset = float(np.round(rng.uniform(0.0, 3.0), 2))
+    kind = rng.integers(0, 5)
+    if kind == 0:
+        return sim.place_market(action=action)
+    elif kind == 1:
+        return sim.place_limit(action=action, limit=price - sign * offset)
+    elif kind == 2:
+        return sim.place_stop_market(action=action, stop=price + sign * offset)
+    elif kind == 3:
+        return sim.place_stop_limit(action=action, stop=price + sign * offset, limit=price + sign * 2 * offset)
+    else:
+        return sim.place_trail_stop_market(action=action, stop=offset)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_indexed_orders_match_linear_scan(seed):
+    rng = np.random.default_rng(seed)
+    n_bars = 2000
+    mids = 100.0 + np.cumsum(np.round(rng.normal(scale=0.5, size=n_bars), 2))
+    spreads = np.round(rng.uniform(0.0, 0.6, size=n_bars), 2)
+    times = pd.Timestamp("2023-01-03T09:30:00") + pd.to_timedelta(np.cumsum(rng.integers(100, 1500, size=n_bars)), unit="ms")
+
+    sims = [SimTrader(), LinearScanSimTrader()]
+    orders = [[], []]
+    for i in range(n_bars):
+        place = rng.random() < 0.3
+        clear = rng.random() < 0.01
+        order_seed = int(rng.integers(1 << 30))
+        for sim, placed in zip(sims, orders):
+            sim.eval_market(times[i], low=mids[i] - spreads[i], high=mids[i] + spreads[i])
+            if clear:
+                sim._clear_pending_orders()
+            if place:
+                placed.append(_place_random_order(sim, np.random.default_rng(order_seed), mids[i]))
+
+    indexed, linear = sims
+    assert len(indexed.trades) == len(linear.trades) > 50
+    for col in ("type", "size", "entry", "exit", "time_exited"):
+        np.testing.assert_array_equal(indexed.trades.column(col), linear.trades.column(col))
+    assert indexed._fill_slip_bar_count == linear._fill_slip_bar_count
+    assert len(indexed._pending_orders) == len(linear._order_book.orders)
+    for a, b in zip(*orders):
+        assert a.activated == b.activated
+        assert a.peak == b.peak
+
+
+def test_cancel_order():
+    t0 = pd.Timestamp.now()
+    dt = pd.Timedelta(seconds=1)
+    sim = SimTrader()
+    sim.eval_market(t0, low=10.0, high=10.2)
+    order = sim.place_limit(action=OrderAction.Buy, limit=9.7, size=1)
+    sim.eval_market(t0 + dt, low=9.9, high=10.1)
+    assert sim.cancel_order(order)
+    assert not sim.cancel_order(order)
+    sim.eval_market(t0 + 2 * dt, low=9.5, high=9.7)
+    assert sim.tracker.position is None
+    assert len(sim._pending_orders) == 0
+
+
+def test_oco_group():
+    book = PendingOrderBook()
+    target = Order(action=OrderAction.Sell, size=1, type=OrderType.Limit, limit=11.0, time_sent_ns=0)
+    stop = Order(action=OrderAction.Sell, size=1, type=OrderType.StopMarket, stop=9.0, activated=False, time_sent_ns=0)
+    other = Order(action=OrderAction.Buy, size=1, type=OrderType.Limit, limit=9.5, time_sent_ns=0)
+    seqs = [book.add(order) for order in (target, stop, other)]
+    group = book.link([target, stop])
+    book.promote(sent_before_ns=0)
+
+    fillable = book.collect_fillable(low=11.0, high=11.5)
+    assert fillable == [(seqs[0], target)]
+    assert book.filled(seqs[0]) == group
+    assert book.orders == [other]
+    assert book.filled(seqs[2]) is None
+    assert len(book) == 0
@@ -0,0 +1,151 @@
+import asyncio
+import pandas as pd
+import pytest
+from slipstream.trading import OrderAction, OrderExecution
+from slipstream.trading.paper import AsyncSimTrader, PaperSession, read_socket, replay_bars, tail_csv
+from slipstream.trading.simulation import SimTrader
+from helpers import random_bars
+
+
+class FlipTrader(SimTrader):
+    """Goes long after a down bar and short after an up bar, every 5 bars"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.prev_high = None
+        self.bar_count = 0
+        self.fills = []
+
+    def on_order_filled(self, execution: OrderExecution):
+        self.fills.append((self.bar_count, execution.price))
+
+    def on_bar(self, bar):
+        self.bar_count += 1
+        if self.prev_high is not None and self.bar_count % 5 == 0:
+            self.go_long() if bar.High < self.prev_high else self.go_short()
+        self.prev_high = bar.High
+
+
+class AsyncFlipTrader(AsyncSimTrader, FlipTrader):
+    async def on_fill(self, execution: OrderExecution):
+        await asyncio.sleep(0)
+        FlipTrader.on_order_filled(self, execution)
+
+
+def test_session_matches_sync_run(tmp_path):
+    bars = random_bars(500, seed=23, tz=None)
+    expected = FlipTrader(results_dir=str(tmp_path))
+    expected.run(bars)
+
+    session = PaperSession(replay_bars(bars), queue_size=8)
+    traders = [session.add(AsyncFlipTrader(results_dir=str(tmp_path))) for _ in range(3)]
+    summaries = asyncio.run(session.run())
+
+    assert session.bar_count == len(bars)
+    assert len(summaries) == 3
+    for trader in traders:
+        assert trader.fills == expected.fills
+        pd.testing.assert_frame_equal(trader.trades.to_dataframe(), expected.trades.to_dataframe())
+
+
+def test_failed_trader_does_not_block_others(tmp_path):
+    class Failing(AsyncSimTrader):
+        def on_bar(self, bar):
+            raise RuntimeError("strategy bug")
+
+    session = PaperSession(replay_bars(random_bars(100, seed=23, tz=None)), queue_size=2)
+    session.add(Failing(results_dir=str(tmp_path)))
+    healthy = session.add(AsyncFlipTrader(results_dir=str(tmp_path)))
+    with pytest.raises(RuntimeError):
+        asyncio.run(session.run())
+    assert healthy.bar_count == 100
+
+
+def test_tail_csv(tmp_path):
+    bars = random_bars(60, seed=23, tz=None)
+    path = tmp_path / "bars.csv"
+    lines = bars.to_csv(index=False).splitlines(keepends=True)
+
+    async def write():
+        with open(path, "wt") as f:
+            for i in range(0, len(lines), 7):
+                f.write("".join(lines[i:i + 7]))
+                f.flush()
+                await asyncio.sleep(0.01)
+
+    async def main():
+        path.touch()
+        writer = asyncio.create_task(write())
+        received = [bar async for bar in tail_csv(str(path), poll_interval=0.005, idle_timeout=0.2)]
+        await writer
+        return received
+
+    received = asyncio.run(main())
+    assert [bar.High for bar in received] == list(bars["High"])
+    assert received[0].Timestamp == bars["Timestamp"][0]
+
+
+def test_read_socket(tmp_path):
+    bars = random_bars(50, seed=23, tz=None)
+
+    async def main():
+        async def serve(reader, writer):
+            writer.write(bars.to_csv(index=False).encode())
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            session = PaperSession(read_socket("127.0.0.1", port))
+            trader = session.add(AsyncFlipTrader(results_dir=str(tmp_path)))
+            await session.run()
+        return trader
+
+    trader = asyncio.run(main())
+    assert trader.bar_count == len(bars)
+
+
+class OneOfTwoLimits(AsyncSimTrader):
+    """Places two buy limits that fill on the same bar, and cancels the other when one fills"""
+
+    def __init__(self, *args, in_place: bool = False, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.in_place = in_place
+        self.orders = []
+
+    def _cancel_others(self, execution: OrderExecution):
+        for order in self.orders:
+            if order is not execution.order:
+                self.cancel_order(order)
+
+    def on_order_filled(self, execution: OrderExecution):
+        if self.in_place:
+            self._cancel_others(execution)
+        super().on_order_filled(execution)
+
+    async def on_fill(self, execution: OrderExecution):
+        self._cancel_others(execution)
+
+    def on_bar(self, bar):
+        if not self.orders:
+            self.orders = [self.place_limit(OrderAction.Buy, limit=bar.Low - 1.0),
+                           self.place_limit(OrderAction.Buy, limit=bar.Low - 2.0)]
+
+
+def test_fills_dispatched_in_place_or_after_the_bar():
+    times = pd.date_range("2023-01-03T09:30:00", periods=3, freq="s")
+    bars = pd.DataFrame({"Timestamp": times, "High": [100.0, 100.0, 90.0], "Low": [99.0, 99.0, 80.0]})
+
+    async def run(trader):
+        session = PaperSession(replay_bars(bars))
+        session.add(trader)
+        await session.run()
+        return trader
+
+    # on_fill() runs after the bar, too late to stop the other limit filling on it
+    after = asyncio.run(run(OneOfTwoLimits(results_dir=None)))
+    assert after.tracker.net_position == 2
+    # on_order_filled() runs as each order fills, as in a backtest
+    in_place = asyncio.run(run(OneOfTwoLimits(results_dir=None, in_place=True)))
+    assert in_place.tracker.net_position == 1
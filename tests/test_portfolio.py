@@ -0,0 +1,60 @@
+import pytest
+from slipstream.market.futures import EminiContract
+from slipstream.trading import OrderAction, Order, OrderExecution
+from slipstream.trading.portfolio import PortfolioTracker
+
+
+def _executed(portfolio: PortfolioTracker, contract, action: OrderAction, size: int, price: float, cost: float = 0.0):
+    execution = OrderExecution(order=Order(action=action, size=size), price=price, cost=cost)
+    portfolio.add_execution(contract, execution)
+
+
+def test_shared_equity_and_margin():
+    es = EminiContract(2023, 12, multiplier=50.0, tick_size=0.25)
+    mes = EminiContract(2023, 12, multiplier=5.0, tick_size=0.25)
+    portfolio = PortfolioTracker(initial_equity=100000.0)
+    portfolio.add_contract(es, margin=12000.0)
+    portfolio.add_contract(mes, margin=1200.0)
+
+    _executed(portfolio, es, OrderAction.Buy, size=2, price=4500.0, cost=2.0)
+    _executed(portfolio, mes, OrderAction.SellShort, size=10, price=4510.0, cost=5.0)
+    assert portfolio.margin_used == pytest.approx(2 * 12000.0 + 10 * 1200.0)
+    assert portfolio.equity_value == pytest.approx(100000.0 - 7.0)
+
+    portfolio.eval_market(es, high=4511.0, low=4509.0)   # Marked at 4510
+    portfolio.eval_market(mes, high=4506.0, low=4504.0)  # Marked at 4505
+    assert portfolio.unrealized_pnl_of(es) == pytest.approx(2 * 10.0 * 50.0)
+    assert portfolio.unrealized_pnl_of(mes) == pytest.approx(10 * 5.0 * 5.0)
+    assert portfolio.net_liquidation_value == pytest.approx(100000.0 - 7.0 + 1000.0 + 250.0)
+
+    _executed(portfolio, es, OrderAction.Sell, size=2, price=4512.0, cost=2.0)
+    assert float(portfolio.books[es].trades[0].profit) == pytest.approx(1200.0)
+    assert portfolio.unrealized_pnl_of(es) == 0.0
+    assert portfolio.margin_of(es) == 0.0
+    assert portfolio.margin_used == pytest.approx(10 * 1200.0)
+    assert portfolio.equity_value == pytest.approx(100000.0 - 9.0 + 1200.0)
+    assert portfolio.unrealized_pnl == pytest.approx(250.0)
+
+
+def test_equal_contracts_share_a_book():
+    portfolio = PortfolioTracker()
+    portfolio.eval_market(EminiContract(2023, 12, multiplier=50.0), high=4500.0, low=4498.0)
+    _executed(portfolio, EminiContract(2023, 12, multiplier=50.0), OrderAction.Buy, size=1, price=4499.0)
+    assert len(portfolio) == 1
+    assert EminiContract(2023, 12, multiplier=50.0) != EminiContract(2024, 3, multiplier=50.0)
+    assert EminiContract(2023, 12, multiplier=50.0) != EminiContract(2023, 12, multiplier=5.0)
+
+
+def test_new_position_marked_at_execution_price():
+    es = EminiContract(2023, 12, multiplier=50.0)
+    portfolio = PortfolioTracker()
+    _executed(portfolio, es, OrderAction.Buy, size=1, price=4500.0)
+    portfolio.eval_market(es, high=4511.0, low=4509.0)
+    _executed(portfolio, es, OrderAction.Sell, size=1, price=4510.0)
+    # The previous mark of 4510 is stale for a position opened at 4400
+    _executed(portfolio, es, OrderAction.Buy, size=1, price=4400.0)
+    assert portfolio.unrealized_pnl_of(es) == 0.0
+    # Adding to a position keeps the bar's mark
+    portfolio.eval_market(es, high=4401.0, low=4399.0)
+    _executed(portfolio, es, OrderAction.Buy, size=1, price=4402.0)
+    assert portfolio.unrealized_pnl_of(es) == pytest.approx(-2 * 50.0)
@@ -1,7 +1,9 @@
 import pytest
+import numpy as np
 import pandas as pd
 from slipstream.trading import TradeType, OrderAction, Order, OrderType, OrderExecution, Price, PriceLike
-from slipstream.trading.positions import PositionTracker
+from slipstream.trading.ledger import TradeLedger
+from slipstream.trading.positions import PositionTracker, MeasuredTrade
 
     
 class PositionTrackerUnderTest(PositionTracker):
@@ -36,9 +38,9 @@ class PositionTrackerUnderTest(PositionTracker):
 
 
 @pytest.fixture()
-def pos_tracker(request):
+def pos_tracker(request, tmp_path):
     t = PositionTrackerUnderTest(initial_equity=10000.0)
-    path = f"x/{request.node.name}.trades.csv"
+    path = str(tmp_path / f"{request.node.name}.trades.csv")
     t.start_recording_trades(path=path)
     yield t
     t.stop_recording_trades()
@@ -169,3 +171,96 @@ def test_market_high_low_tracking_no_drawdown(pos_tracker):
     t = pt.trades[0]
     assert t.run_up == pytest.approx(20.0, 0.0001)
     assert t.draw_down == pytest.approx(0.0, 0.0001)
+
+
+def test_trade_ledger_columns(pos_tracker):
+    pt: PositionTrackerUnderTest = pos_tracker
+    pt.timestamp = pd.Timestamp.fromisoformat("2022-11-29T10:00:56.502619")
+    pt.bought(size=100, price=10.0, cost=1.0)
+    pt.after("60s")
+    pt.sold(size=200, price=11.0, cost=2.0)
+    pt.after("60s")
+    pt.covered(size=100, price=10.5, cost=1.0)
+    assert len(pt.trades) == 2
+
+    df = pt.trades.to_dataframe()
+    assert list(df.columns) == MeasuredTrade.field_names_to_log()
+    assert list(df["Type"]) == ["Long", "Short"]
+    assert list(df["Profit"]) == pytest.approx([100.0, 50.0])
+    assert df["Exit Time"].iloc[1] == pt.timestamp
+    assert np.shares_memory(df["Profit"].to_numpy(), pt.trades.column("profit"))
+
+    t = pt.trades[-1]
+    assert isinstance(t, MeasuredTrade)
+    assert t.type == TradeType.Short
+    assert t.profit == 50.0
+    assert t.time_exited == pt.timestamp
+
+
+def test_trade_ledger_growth():
+    ledger = TradeLedger(capacity=2, trade_cls=MeasuredTrade)
+    for i in range(5):
+        ledger.append(TradeType.Long, size=1, entry=10.0, exit=10.0 + i, time_exited=pd.Timestamp(i))
+    assert len(ledger) == 5
+    assert ledger.capacity == 8
+    assert list(ledger.column("profit")) == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert [t.exit for t in ledger[1:3]] == [11.0, 12.0]
+
+
+def test_trade_ledger_timezone():
+    ledger = TradeLedger()
+    entry = pd.Timestamp("2023-01-03T09:30:00", tz="US/Eastern")
+    ledger.append(TradeType.Long, size=1, entry=10.0, exit=11.0, time_entered=entry, time_exited=entry + pd.Timedelta("1min"))
+    assert str(ledger.tz) == "US/Eastern"
+    with pytest.raises(AssertionError):
+        ledger.append(TradeType.Long, size=1, entry=10.0, exit=11.0, time_exited=pd.Timestamp("2023-01-03T09:35:00"))
+    with pytest.raises(AssertionError):
+        ledger.append(TradeType.Long, size=1, entry=10.0, exit=11.0, time_exited=entry.tz_convert("UTC"))
+
+    naive = TradeLedger()
+    naive.append(TradeType.Long, size=1, entry=10.0, exit=11.0, time_exited=pd.Timestamp("2023-01-03T09:35:00"))
+    assert naive.tz is None
+    with pytest.raises(AssertionError):
+        naive.append(TradeType.Long, size=1, entry=10.0, exit=11.0, time_exited=entry)
+
+
+def test_entry_time_defaults_to_execution_time(pos_tracker):
+    pt = pos_tracker
+    pt.bought(size=1, price=10.0)
+    pt.open_positions.head.time_entered = None
+    pt.after("1min")
+    pt.sold(size=1, price=11.0)
+    assert pt.trades[0].time_entered == pt.trades[0].time_exited == pt.timestamp
+    assert isinstance(pt.equity_value, Price)
+
+
+class PerLotExtremesTracker(PositionTracker):
+    """Reference tracker that tracks market high/low on every open lot"""
+
+    def eval_market_prices(self, *prices):
+        for position in self.open_positions:
+            position.eval_market_prices(*prices)
+
+    def lot_market_high_low(self, lot):
+        return lot.market_high, lot.market_low
+
+
+def test_running_extremes_match_per_lot_tracking():
+    rng = np.random.default_rng(7)
+    trackers = [PositionTracker(), PerLotExtremesTracker()]
+    price = 100.0
+    for _ in range(3000):
+        price += rng.normal()
+        prices = [price + x for x in rng.normal(scale=0.5, size=rng.integers(1, 4))]
+        if rng.random() < 0.3:
+            action = OrderAction.Buy if rng.random() < 0.5 else OrderAction.Sell
+            size = int(rng.integers(1, 5))
+            for t in trackers:
+                t.add_execution(OrderExecution(order=Order(action=action, size=size), price=price))
+        for t in trackers:
+            t.eval_market_prices(*prices)
+
+    fast, reference = trackers
+    assert len(fast.trades) == len(reference.trades) > 100
+    for col in ("run_up", "draw_down"):
+        np.testing.assert_array_equal(fast.trades.column(col), reference.trades.column(col))
@@ -196,6 +196,27 @@ def _test_single_profitable_trade(trade_type: TradeType, unit_size: int = 100):
     assert len(p.trades) == 1
     assert p.equity_value == 10000.0 + (unit_size * price_diff) - 2.0
 
+def test_many_lots_aggregate(p):
+    for i in range(1000):
+        p.add_execution(OrderExecution(
+            order=Order(action=OrderAction.Buy, size=1),
+            price=10.0 + (i % 2),
+            cost=1.0
+        ))
+    assert p.position.size == 1000
+    assert p.position.entry == pytest.approx(10.5)
+    assert float(p.position.cost) == pytest.approx(1000.0)
+
+    p.add_execution(OrderExecution(
+        order=Order(action=OrderAction.Sell, size=999),
+        price=12.0
+    ))
+    assert len(p.trades) == 999
+    assert len(p.open_positions) == 1
+    assert p.position.size == 1
+    assert p.position.entry == 11.0
+    assert float(p.position.cost) == pytest.approx(1.0)
+
 
 # if __name__ == '__main__':
 #     unittest.main()
@@ -145,3 +145,104 @@ def test_trail_stop_market_buy_fill():
     assert p.entry == 100.4
     assert p.trade_type == TradeType.Long
     assert p.size == 1
+
+def test_equity_curve_recording():
+    t0 = pd.Timestamp("2023-01-03T09:30:00")
+    dt = pd.Timedelta(seconds=1)
+    sim = SimTrader()
+    sim.TradeCost = 0.0
+    curve = sim.start_recording_equity(capacity=2)
+    sim.eval_market(t0, low=10.0, high=10.2)
+    sim.place_market(action=OrderAction.Buy, size=2)
+    sim.eval_market(t0 + dt, low=10.0, high=10.2)  # Bought 2 at 10.2
+    sim.eval_market(t0 + 2 * dt, low=10.4, high=10.6)
+    sim.place_market(action=OrderAction.Sell, size=1)
+    sim.eval_market(t0 + 3 * dt, low=10.5, high=10.7)  # Sold 1 at 10.5
+
+    df = curve.to_dataframe()
+    assert len(df) == 4
+    assert list(df["Position"]) == [0, 2, 2, 1]
+    assert list(df["Realized"]) == pytest.approx([0.0, 0.0, 0.0, 0.3])
+    assert list(df["Unrealized"]) == pytest.approx([0.0, -0.2, 0.6, 0.4])
+    assert df["Timestamp"].iloc[-1] == t0 + 3 * dt
+    assert curve.max_drawdown() == pytest.approx(0.2)
+
+def test_nanosecond_clock():
+    t0 = pd.Timestamp("2023-01-03T09:30:00", tz="US/Eastern")
+    sim = SimTrader()
+    sim.eval_market(t0, low=10.0, high=10.2)
+    assert sim.cur_time is t0
+    order = sim.place_market(action=OrderAction.Buy, size=1)
+    assert order.time_sent == t0
+    assert order.time_sent_ns == t0.value
+
+    # Same time again is pushed ahead by the synthetic delay
+    sim.eval_market(t0.value, low=10.0, high=10.2)
+    assert sim.cur_time_ns == t0.value + SimTrader.SyntheticDelay.value
+    assert sim.cur_time == t0 + SimTrader.SyntheticDelay
+    assert sim.tracker.position is None
+
+    sim.eval_market(t0.value + 10**9, low=10.0, high=10.2)
+    assert sim.tracker.position.size == 1
+    assert sim.execution_delays.iloc[0] == pd.Timedelta(seconds=1)
+    assert str(sim.cur_time.tz) == "US/Eastern"
+
+def test_delays_overridden_on_instance():
+    t0 = pd.Timestamp("2023-01-03T09:30:00")
+    sim = SimTrader(results_dir=None)
+    sim.MinOrderFillDelay = pd.Timedelta(0)
+    sim.SyntheticDelay = pd.Timedelta(milliseconds=10)
+    sim.eval_market(t0, low=10.0, high=10.2)
+    sim.place_market(action=OrderAction.Buy, size=1)
+    sim.eval_market(t0 + pd.Timedelta(milliseconds=1), low=10.0, high=10.2)
+    assert sim.cur_time == t0 + pd.Timedelta(milliseconds=10)
+    p = sim.tracker.position
+    assert p.trade_type == TradeType.Long and p.size == 1
+
+def test_profiling():
+    t0 = pd.Timestamp("2023-01-03T09:30:00")
+    dt = pd.Timedelta(seconds=1)
+    sim = SimTrader(results_dir=None)
+    sim.eval_market(t0, low=10.0, high=10.2)
+    assert sim.profiler is None
+
+    profiler = sim.start_profiling()
+    sim.place_limit(action=OrderAction.Buy, limit=9.7, size=1)
+    sim.place_stop_market(action=OrderAction.Sell, stop=9.0, size=1)
+    sim.eval_market(t0 + dt, low=9.9, high=10.1)
+    sim.eval_market(t0 + 3 * dt, low=9.5, high=9.7)  # Limit filled 3s after it was sent
+    assert sim.tracker.position.size == 1
+
+    phases = profiler.to_dict()["phases"]
+    assert phases["eval_market"]["calls"] == 2
+    assert phases["activate_stops"]["calls"] == 2
+    assert phases["booking"]["calls"] == phases["callbacks"]["calls"] == 1
+    assert profiler.histograms["book_size"].to_dict() == {2: 2}
+    delays = profiler.histograms["fill_delay_ns"].to_dataframe()
+    assert list(delays["Count"]) == [1]
+    assert delays["From"][0] <= 3 * 10**9 <= delays["To"][0]
+    assert set(profiler.to_dataframe()["Phase"]) >= {"eval_market_prices", "eval_orders", "collect_fillable"}
+
+    assert sim.stop_profiling() is profiler
+    sim.eval_market(t0 + 4 * dt, low=9.5, high=9.7)
+    assert phases["eval_market"]["calls"] == 2 == profiler.phases.counts["eval_market"]
+
+
+class CountingFillsTrader(SimTrader):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fill_phases = 0
+
+    def _fill_orders(self, time, high, low):
+        self.fill_phases += 1
+        super()._fill_orders(time, high, low)
+
+
+def test_overridden_phases_run_with_and_without_profiling():
+    t0 = pd.Timestamp("2023-01-03T09:30:00")
+    sim = CountingFillsTrader(results_dir=None)
+    sim.eval_market(t0, low=10.0, high=10.2)
+    profiler = sim.start_profiling()
+    sim.eval_market(t0 + pd.Timedelta(seconds=1), low=10.0, high=10.2)
+    assert sim.fill_phases == 2
+    assert profiler.to_dict()["phases"]["eval_orders"]["calls"] == 1
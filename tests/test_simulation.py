@@ -0,0 +1,148 @@
+import pandas as pd
+import slipstream.trading as slt
+from slipstream.trading import BookState, TradePlan, TradeType
+from slipstream.trading.simulation import SimTrader
+from helpers import ManualBrackets, random_bars
+
+
+def _feed(sim: SimTrader, t0: pd.Timestamp, bars):
+    for i, (low, high) in enumerate(bars):
+        sim.eval_market(t0 + pd.Timedelta(seconds=i), low=low, high=high)
+
+
+def test_trade_plan_target_cancels_stop():
+    sim = SimTrader()
+    t0 = pd.Timestamp("2023-01-03T09:30:00")
+    sim.eval_market(t0, low=10.0, high=10.2)
+    sim.add_trade_plan(TradePlan(type=TradeType.Long, size=1, target=11.0, stop=9.0))
+    _feed(sim, t0 + pd.Timedelta(seconds=1), [(10.0, 10.2), (10.1, 10.3), (11.1, 11.3), (8.5, 8.9)])
+    assert sim.tracker.is_flat()
+    assert len(sim.trades) == 1
+    assert sim.trades[0].exit == 11.1
+    assert len(sim._pending_orders) == 0
+
+
+def test_trade_plan_stop_cancels_target():
+    sim = SimTrader()
+    t0 = pd.Timestamp("2023-01-03T09:30:00")
+    sim.eval_market(t0, low=10.0, high=10.2)
+    sim.add_trade_plan(TradePlan(type=TradeType.Short, size=2, limit=10.4, target=9.0, stop=11.0))
+    _feed(sim, t0 + pd.Timedelta(seconds=1), [(10.0, 10.2), (10.5, 10.7), (10.6, 10.8), (10.9, 11.2), (8.5, 8.9)])
+    assert sim.tracker.is_flat()
+    assert len(sim.trades) == 1
+    assert sim.trades[0].type == TradeType.Short
+    assert sim.trades[0].size == 2
+    assert sim.trades[0].entry == 10.5
+    assert sim.trades[0].exit == 11.2
+    assert len(sim._pending_orders) == 0
+
+
+def test_trade_plan_hold_period():
+    sim = SimTrader()
+    t0 = pd.Timestamp("2023-01-03T09:30:00")
+    sim.eval_market(t0, low=10.0, high=10.2)
+    sim.add_trade_plan(TradePlan(type=TradeType.Long, size=1, target=20.0, hold_period=3))
+    _feed(sim, t0 + pd.Timedelta(seconds=1), [(10.0, 10.2)] * 3)
+    assert sim.tracker.is_long()
+    _feed(sim, t0 + pd.Timedelta(seconds=4), [(10.0, 10.2)] * 2)
+    assert sim.tracker.is_flat()
+    assert len(sim._pending_orders) == 0
+
+    sim.add_trade_plan(TradePlan(type=TradeType.Short, size=1, hold_period=pd.Timedelta(seconds=5)))
+    _feed(sim, t0 + pd.Timedelta(seconds=10), [(10.0, 10.2)] * 5)
+    assert sim.tracker.is_short()
+    _feed(sim, t0 + pd.Timedelta(seconds=15), [(10.0, 10.2)] * 3)
+    assert sim.tracker.is_flat()
+
+
+
+def test_cancel_plan_orders():
+    sim = SimTrader(results_dir=None)
+    t0 = pd.Timestamp("2023-01-03T09:30:00")
+    sim.eval_market(t0, low=10.0, high=10.2)
+    entry = sim.add_trade_plan(TradePlan(type=TradeType.Long, size=1, limit=9.0, target=11.0, stop=9.5))
+    assert sim.cancel_order(entry)
+    assert not sim._plan_entries
+    _feed(sim, t0 + pd.Timedelta(seconds=1), [(8.5, 8.9)] * 2)
+    assert sim.tracker.is_flat() and len(sim.pending_orders) == 0
+
+    sim.add_trade_plan(TradePlan(type=TradeType.Long, size=1, target=11.0, stop=9.0))
+    _feed(sim, t0 + pd.Timedelta(seconds=3), [(10.0, 10.2)] * 2)
+    target, stop = sim.pending_orders
+    # Cancelling one leg keeps the other, and the plan
+    assert sim.cancel_order(target)
+    assert len(sim._open_plans) == 1 and len(sim._group_plans) == 1
+    # Cancelling the last leg drops the plan, which has no hold period left to close it
+    assert sim.cancel_order(stop)
+    assert not sim._open_plans and not sim._group_plans
+    _feed(sim, t0 + pd.Timedelta(seconds=5), [(8.5, 8.9), (11.1, 11.3)])
+    assert sim.tracker.is_long()
+
+    sim.go_flat()
+    sim.add_trade_plan(TradePlan(type=TradeType.Short, size=1, stop=11.0, hold_period=3))
+    _feed(sim, t0 + pd.Timedelta(seconds=7), [(10.0, 10.2)] * 2)
+    assert sim.tracker.is_short()
+    assert sim.cancel_order(sim.pending_orders[0])
+    # A plan with a hold period is still closed when it runs out
+    assert len(sim._open_plans) == 1 and not sim._group_plans
+    _feed(sim, t0 + pd.Timedelta(seconds=9), [(10.0, 10.2)] * 3)
+    assert sim.tracker.is_flat()
+
+class EveryTenBars(slt.Strategy):
+    def __init__(self) -> None:
+        self.states = []
+
+    def observe_book_state(self, book_state: BookState):
+        self.states.append(book_state)
+        if len(self.states) % 10 == 0:
+            self.send(TradePlan(type=TradeType.Long, size=1, hold_period=5))
+
+
+def test_simulation_publishes_and_routes_plans():
+    bars = random_bars(200, seed=3, close=True, volume=True)
+    sim = slt.Simulation(source=bars)
+    strategy = EveryTenBars()
+    sim.subscribe(strategy)
+    sim.launch()
+
+    assert strategy.trader is sim.trader
+    assert len(strategy.states) == len(bars)
+    state = strategy.states[7]
+    assert state.time == bars["Timestamp"][7]
+    assert sim.trader.tz == bars["Timestamp"].dt.tz == state.time.tz
+    assert state.last == bars["Close"][7] and state.high == bars["High"][7]
+    # The plan sent on the last bar never fills
+    assert len(sim.trader.trades) == 19
+    timings = sim.timings.to_dict()
+    assert timings["market"]["calls"] == timings["publish"]["calls"] == len(bars)
+    assert "pace" not in timings
+
+
+def test_paced_simulation():
+    bars = random_bars(20, seed=3, close=True, volume=True)
+    bars["Timestamp"] = pd.date_range("2023-01-03", periods=20, freq="10ms")
+    sim = slt.Simulation(source=bars, speed=4.0)
+    sim.launch()
+    # 190ms of bars at 4x speed
+    assert sim.timings.to_dict()["pace"]["total_ns"] > 30_000_000
+
+
+def test_native_brackets_match_manual_brackets():
+    bars = random_bars(3000, seed=3, close=True, volume=True)
+    native, manual = SimTrader(), ManualBrackets()
+    for i, (t, high, low) in enumerate(zip(bars["Timestamp"], bars["High"], bars["Low"])):
+        for sim in (native, manual):
+            sim.eval_market(t, high=high, low=low)
+        if i % 7 == 0:
+            mid = 0.5 * (high + low)
+            trade_type = TradeType.Long if i % 14 == 0 else TradeType.Short
+            side = 1 if trade_type == TradeType.Long else -1
+            plan = TradePlan(type=trade_type, size=1, limit=mid - side * 0.25,
+                             target=mid + side * 1.5, stop=mid - side * 1.0)
+            native.add_trade_plan(plan)
+            manual.add_trade_plan(plan)
+
+    assert len(native.trades) > 50
+    pd.testing.assert_frame_equal(native.trades.to_dataframe(), manual.trades.to_dataframe())
+    assert all(order.on_execution is None for order in native._pending_orders)
+    assert len(native._open_plans) == len(native._group_plans)
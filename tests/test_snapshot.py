@@ -0,0 +1,69 @@
+import copy
+import os
+import pandas as pd
+import pytest
+from slipstream.trading.simulation import SimTrader
+from helpers import BracketTrader, Crash, random_bars
+
+
+def _assert_same_run(trader: SimTrader, expected: SimTrader):
+    assert len(trader.trades) == len(expected.trades) > 0
+    pd.testing.assert_frame_equal(trader.trades.to_dataframe(), expected.trades.to_dataframe())
+    assert trader.tracker.equity_value == expected.tracker.equity_value
+    pd.testing.assert_frame_equal(trader.equity_curve.to_dataframe(), expected.equity_curve.to_dataframe())
+    with open(trader.trades_path) as f, open(expected.trades_path) as g:
+        assert f.read() == g.read()
+
+
+def test_resume_after_crash(tmp_path):
+    bars = random_bars(1000, seed=17, half_spread=0.5)
+    expected = BracketTrader(results_dir=str(tmp_path), record_equity=True)
+    expected.run(bars)
+
+    snapshot = str(tmp_path / "snapshot.pkl")
+    trader = BracketTrader(results_dir=str(tmp_path), record_equity=True)
+    trader.crash_at = 777
+    with pytest.raises(Crash):
+        trader.run(bars, snapshot_path=snapshot, snapshot_every=100)
+
+    resumed = SimTrader.load_snapshot(snapshot)
+    assert resumed.cursor == 700
+    assert resumed.equity_curve.capacity == 700
+    resumed.crash_at = None
+    resumed.run(bars)
+    _assert_same_run(resumed, expected)
+
+
+def test_extend_from_final_snapshot(tmp_path):
+    bars = random_bars(1000, seed=17, half_spread=0.5)
+    expected = BracketTrader(results_dir=str(tmp_path), record_equity=True)
+    expected.run(bars)
+
+    snapshot = str(tmp_path / "snapshot.pkl")
+    trader = BracketTrader(results_dir=str(tmp_path), record_equity=True)
+    trader.run(bars.iloc[:600], snapshot_path=snapshot)
+    assert len(trader._pending_orders) > 0 or not trader.tracker.is_flat()
+
+    extended = SimTrader.load_snapshot(snapshot)
+    assert extended.cursor == 600
+    extended.run(bars, snapshot_path=snapshot)
+    _assert_same_run(extended, expected)
+    assert SimTrader.load_snapshot(snapshot).cursor == len(bars)
+    assert not os.path.exists(snapshot + ".tmp")
+
+
+def test_loading_snapshot_leaves_log_alone(tmp_path):
+    bars = random_bars(1000, seed=17, half_spread=0.5)
+    snapshot = str(tmp_path / "snapshot.pkl")
+    trader = BracketTrader(results_dir=str(tmp_path), record_equity=True)
+    trader.run(bars.iloc[:300], snapshot_path=snapshot)
+    trader.run(bars)
+    with open(trader.trades_path) as f:
+        log = f.read()
+    assert len(trader.trades) > 0 and log.count("\n") == len(trader.trades) + 1
+
+    old = SimTrader.load_snapshot(snapshot)
+    copy.deepcopy(trader)
+    with open(trader.trades_path) as f:
+        assert f.read() == log
+    assert len(old.trades) < len(trader.trades)
@@ -0,0 +1,106 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from slipstream.trading.analysis import TradesAnalysis
+from slipstream.trading.simulation import SimTrader
+from slipstream.trading.sweep import ParameterSweep, SharedBars, _configure
+from helpers import FlipTrader, random_bars
+
+
+class OddPeriodFails(FlipTrader):
+    """Fails on its first bar when `Period` is odd"""
+
+    def on_bar(self, bar):
+        if self.Period % 2 == 1:
+            raise ValueError("Odd period")
+        super().on_bar(bar)
+
+
+def test_shared_bars_roundtrip():
+    bars = random_bars(100, seed=7, volume=True)
+    with SharedBars(bars) as shared:
+        attached, blocks = SharedBars.attach(shared.spec, shared.length)
+        pd.testing.assert_frame_equal(attached, bars, check_dtype=False)
+        assert not attached["High"].to_numpy().flags.writeable
+        del attached
+        for block in blocks:
+            block.close()
+
+
+def test_sweep_matches_direct_runs(tmp_path):
+    bars = random_bars(2000, seed=7, volume=True)
+    sweep = ParameterSweep(FlipTrader, {"Period": [5, 20], "price_slip": [0.0, 0.25]},
+                           results_dir=str(tmp_path), processes=2)
+    summary = sweep.run(bars)
+
+    assert len(summary) == 4
+    assert os.path.exists(sweep.summary_path)
+    assert len(pd.read_csv(sweep.summary_path)) == 4
+    for _, row in summary.iterrows():
+        run_dir = os.path.join(sweep.path, row["Run"])
+        with open(os.path.join(run_dir, "params.json")) as f:
+            params = json.load(f)
+        assert params == {"Period": row["Period"], "price_slip": row["price_slip"]}
+        assert os.path.dirname(row["Trades Path"]) == run_dir
+
+        trader = _configure(FlipTrader, params, str(tmp_path))
+        trader.run(bars)
+        assert row["Trades"] == len(trader.trades) > 0
+        assert row["Equity"] == pytest.approx(float(trader.tracker.equity_value))
+        assert row["Sharpe"] == pytest.approx(trader.analysis().metrics()["Sharpe"])
+
+
+def test_configured_trader_snapshots(tmp_path):
+    trader = _configure(FlipTrader, {"Period": 5, "DefaultSize": 2}, None)
+    assert type(trader) is FlipTrader
+    trader.run(random_bars(100, seed=7, volume=True))
+    path = str(tmp_path / "snapshot.pkl")
+    trader.save_snapshot(path)
+    loaded = SimTrader.load_snapshot(path)
+    assert (loaded.Period, loaded.DefaultSize, loaded.cursor) == (5, 2, 100)
+    assert FlipTrader.Period == 10 and FlipTrader.DefaultSize == 1
+
+
+def test_failed_runs_keep_their_rows(tmp_path, caplog):
+    bars = random_bars(500, seed=7, volume=True)
+    sweep = ParameterSweep(OddPeriodFails, {"Period": [4, 5, 6]}, results_dir=str(tmp_path), processes=2)
+    summary = sweep.run(bars)
+    assert list(summary["Period"]) == [4, 5, 6]
+    failed = summary.iloc[1]
+    assert "Odd period" in failed["Error"]
+    assert np.isnan(failed["Trades"]) and np.isnan(failed["Profit"]) and np.isnan(failed["Sharpe"])
+    assert summary.loc[[0, 2], "Error"].isna().all()
+    assert (summary.loc[[0, 2], "Trades"] > 0).all()
+    assert len(pd.read_csv(sweep.summary_path)) == 3
+    assert "run_1 with parameters {'Period': 5} failed" in caplog.text
+
+
+def test_unique_trades_paths(tmp_path):
+    paths = {SimTrader(results_dir=str(tmp_path)).trades_path for _ in range(5)}
+    assert len(paths) == 5
+
+
+def test_sweep_without_trades_logs(tmp_path):
+    bars = random_bars(500, seed=7, volume=True)
+    sweep = ParameterSweep(FlipTrader, {"Period": [5, 20]}, results_dir=str(tmp_path), processes=2, write_trades=False)
+    summary = sweep.run(bars)
+    assert summary["Trades Path"].isna().all()
+    assert sorted(os.listdir(sweep.path)) == ["grid.json", "summary.csv"]
+
+
+def test_in_memory_trader(tmp_path):
+    bars = random_bars(500, seed=7, volume=True)
+    logged = FlipTrader(results_dir=str(tmp_path))
+    logged.run(bars)
+    trader = FlipTrader(results_dir=None)
+    trader.run(bars)
+    assert trader.trades_path is None
+    assert os.listdir(tmp_path) == [os.path.basename(logged.trades_path)]
+
+    # Saving afterwards gives the same log as writing it during the run
+    path = trader.save_trades(str(tmp_path / "saved.csv"))
+    with open(path) as f, open(logged.trades_path) as g:
+        assert f.read() == g.read()
+    assert trader.analysis().summary() == TradesAnalysis(logged.trades_path).summary()
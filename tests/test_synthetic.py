@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from slipstream.data.synthetic import SyntheticMarket
+from slipstream.trading.ticks import TickBacktest
+
+
+def test_bars_are_seeded_and_chunked():
+    bars = SyntheticMarket(seed=5).bars(3000)
+    pd.testing.assert_frame_equal(SyntheticMarket(seed=5).bars(3000), bars)
+    assert not SyntheticMarket(seed=6).bars(3000).equals(bars)
+
+    # Chunks of a larger run are its first rows
+    chunks = list(SyntheticMarket(seed=5, chunk_size=1000).iter_bars(2500))
+    assert [len(c) for c in chunks] == [1000, 1000, 500]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True),
+                                  SyntheticMarket(seed=5, chunk_size=1000).bars(3000).iloc[:2500])
+
+
+@pytest.mark.parametrize("model", ["gbm", "jump", "regime"])
+def test_bars(model):
+    market = SyntheticMarket(model=model, seed=1, chunk_size=700)
+    bars = market.bars(5000)
+    assert len(bars) == 5000
+    assert (bars["Low"] <= bars[["Open", "Close"]].min(axis=1)).all()
+    assert (bars["High"] >= bars[["Open", "Close"]].max(axis=1)).all()
+    assert np.allclose(bars["Close"] / 0.25, np.round(bars["Close"] / 0.25))
+    assert bars["Timestamp"].is_monotonic_increasing
+    assert str(bars["Timestamp"].dt.tz) == "US/Central"
+
+
+def test_session_times():
+    times = SyntheticMarket(start=pd.Timestamp("2023-11-01"), freq="5min").times(10000)
+    # The first session opens on the evening of the start date
+    assert times[0] == pd.Timestamp("2023-11-01T17:00", tz="US/Central")
+    # CME Globex hours: Sunday to Friday from 17:00 to 16:00 the next day
+    assert not (times.dayofweek == 5).any()
+    assert not (times.hour == 16).any()
+    assert times[(times.dayofweek == 6)].hour.min() == 17
+
+
+def test_rolls_to_next_contract():
+    market = SyntheticMarket(start=pd.Timestamp("2023-12-14"), freq="1h")
+    times = market.times(100)
+    expiry = market.contract.expiry_time
+    assert times[0] < expiry < times[-1]
+    assert times.is_unique and times.is_monotonic_increasing
+
+
+def test_ticks_feed_tick_backtest(tmp_path):
+    market = SyntheticMarket(freq="250ms", model="regime", seed=2, chunk_size=4000)
+    ticks = market.ticks(10000)
+    assert (ticks["Ask"] - ticks["Bid"] == 0.25).all()
+    trades = ticks["Last"].notna()
+    assert ((ticks["Last"] == ticks["Bid"]) | (ticks["Last"] == ticks["Ask"]))[trades].all()
+    assert (ticks["LastVol"][~trades] == 0).all()
+    assert len(TickBacktest.from_dataframe(ticks)) == len(ticks)
+
+    path = market.to_csv(str(tmp_path / "ticks.csv"), 10000, kind="ticks")
+    written = pd.read_csv(path)
+    assert len(written) == len(ticks)
+    assert np.allclose(written["Bid"], ticks["Bid"])
+    assert (pd.DatetimeIndex(written["Timestamp"]).tz_convert("US/Central") == pd.DatetimeIndex(ticks["Timestamp"])).all()
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from slipstream.trading.ticks import TickBacktest
+from slipstream.trading.vectorized import VectorizedBacktest
+
+
+def _random_ticks(seed: int, n: int = 20000):
+    rng = np.random.default_rng(seed)
+    mids = 4000.0 + np.cumsum(rng.choice([-0.25, 0.0, 0.25], size=n, p=[0.1, 0.8, 0.1]))
+    bid, ask = mids - 0.125, mids + 0.125
+    is_trade = rng.random(n) < 0.4
+    last = np.where(is_trade, np.where(rng.random(n) < 0.5, bid, ask), np.nan)
+    last_vol = np.where(is_trade, rng.integers(1, 20, size=n), 0)
+    times = pd.Timestamp("2023-01-03T09:30:00", tz="UTC") + pd.to_timedelta(np.cumsum(rng.choice([0, 1, 5], size=n)), unit="ms")
+    return rng, times, bid, ask, last, last_vol
+
+
+def _reference_fills(bt: TickBacktest, signals, limits):
+    """Tick-by-tick replay of the same fill model"""
+    fills = []
+    position, pending = 0, None
+    for i in range(len(bt)):
+        if pending is not None and bt.clock_ns[i] >= pending["arrival_ns"] and i > pending["sent"]:
+            buying, limit = pending["buying"], pending["limit"]
+            price = None
+            if not pending["arrived"]:
+                pending["arrived"] = True
+                if np.isnan(limit):
+                    price = bt.ask[i] if buying else bt.bid[i]
+                elif buying and bt.ask[i] <= limit:
+                    price = bt.ask[i]
+                elif not buying and bt.bid[i] >= limit:
+                    price = bt.bid[i]
+                else:
+                    lo = max(0, i - bt.queue_lookback)
+                    pending["needed"] = sum(bt.last_vol[j] for j in range(lo, i) if bt.last[j] == limit) + pending["size"]
+            else:
+                if bt.last[i] == limit:
+                    pending["traded"] += bt.last_vol[i]
+                through = (bt.ask[i] < limit or bt.last[i] < limit) if buying else (bt.bid[i] > limit or bt.last[i] > limit)
+                if through or pending["traded"] >= pending["needed"]:
+                    price = limit
+            if price is not None:
+                fills.append((i, pending["sent"], price))
+                position = pending["target"]
+                pending = None
+        if not np.isnan(signals[i]):
+            pending = None
+            target = int(signals[i])
+            if target != position:
+                pending = dict(sent=i, target=target, buying=target > position, size=abs(target - position),
+                               limit=limits[i] if target != 0 else np.nan, arrival_ns=bt.clock_ns[i] + bt.latency_ns,
+                               arrived=False, traded=0)
+    return fills
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_matches_tick_by_tick_replay(seed):
+    rng, times, bid, ask, last, last_vol = _random_ticks(seed)
+    n = len(times)
+    bt = TickBacktest(times, bid, ask, last, last_vol, latency=pd.Timedelta(milliseconds=2), queue_lookback=50)
+    signals = np.where(rng.random(n) < 0.01, rng.choice([-1.0, 0.0, 1.0], size=n), np.nan)
+    offsets = rng.choice([-0.5, -0.25, 0.0, 0.25], size=n)
+    limits = np.where(rng.random(n) < 0.7, np.where(signals > 0, bid + offsets, ask - offsets), np.nan)
+
+    fills = bt.fills(signals, limits=limits)
+    expected = _reference_fills(bt, signals, limits)
+    assert len(fills) > 50
+    assert list(zip(fills["Bar"], fills["SentBar"], fills["Price"])) == expected
+
+    tracker = bt.run(signals, limits=limits)
+    assert len(tracker.trades) > 0
+
+
+def test_queue_position():
+    times = pd.date_range("2023-01-03T09:30:00", periods=8, freq="s")
+    bid = np.full(8, 99.75)
+    ask = np.full(8, 100.0)
+    last = np.array([99.75, 99.75, np.nan, np.nan, 99.75, 99.75, 99.75, np.nan])
+    last_vol = np.array([4, 6, 0, 0, 5, 5, 3, 0])
+    bt = TickBacktest(times, bid, ask, last, last_vol, queue_lookback=10)
+    signals = np.full(8, np.nan)
+    signals[2] = 1
+    limits = np.full(8, 99.75)
+    # Joins behind the 10 lots printed at 99.75 before it arrived, then needs its own lot to trade
+    fills = bt.fills(signals, limits=limits)
+    assert list(fills["Bar"]) == [6]
+    assert list(fills["Price"]) == [99.75]
+
+    state = bt.book_state(4)
+    assert (state.bid, state.ask, state.last, state.last_vol) == (99.75, 100.0, 99.75, 5)
+
+
+def test_ticks_keep_exchange_time():
+    times = pd.DatetimeIndex(["2023-01-03T09:30:00"] * 3 + ["2023-01-03T09:30:01"])
+    prices = np.full(4, 100.0)
+    bt = TickBacktest(times, prices - 0.25, prices, prices, np.ones(4))
+    assert np.array_equal(bt.clock_ns, times.as_unit("ns").asi8)
+    # Bars sharing a timestamp are spread out by the synthetic clock
+    assert len(set(VectorizedBacktest(times, prices, prices - 0.25).clock_ns)) == 4
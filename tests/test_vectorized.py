@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+from slipstream.trading import OrderAction
+from slipstream.trading.simulation import SimTrader
+from slipstream.trading.vectorized import VectorizedBacktest
+from helpers import random_mids
+
+
+def _random_bars(seed: int, n: int = 5000):
+    rng = np.random.default_rng(seed)
+    mids = random_mids(rng, n)
+    spreads = np.round(rng.uniform(0.0, 1.0, size=n) * 4) / 4
+    gaps = rng.choice([0, 200, 400, 700, 1500], size=n)  # Includes bars sharing a timestamp
+    times = pd.Timestamp("2023-01-03T09:30:00", tz="UTC") + pd.to_timedelta(np.cumsum(gaps), unit="ms")
+    return rng, times, mids + spreads, mids - spreads
+
+
+def _run_per_bar(times, high, low, signals, limits=None, stops=None) -> SimTrader:
+    sim = SimTrader()
+    sim.price_slip = 0.25
+    for i in range(len(times)):
+        sim.eval_market(times[i], high=high[i], low=low[i])
+        target = signals[i]
+        if np.isnan(target):
+            continue
+        if limits is None and stops is None:
+            {1: sim.go_long, -1: sim.go_short, 0: sim.go_flat}[int(target)]()
+            continue
+        sim._clear_pending_orders()
+        position = sim.tracker.net_position // sim.DefaultSize
+        if target == position:
+            continue
+        action = OrderAction.Buy if target > position else OrderAction.Sell
+        size = int(abs(target - position)) * sim.DefaultSize
+        if target != 0 and not np.isnan(limits[i]):
+            sim.place_limit(action=action, limit=limits[i], size=size)
+        elif target != 0 and not np.isnan(stops[i]):
+            sim.place_stop_market(action=action, stop=stops[i], size=size)
+        else:
+            sim.place_market(action=action, size=size)
+    return sim
+
+
+def _assert_same_ledger(sim: SimTrader, tracker):
+    assert len(sim.trades) == len(tracker.trades) > 20
+    for col in ("type", "size", "entry", "exit", "cost", "time_entered", "time_exited", "run_up", "draw_down"):
+        np.testing.assert_array_equal(sim.trades.column(col), tracker.trades.column(col), err_msg=col)
+    assert float(sim.tracker.equity_value) == pytest.approx(float(tracker.equity_value))
+
+
+def test_market_signals_match_sim_trader():
+    rng, times, high, low = _random_bars(seed=11)
+    signals = np.where(rng.random(len(times)) < 0.05, rng.integers(-1, 2, size=len(times)), np.nan)
+    sim = _run_per_bar(times, high, low, signals)
+    tracker = VectorizedBacktest(times, high, low, price_slip=0.25).run(signals)
+    _assert_same_ledger(sim, tracker)
+
+
+def test_limit_and_stop_signals_match_sim_trader():
+    rng, times, high, low = _random_bars(seed=12)
+    n = len(times)
+    signals = np.where(rng.random(n) < 0.05, rng.integers(-1, 2, size=n), np.nan)
+    offsets = np.round(rng.uniform(-2.0, 2.0, size=n) * 4) / 4
+    kind = rng.integers(0, 3, size=n)
+    limits = np.where(kind == 1, (high + low) / 2 + offsets, np.nan)
+    stops = np.where(kind == 2, (high + low) / 2 + offsets, np.nan)
+    sim = _run_per_bar(times, high, low, signals, limits=limits, stops=stops)
+    tracker = VectorizedBacktest(times, high, low, price_slip=0.25).run(signals, limits=limits, stops=stops)
+    _assert_same_ledger(sim, tracker)
+
+
+def test_synthetic_clock():
+    times = pd.to_datetime(["2023-01-03T09:30:00.000", "2023-01-03T09:30:00.000", "2023-01-03T09:30:00.000",
+                            "2023-01-03T09:30:00.0015", "2023-01-03T09:30:01.000"])
+    bt = VectorizedBacktest(times, high=np.ones(5), low=np.ones(5))
+    assert list(bt.clock_ns - bt.clock_ns[0]) == [0, 1_000_000, 2_000_000, 3_000_000, 1_000_000_000]
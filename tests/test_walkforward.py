@@ -0,0 +1,97 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from slipstream.trading.simulation import SimTrader
+from slipstream.trading.sweep import _configure
+from slipstream.trading.walkforward import FeatureCache, WalkForward
+from helpers import random_bars
+
+
+class MeanCrossTrader(SimTrader):
+    """Long above the moving average, short below it"""
+    Period = 10
+
+    def on_bar(self, bar):
+        if np.isnan(bar.SMA):
+            return
+        if bar.Low > bar.SMA and not self.tracker.is_long():
+            self.go_long()
+        elif bar.High < bar.SMA and not self.tracker.is_short():
+            self.go_short()
+
+
+class FragileCrossTrader(MeanCrossTrader):
+    """Fails with a period of 20, and from bar 1000 of `random_bars(1200, seed=11, tz="UTC")` on"""
+    FailFrom = pd.Timestamp("2023-01-03T09:30:00", tz="UTC") + pd.Timedelta(seconds=1000)
+
+    def on_bar(self, bar):
+        if self.Period == 20 or bar.Timestamp >= self.FailFrom:
+            raise ValueError("Fragile")
+        super().on_bar(bar)
+
+
+def moving_average(bars: pd.DataFrame, Period: int) -> pd.DataFrame:
+    return pd.DataFrame({"SMA": (0.5 * (bars["High"] + bars["Low"])).rolling(Period).mean()})
+
+
+def test_windows():
+    wf = WalkForward(SimTrader, {}, in_sample=100, out_of_sample=50)
+    assert wf.windows(260) == [(0, 100, 150), (50, 150, 200), (100, 200, 250)]
+    wf = WalkForward(SimTrader, {}, in_sample=100, out_of_sample=50, step=100, anchored=True)
+    assert wf.windows(260) == [(0, 100, 150), (0, 200, 250)]
+
+
+def test_feature_cache():
+    calls = []
+
+    def feature(bars, Period):
+        calls.append(Period)
+        return moving_average(bars, Period)
+
+    bars = random_bars(100, seed=11, tz="UTC")
+    cache = FeatureCache(feature, ["Period"])
+    for params in [{"Period": 5, "x": 1}, {"Period": 5, "x": 2}, {"Period": 8, "x": 1}]:
+        cache.get(bars, params)
+    assert calls == [5, 8]
+    assert len(cache) == 2
+
+
+def test_walk_forward_matches_direct_runs(tmp_path):
+    bars = random_bars(1200, seed=11, tz="UTC")
+    grid = {"Period": [5, 20, 60], "price_slip": [0.0, 0.25]}
+    wf = WalkForward(MeanCrossTrader, grid, in_sample=400, out_of_sample=200, features=moving_average,
+                     feature_params=["Period"], results_dir=str(tmp_path), processes=2)
+    summary = wf.run(bars)
+    windows = wf.windows(len(bars))
+    assert list(summary["Window"]) == list(range(len(windows)))
+
+    def direct(params, start, end):
+        window = pd.concat([bars, moving_average(bars, params["Period"])], axis=1).iloc[start:end]
+        trader = _configure(MeanCrossTrader, params, str(tmp_path))
+        trader.run(window)
+        return trader
+
+    for (start, split, end), (_, row) in zip(windows, summary.iterrows()):
+        profits = [float(direct(params, start, split).cur_profit) for params in wf.combinations()]
+        best = wf.combinations()[int(np.argmax(profits))]
+        assert {name: row[name] for name in grid} == best
+        assert row["In-Sample Profit"] == pytest.approx(max(profits))
+        trader = direct(best, split, end)
+        assert row["Trades"] == len(trader.trades)
+        assert row["Profit"] == pytest.approx(float(trader.cur_profit))
+        assert row["Win Rate(%)"] == pytest.approx(trader.analysis().metrics()["Win Rate(%)"], nan_ok=True)
+
+
+def test_failed_runs(tmp_path):
+    bars = random_bars(1200, seed=11, tz="UTC")
+    wf = WalkForward(FragileCrossTrader, {"Period": [5, 20]}, in_sample=400, out_of_sample=200,
+                     features=moving_average, feature_params=["Period"], results_dir=str(tmp_path), processes=2)
+    summary = wf.run(bars)
+    assert len(summary) == len(wf.windows(len(bars))) == 4
+    # Failed in-sample runs lose, and a failed out-of-sample run only spoils its own window
+    assert (summary["Period"] == 5).all()
+    assert summary["Error"].iloc[:3].isna().all() and summary["Profit"].iloc[:3].notna().all()
+    assert "Fragile" in summary["Error"].iloc[3] and np.isnan(summary["Profit"].iloc[3])
+    in_sample = pd.read_csv(os.path.join(wf.path, "window_0", "in_sample.csv"))
+    assert in_sample["Error"].isna().tolist() == [True, False]